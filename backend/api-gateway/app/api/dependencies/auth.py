@@ -0,0 +1,34 @@
+from fastapi import HTTPException, Request, status
+
+from app.core.security import Identity, bearer_token, edge_authenticator
+
+
+async def get_current_identity(request: Request) -> Identity:
+    """
+    Identità dell'utente che chiama un endpoint del gateway.
+    Il token viene verificato localmente come per il proxy.
+    """
+    token = bearer_token(request)
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token mancante",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return edge_authenticator.authenticate(token)
+
+
+async def get_current_admin_identity(request: Request) -> Identity:
+    """
+    Verifica che la richiesta agli endpoint interni del gateway provenga da
+    un amministratore.
+    """
+    identity = await get_current_identity(request)
+    if "admin" not in identity.roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Permessi insufficienti",
+        )
+
+    return identity
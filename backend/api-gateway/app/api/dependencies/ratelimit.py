@@ -0,0 +1,15 @@
+from fastapi import Depends, Request
+
+from app.core.ratelimit import rate_limiter
+from app.core.security import Identity
+from app.api.dependencies.auth import get_current_admin_identity
+
+
+async def limit_admin_requests(
+    request: Request,
+    identity: Identity = Depends(get_current_admin_identity),
+) -> None:
+    """
+    Applica il budget della classe "admin" agli endpoint interni del gateway.
+    """
+    await rate_limiter.check(request, "admin", identity)
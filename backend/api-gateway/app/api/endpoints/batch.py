@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.batch import dispatch_batch
+from app.core.compression import compress_response
+from app.core.config import settings
+from app.schemas.batch import BatchRequest, BatchResponse
+
+router = APIRouter()
+
+@router.post("", response_model=BatchResponse)
+async def batch(request: Request, batch_in: BatchRequest):
+    """
+    Esegue più richieste API con una sola chiamata del client.
+    Le sotto-richieste vengono inoltrate in parallelo ai servizi e i
+    risultati restituiti nello stesso ordine. Ogni sotto-richiesta usa gli
+    header della richiesta batch (es. Authorization), sovrascrivibili con i
+    propri.
+    """
+    if not batch_in.requests:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nessuna richiesta nel batch",
+        )
+    if len(batch_in.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Il batch può contenere al massimo {settings.BATCH_MAX_REQUESTS} richieste",
+        )
+
+    results = BatchResponse(responses=await dispatch_batch(request, batch_in.requests))
+    # La risposta aggregata viene compressa una sola volta, come le altre risposte del gateway
+    return compress_response(JSONResponse(jsonable_encoder(results)), request.headers.get("accept-encoding"))
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.dependencies.auth import get_current_identity
+from app.core.composition import composition_engine
+from app.core.compression import compress_response
+from app.core.security import Identity
+from app.schemas.composition import CompositionResponse
+
+router = APIRouter()
+
+@router.get("/{name}", response_model=CompositionResponse)
+async def compose(name: str, request: Request, identity: Identity = Depends(get_current_identity)):
+    """
+    Restituisce un documento composto da più chiamate ai servizi (es.
+    "student-home": quiz assegnati, percorsi, ricompense e punti dello
+    studente). Le componenti fallite o scadute compaiono in "errors" con il
+    loro valore di ripiego in "data".
+    """
+    composition = composition_engine.get(name)
+    if composition is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Composizione non trovata",
+        )
+
+    # I parametri della query non possono sostituire l'utente del token
+    variables = {**request.query_params, "user_id": identity.user_id}
+    document, complete = await composition_engine.compose(request, composition, variables)
+    response = JSONResponse(
+        jsonable_encoder(document),
+        status_code=status.HTTP_200_OK if complete else status.HTTP_502_BAD_GATEWAY,
+    )
+    return compress_response(response, request.headers.get("accept-encoding"))
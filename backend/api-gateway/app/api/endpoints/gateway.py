@@ -0,0 +1,92 @@
+from fastapi import APIRouter
+from typing import Any, Dict
+
+from app.core.upstream import upstream_pool
+from app.core.balancer import load_balancer
+from app.core.hedging import upstream_caller
+from app.core.security import edge_authenticator
+from app.core.cache import response_cache
+from app.core.coalescing import request_coalescer
+from app.core.resilience import upstream_guards
+from app.core.ratelimit import rate_limiter
+from app.core.access_log import access_log
+
+router = APIRouter()
+
+@router.get("/pool", response_model=Dict[str, Any])
+async def get_pool_stats():
+    """
+    Statistiche del pool di connessioni verso i servizi a valle.
+    Per ogni servizio riporta connessioni in uso, inattive e richieste in attesa.
+    """
+    return upstream_pool.stats()
+
+
+@router.get("/replicas", response_model=Dict[str, Any])
+async def get_replica_stats():
+    """
+    Repliche di ogni servizio: stato degli health check, richieste in corso
+    e richieste inoltrate a ciascuna replica.
+    """
+    return load_balancer.stats()
+
+
+@router.get("/hedging", response_model=Dict[str, Any])
+async def get_hedging_stats():
+    """
+    Retry e hedging delle richieste idempotenti: tentativi ripetuti dopo un
+    errore di connessione, richieste duplicate verso un'altra replica, volte
+    in cui ha risposto prima il duplicato e richieste scadute.
+    """
+    return upstream_caller.stats()
+
+@router.get("/auth-cache", response_model=Dict[str, Any])
+async def get_auth_cache_stats():
+    """
+    Statistiche della cache dei token verificati sul gateway.
+    """
+    return edge_authenticator.stats()
+
+@router.get("/cache", response_model=Dict[str, Any])
+async def get_cache_stats():
+    """
+    Statistiche della cache delle risposte dei cataloghi.
+    """
+    return response_cache.stats()
+
+
+@router.get("/coalescing", response_model=Dict[str, Any])
+async def get_coalescing_stats():
+    """
+    Statistiche della coalescenza delle richieste: chiamate effettive ai
+    servizi, richieste servite condividendo una chiamata e rapporto tra le due.
+    """
+    return request_coalescer.stats()
+
+
+@router.get("/breakers", response_model=Dict[str, Any])
+async def get_breaker_stats():
+    """
+    Stato dei circuit breaker e dei bulkhead per ogni servizio: stato del
+    circuito, quota di errori e di chiamate lente nella finestra corrente,
+    richieste in corso e richieste rifiutate.
+    """
+    return upstream_guards.stats()
+
+
+@router.get("/rate-limit", response_model=Dict[str, Any])
+async def get_rate_limit_stats():
+    """
+    Budget del rate limiter per classe di percorsi e richieste consentite o
+    rifiutate (429) dall'avvio.
+    """
+    return rate_limiter.stats()
+
+
+@router.get("/access-log", response_model=Dict[str, Any])
+async def get_access_log_stats():
+    """
+    Stato dell'access log: record in coda, scritti, scartati per coda piena
+    ed esclusi dal campionamento.
+    """
+    return access_log.stats()
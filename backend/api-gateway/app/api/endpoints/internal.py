@@ -0,0 +1,43 @@
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+
+from app.core.config import settings
+from app.core.security import edge_authenticator
+from app.schemas.auth_event import AuthEvent
+
+router = APIRouter()
+
+
+@router.post("/auth-events")
+async def receive_auth_event(
+    event: AuthEvent,
+    x_service_token: Optional[str] = Header(None),
+) -> Dict[str, Any]:
+    """
+    Riceve dall'auth-service gli eventi di logout e disattivazione: da quel
+    momento il gateway rifiuta il token revocato, o i token dell'utente
+    disattivato emessi fino ad allora, anche se la firma è ancora valida.
+    Accessibile solo con il token di servizio.
+    """
+    if x_service_token != settings.SERVICE_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token del servizio non valido",
+        )
+
+    if event.event == "user_deactivated":
+        if not event.user_id:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="user_id mancante",
+            )
+        return {"event": event.event, "invalidated": edge_authenticator.deactivate_user(event.user_id)}
+
+    if not event.token_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="token_hash mancante",
+        )
+    edge_authenticator.revoke(event.token_hash, event.exp)
+    return {"event": event.event, "invalidated": 1}
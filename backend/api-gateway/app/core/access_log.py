@@ -0,0 +1,115 @@
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Logger su cui il thread di scrittura emette una riga JSON per richiesta
+access_logger = logging.getLogger("app.access")
+
+# Segnale di chiusura per il thread di scrittura
+_STOP = object()
+
+
+class AccessLog:
+    """
+    Access log strutturato e campionato.
+
+    Sul percorso della richiesta viene solo costruito un dizionario e messo
+    in una coda in memoria (senza attese: se la coda è piena il record viene
+    scartato e contato). Un thread in background serializza i record in JSON
+    e li scrive, così l'I/O del log non blocca l'event loop.
+    Gli errori (status >= 400) e le richieste lente vengono sempre registrati;
+    le altre con probabilità ACCESS_LOG_SAMPLE_RATE.
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=settings.ACCESS_LOG_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+
+    def should_log(self, status_code: int, duration: float) -> bool:
+        if status_code >= 400 or duration >= settings.ACCESS_LOG_SLOW_SECONDS:
+            return True
+        return random.random() < settings.ACCESS_LOG_SAMPLE_RATE
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Accoda un record; non blocca mai."""
+        if not settings.ACCESS_LOG_ENABLED:
+            return
+        if not self.should_log(entry["status"], entry["duration_ms"] / 1000):
+            self.sampled_out += 1
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            try:
+                access_logger.info(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+                self.written += 1
+            except Exception:
+                logger.exception("Errore nella scrittura dell'access log")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Scrive i record ancora in coda e ferma il thread."""
+        if self._thread is None:
+            return
+        # put bloccante: il segnale di chiusura non deve andare perso
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "sample_rate": settings.ACCESS_LOG_SAMPLE_RATE,
+        }
+
+
+def build_entry(
+    method: str,
+    path: str,
+    status_code: int,
+    duration: float,
+    client: Optional[str],
+    state: Any,
+    cache_status: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Record dell'access log; `state` è `request.state`, dove il proxy annota servizio e utente."""
+    return {
+        "ts": round(time.time(), 3),
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 2),
+        "service": getattr(state, "upstream_service", None),
+        "user_id": getattr(state, "user_id", None),
+        "cache": cache_status,
+        "client": client,
+    }
+
+
+access_log = AccessLog()
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import random
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.upstream import upstream_pool
+
+logger = logging.getLogger(__name__)
+
+REPLICA_HEALTHY = registry.gauge(
+    "upstream_replica_healthy",
+    "1 se la replica è in rotazione, 0 se esclusa dagli health check",
+    ("service", "replica"),
+)
+
+
+class Replica:
+    """Una replica di un servizio con le richieste in corso e lo stato di salute."""
+
+    def __init__(self, service: str, url: str) -> None:
+        self.service = service
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+        self.last_error: Optional[str] = None
+        REPLICA_HEALTHY.set(1, service, url)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class ReplicaSet:
+    """
+    Repliche di un servizio. Ogni richiesta va alla replica in rotazione con
+    meno richieste in corso ("least_outstanding") oppure alla più scarica tra
+    due estratte a caso ("p2c"). Se nessuna replica è in rotazione si usano
+    comunque tutte: il circuit breaker del servizio decide se rifiutare.
+    """
+
+    def __init__(self, name: str, urls: List[str]) -> None:
+        self.name = name
+        self.replicas = [Replica(name, url) for url in urls]
+
+    def choose(self, exclude: Sequence[Replica] = ()) -> Replica:
+        """
+        Replica per la prossima richiesta, evitando se possibile quelle in
+        `exclude` (es. già tentate dalla stessa richiesta).
+        """
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        candidates = [replica for replica in healthy if replica not in exclude] or healthy or self.replicas
+        return self._pick(candidates)
+
+    def alternative(self, exclude: Sequence[Replica]) -> Optional[Replica]:
+        """Replica in rotazione diversa da quelle in `exclude`, o None se non ce ne sono."""
+        candidates = [replica for replica in self.replicas if replica.healthy and replica not in exclude]
+        return self._pick(candidates) if candidates else None
+
+    def _pick(self, candidates: List[Replica]) -> Replica:
+        if len(candidates) == 1:
+            return candidates[0]
+        if settings.LOAD_BALANCER_STRATEGY == "p2c":
+            first, second = random.sample(candidates, 2)
+            return first if first.outstanding <= second.outstanding else second
+        lowest = min(replica.outstanding for replica in candidates)
+        # A parità di carico si sceglie a caso, per non favorire la prima replica
+        return random.choice([replica for replica in candidates if replica.outstanding == lowest])
+
+    @contextmanager
+    def track(self, replica: Replica) -> Iterator[Replica]:
+        """Conta la richiesta tra quelle in corso sulla replica finché non termina."""
+        replica.outstanding += 1
+        replica.requests += 1
+        try:
+            yield replica
+        finally:
+            replica.outstanding -= 1
+
+    def record_success(self, replica: Replica) -> None:
+        replica.consecutive_failures = 0
+        replica.consecutive_successes += 1
+        if not replica.healthy and replica.consecutive_successes >= settings.HEALTH_CHECK_HEALTHY_THRESHOLD:
+            replica.healthy = True
+            replica.last_error = None
+            REPLICA_HEALTHY.set(1, self.name, replica.url)
+            logger.info("Replica %s di %s di nuovo in rotazione", replica.url, self.name)
+
+    def record_failure(self, replica: Replica, error: str) -> None:
+        replica.consecutive_successes = 0
+        replica.consecutive_failures += 1
+        replica.last_error = error
+        if replica.healthy and replica.consecutive_failures >= settings.HEALTH_CHECK_UNHEALTHY_THRESHOLD:
+            replica.healthy = False
+            REPLICA_HEALTHY.set(0, self.name, replica.url)
+            logger.warning("Replica %s di %s esclusa dalla rotazione: %s", replica.url, self.name, error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": sum(1 for replica in self.replicas if replica.healthy),
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
+
+
+class LoadBalancer:
+    """
+    Repliche dei servizi, indicizzate per l'URL del servizio usato nella
+    tabella di routing (es. settings.QUIZ_SERVICE_URL).
+
+    Per i servizi con più repliche un task in background esegue ogni
+    HEALTH_CHECK_INTERVAL secondi una GET su HEALTH_CHECK_PATH di ciascuna
+    replica, con il client del pool upstream: una risposta 5xx o un errore di
+    rete conta come controllo fallito.
+    """
+
+    def __init__(self) -> None:
+        self._sets: Dict[str, ReplicaSet] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.configure(settings.UPSTREAM_SERVICES, settings.UPSTREAM_REPLICAS)
+
+    def configure(self, services: Dict[str, str], replicas: Dict[str, List[str]]) -> None:
+        self._sets = {
+            base_url: ReplicaSet(name, replicas.get(name) or [base_url])
+            for name, base_url in services.items()
+        }
+
+    def get(self, base_url: str) -> ReplicaSet:
+        replica_set = self._sets.get(base_url)
+        if replica_set is None:
+            replica_set = ReplicaSet(base_url, [base_url])
+            self._sets[base_url] = replica_set
+        return replica_set
+
+    def _probed_sets(self) -> List[ReplicaSet]:
+        return [replica_set for replica_set in self._sets.values() if len(replica_set.replicas) > 1]
+
+    async def probe(self, replica_set: ReplicaSet, replica: Replica) -> bool:
+        client = upstream_pool.get_client(replica.url)
+        try:
+            response = await client.get(
+                f"{replica.url}{settings.HEALTH_CHECK_PATH}", timeout=settings.HEALTH_CHECK_TIMEOUT
+            )
+        except httpx.RequestError as exc:
+            replica_set.record_failure(replica, f"{type(exc).__name__}: {exc}")
+            return False
+        if response.status_code >= 500:
+            replica_set.record_failure(replica, f"HTTP {response.status_code}")
+            return False
+        replica_set.record_success(replica)
+        return True
+
+    async def check_all(self) -> None:
+        """Un giro di health check su tutte le repliche, in parallelo."""
+        await asyncio.gather(*(
+            self.probe(replica_set, replica)
+            for replica_set in self._probed_sets()
+            for replica in replica_set.replicas
+        ))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check_all()
+            except Exception:
+                logger.exception("Errore negli health check delle repliche")
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
+
+    async def start(self) -> None:
+        if settings.HEALTH_CHECK_ENABLED and self._probed_sets() and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "strategy": settings.LOAD_BALANCER_STRATEGY,
+            "services": {replica_set.name: replica_set.stats() for replica_set in self._sets.values()},
+        }
+
+    def reset(self) -> None:
+        self.configure(settings.UPSTREAM_SERVICES, settings.UPSTREAM_REPLICAS)
+
+
+load_balancer = LoadBalancer()
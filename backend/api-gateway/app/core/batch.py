@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.tracing import inject
+from app.schemas.batch import BatchRequestItem, BatchResponseItem
+
+logger = logging.getLogger(__name__)
+
+# Header della richiesta batch da non copiare nelle sotto-richieste
+_OUTER_ONLY_HEADERS = frozenset(["content-length", "content-type", "transfer-encoding", "expect", "accept-encoding"])
+# Header delle sotto-risposte non significativi nel risultato aggregato
+_DROPPED_RESPONSE_HEADERS = frozenset(["content-length", "transfer-encoding", "connection", "date", "server"])
+
+
+def _sub_request_scope(request: Request, item: BatchRequestItem, body: bytes) -> Dict[str, Any]:
+    url = urlsplit(item.path)
+    headers: Dict[str, str] = {
+        key.decode("latin-1"): value.decode("latin-1")
+        for key, value in request.scope["headers"]
+        if key.decode("latin-1").lower() not in _OUTER_ONLY_HEADERS
+    }
+    # Gli header della sotto-richiesta prevalgono su quelli della richiesta batch;
+    # i corpi non vengono compressi perché sono inclusi nella risposta JSON
+    for key, value in item.headers.items():
+        headers[key.lower()] = value
+    headers["accept-encoding"] = "identity"
+    # Le sotto-richieste sono figlie dello span della richiesta batch
+    headers = inject(headers)
+    if body:
+        headers.setdefault("content-type", "application/json")
+        headers["content-length"] = str(len(body))
+
+    return {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.method,
+        "scheme": request.scope.get("scheme", "http"),
+        "path": url.path,
+        "raw_path": url.path.encode("utf-8"),
+        "query_string": url.query.encode("latin-1"),
+        "root_path": request.scope.get("root_path", ""),
+        "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()],
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+    }
+
+
+def _decode_body(body: bytes, content_type: str) -> Any:
+    if not body:
+        return None
+    if "json" in content_type:
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", errors="replace")
+
+
+async def dispatch_one(request: Request, item: BatchRequestItem) -> BatchResponseItem:
+    """
+    Esegue una sotto-richiesta passando dall'applicazione del gateway in
+    processo: autenticazione, rate limiting, cache, circuit breaker e pool
+    di connessioni sono gli stessi di una richiesta diretta.
+    """
+    body = json.dumps(item.body).encode("utf-8") if item.body is not None else b""
+    scope = _sub_request_scope(request, item, body)
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if sent:
+            # Nessuna disconnessione: la sotto-richiesta termina con la risposta
+            await asyncio.Event().wait()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status = 500
+    headers: List[Tuple[str, str]] = []
+    chunks: List[bytes] = []
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status, headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers = [(key.decode("latin-1"), value.decode("latin-1")) for key, value in message.get("headers", [])]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        logger.exception("Errore nella sotto-richiesta %s %s", item.method, item.path)
+        return BatchResponseItem(id=item.id, status=500, body={"detail": "Errore interno del server"})
+
+    response_headers = {key.lower(): value for key, value in headers if key.lower() not in _DROPPED_RESPONSE_HEADERS}
+    return BatchResponseItem(
+        id=item.id,
+        status=status,
+        headers=response_headers,
+        body=_decode_body(b"".join(chunks), response_headers.get("content-type", "")),
+    )
+
+
+async def dispatch_batch(request: Request, items: List[BatchRequestItem]) -> List[BatchResponseItem]:
+    """Esegue le sotto-richieste in parallelo, con al massimo BATCH_MAX_CONCURRENCY alla volta."""
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+    async def run(item: BatchRequestItem) -> BatchResponseItem:
+        async with semaphore:
+            return await dispatch_one(request, item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
@@ -0,0 +1,224 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Response
+
+from app.core.compression import available_encodings, compress, is_compressible, negotiate, weak_etag
+from app.core.config import settings
+from app.core.routing import RouteTable
+
+# Header della risposta che non vengono salvati in cache
+_UNCACHED_HEADERS = frozenset(["content-length", "date", "set-cookie", "etag"])
+
+
+def make_etag(body: bytes) -> str:
+    """ETag forte calcolato sul corpo della risposta."""
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Confronto debole tra If-None-Match e l'ETag (RFC 7232, sezione 3.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str, cache_status: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "X-Cache": cache_status})
+
+
+class CachedResponse:
+    """
+    Risposta salvata in cache. `encoded` contiene il corpo già compresso per
+    ogni codifica supportata: la compressione avviene una volta sola, al
+    salvataggio, e non a ogni richiesta.
+    """
+
+    __slots__ = ("status_code", "headers", "body", "encoded", "etag", "expires_at", "service", "size")
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: List[Tuple[str, str]],
+        body: bytes,
+        etag: str,
+        expires_at: float,
+        service: str,
+        encoded: Optional[Dict[str, bytes]] = None,
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.encoded = encoded or {}
+        self.etag = etag
+        self.expires_at = expires_at
+        self.service = service
+        self.size = (
+            len(body)
+            + sum(len(data) for data in self.encoded.values())
+            + sum(len(key) + len(value) for key, value in headers)
+        )
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        return weak_etag(self.etag) if encoding in self.encoded else self.etag
+
+    def to_response(self, cache_status: str, encoding: Optional[str] = None) -> Response:
+        body = self.encoded.get(encoding, self.body)
+        response = Response(content=body, status_code=self.status_code)
+        for key, value in self.headers:
+            response.headers.append(key, value)
+        if encoding in self.encoded:
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Vary"] = "Accept-Encoding"
+        response.headers["ETag"] = self.etag_for(encoding)
+        response.headers["X-Cache"] = cache_status
+        return response
+
+
+class ResponseCache:
+    """
+    Cache LRU delle risposte GET dei cataloghi, limitata in byte.
+
+    Le regole associano un TTL ai percorsi: le chiavi che terminano con "*"
+    sono prefissi, le altre percorsi esatti. La chiave di cache comprende
+    percorso, query string normalizzata e ruolo dell'utente (più l'id utente
+    per i percorsi in `vary_by_user`, la cui risposta dipende dal chiamante).
+    """
+
+    def __init__(
+        self,
+        route_ttls: Dict[str, int],
+        vary_by_user: Iterable[str],
+        max_bytes: int,
+        max_entry_bytes: int,
+    ) -> None:
+        self._exact = {path: ttl for path, ttl in route_ttls.items() if not path.endswith("*")}
+        self._prefixes = RouteTable({path[:-1]: ttl for path, ttl in route_ttls.items() if path.endswith("*")})
+        self._vary_by_user = RouteTable({prefix: True for prefix in vary_by_user})
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def ttl_for(self, path: str) -> Optional[int]:
+        """TTL configurato per il percorso, o None se non è cacheable."""
+        ttl = self._exact.get(path)
+        if ttl is None:
+            ttl = self._prefixes.lookup(path)
+        return ttl
+
+    def make_key(self, path: str, query_items: Iterable[Tuple[str, str]], role: str, user_id: str) -> str:
+        query = "&".join(f"{key}={value}" for key, value in sorted(query_items))
+        key = f"{role}|{path}?{query}"
+        if self._vary_by_user.lookup(path):
+            key = f"{user_id}|{key}"
+        return key
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, response: Response, ttl: int, service: str) -> Optional[CachedResponse]:
+        """
+        Salva una risposta bufferizzata con status 200. Le risposte in
+        streaming, troppo grandi o con Set-Cookie/no-store non vengono salvate.
+        """
+        body = getattr(response, "body", None)
+        if response.status_code != 200 or body is None or len(body) > self.max_entry_bytes:
+            return None
+        if "set-cookie" in response.headers or "no-store" in response.headers.get("cache-control", ""):
+            return None
+
+        etag = response.headers.get("etag") or make_etag(body)
+        headers = [(key.decode("latin-1"), value.decode("latin-1")) for key, value in response.raw_headers]
+        headers = [(name, value) for name, value in headers if name.lower() not in _UNCACHED_HEADERS]
+        encoded: Dict[str, bytes] = {}
+        if settings.COMPRESSION_ENABLED and len(body) >= settings.COMPRESSION_MIN_SIZE and is_compressible(response):
+            encoded = {encoding: compress(body, encoding) for encoding in available_encodings()}
+        entry = CachedResponse(200, headers, body, etag, time.monotonic() + ttl, service, encoded)
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+        return entry
+
+    def respond(
+        self,
+        entry: CachedResponse,
+        if_none_match: Optional[str],
+        cache_status: str = "HIT",
+        accept_encoding: Optional[str] = None,
+    ) -> Response:
+        """
+        Risposta per il client: 304 se il suo ETag è ancora valido, altrimenti
+        il corpo salvato, già compresso se il client accetta la codifica.
+        """
+        encoding = negotiate(accept_encoding)
+        if etag_matches(if_none_match, entry.etag):
+            self.not_modified += 1
+            return not_modified(entry.etag_for(encoding), cache_status)
+        return entry.to_response(cache_status, encoding)
+
+    def invalidate_service(self, service: str) -> int:
+        """Rimuove le risposte di un servizio (dopo una scrittura su quel servizio)."""
+        keys = [key for key, entry in self._entries.items() if entry.service == service]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+response_cache = ResponseCache(
+    route_ttls=settings.CACHE_ROUTE_TTLS,
+    vary_by_user=settings.CACHE_VARY_BY_USER,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    max_entry_bytes=settings.CACHE_MAX_ENTRY_BYTES,
+)
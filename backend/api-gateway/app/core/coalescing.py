@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Response
+
+from app.core.config import settings
+from app.core.routing import RouteTable
+
+
+class SharedResponse:
+    """Copia di una risposta bufferizzata da restituire a più client."""
+
+    __slots__ = ("status_code", "headers", "body")
+
+    def __init__(self, response: Response) -> None:
+        self.status_code = response.status_code
+        self.headers: List[Tuple[bytes, bytes]] = list(response.raw_headers)
+        self.body: bytes = response.body
+
+    def to_response(self) -> Response:
+        response = Response(status_code=self.status_code)
+        response.body = self.body
+        response.raw_headers = list(self.headers)
+        return response
+
+
+class RequestCoalescer:
+    """
+    Coalescenza "single-flight" delle GET idempotenti.
+
+    Le richieste concorrenti con la stessa chiave (metodo, percorso, query e
+    identità) condividono un'unica chiamata al servizio: la prima esegue la
+    richiesta, le altre ne attendono il risultato. Solo le risposte
+    bufferizzate possono essere condivise; per quelle in streaming ogni
+    richiesta in attesa esegue la propria chiamata.
+    """
+
+    def __init__(self, routes: Dict[str, str]) -> None:
+        # Per ogni prefisso: granularità dell'identità ("role" o "user")
+        self._routes = RouteTable({prefix: (prefix, scope) for prefix, scope in routes.items()})
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def make_key(
+        self,
+        method: str,
+        path: str,
+        query_items: Iterable[Tuple[str, str]],
+        identity: Optional[Any],
+        authorization: Optional[str],
+    ) -> Optional[str]:
+        """Chiave di coalescenza, o None se il percorso non l'ha abilitata."""
+        rule = self._routes.lookup(path)
+        if rule is None:
+            return None
+        prefix, scope = rule
+        if identity is not None:
+            identity_key = identity.role if scope == "role" else f"{identity.role}:{identity.user_id}"
+        else:
+            # Senza identità verificata si considera uguale solo lo stesso token
+            identity_key = hashlib.sha256((authorization or "").encode("utf-8")).hexdigest()
+        query = "&".join(f"{key}={value}" for key, value in sorted(query_items))
+        return f"{prefix}|{method}|{identity_key}|{path}?{query}"
+
+    def _route_stats(self, key: str) -> Dict[str, int]:
+        prefix = key.split("|", 1)[0]
+        return self._stats.setdefault(prefix, {"upstream_calls": 0, "coalesced": 0})
+
+    async def run(self, key: str, fetch: Callable[[], Awaitable[Response]]) -> Response:
+        """Esegue `fetch` oppure attende la chiamata già in corso con la stessa chiave."""
+        stats = self._route_stats(key)
+        future = self._inflight.get(key)
+        if future is not None:
+            stats["coalesced"] += 1
+            result = await asyncio.shield(future)
+            if isinstance(result, SharedResponse):
+                return result.to_response()
+            if isinstance(result, Exception):
+                raise result
+            # Risposta non condivisibile o richiesta principale annullata
+            stats["upstream_calls"] += 1
+            return await fetch()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        stats["upstream_calls"] += 1
+        result: Any = None
+        try:
+            response = await fetch()
+            if getattr(response, "body", None) is not None:
+                result = SharedResponse(response)
+            return response
+        except Exception as exc:
+            result = exc
+            raise
+        finally:
+            del self._inflight[key]
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        upstream_calls = sum(route["upstream_calls"] for route in self._stats.values())
+        coalesced = sum(route["coalesced"] for route in self._stats.values())
+        total = upstream_calls + coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": upstream_calls,
+            "coalesced": coalesced,
+            "coalescing_ratio": round(coalesced / total, 4) if total else 0.0,
+            "routes": self._stats,
+        }
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+request_coalescer = RequestCoalescer(settings.COALESCE_ROUTES)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import string
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request
+
+from app.core.batch import dispatch_one
+from app.core.config import settings
+from app.schemas.batch import BatchRequestItem
+from app.schemas.composition import ComponentError, CompositionResponse
+
+logger = logging.getLogger(__name__)
+
+
+class Component:
+    """Una GET del documento composto, con timeout e valore di ripiego."""
+
+    def __init__(self, name: str, spec: Dict[str, Any]) -> None:
+        path = spec.get("path")
+        if not isinstance(path, str) or not path.startswith("/api/") or path.startswith(("/api/batch", "/api/compose")):
+            raise ValueError(f"Componente '{name}': il percorso deve iniziare con /api/ e non essere composto")
+        self.name = name
+        self.path = path
+        self.timeout = float(spec.get("timeout", settings.COMPOSE_DEFAULT_TIMEOUT))
+        self.default = spec.get("default")
+        self.required = bool(spec.get("required", False))
+        self.variables = [field for _, field, _, _ in string.Formatter().parse(path) if field]
+
+    def render_path(self, variables: Mapping[str, str]) -> str:
+        missing = [name for name in self.variables if name not in variables]
+        if missing:
+            raise KeyError(missing[0])
+        return self.path.format_map({name: quote(str(variables[name]), safe="") for name in self.variables})
+
+
+class Composition:
+    def __init__(self, name: str, components: Dict[str, Dict[str, Any]]) -> None:
+        if not components:
+            raise ValueError(f"Composizione '{name}' senza componenti")
+        self.name = name
+        self.components = [Component(key, spec) for key, spec in components.items()]
+
+
+async def _fetch(request: Request, component: Component, variables: Mapping[str, str]) -> Tuple[Any, Optional[ComponentError]]:
+    try:
+        path = component.render_path(variables)
+    except KeyError as exc:
+        return component.default, ComponentError(status=400, detail=f"Parametro mancante: {exc.args[0]}")
+
+    item = BatchRequestItem(id=component.name, method="GET", path=path)
+    try:
+        result = await asyncio.wait_for(dispatch_one(request, item), timeout=component.timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Componente %s scaduta dopo %ss", component.name, component.timeout)
+        return component.default, ComponentError(status=504, detail="Timeout")
+
+    if result.status >= 400:
+        detail = result.body.get("detail") if isinstance(result.body, dict) else result.body
+        return component.default, ComponentError(status=result.status, detail=detail)
+    return result.body, None
+
+
+class CompositionEngine:
+    """
+    Endpoint aggregati definiti in configurazione (COMPOSITIONS).
+
+    Le componenti vengono richieste in parallelo passando dall'applicazione
+    del gateway, come le sotto-richieste di /api/batch, e unite in un unico
+    documento. Un client ottiene così con una chiamata ciò che prima
+    richiedeva una chiamata per componente.
+    """
+
+    def __init__(self, compositions: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        self._compositions = {name: Composition(name, components) for name, components in compositions.items()}
+
+    def get(self, name: str) -> Optional[Composition]:
+        return self._compositions.get(name)
+
+    async def compose(
+        self, request: Request, composition: Composition, variables: Mapping[str, str]
+    ) -> Tuple[CompositionResponse, bool]:
+        """Documento composto e True se tutte le componenti obbligatorie sono riuscite."""
+        results = await asyncio.gather(*(
+            _fetch(request, component, variables) for component in composition.components
+        ))
+        document = CompositionResponse()
+        complete = True
+        for component, (data, error) in zip(composition.components, results):
+            document.data[component.name] = data
+            if error is not None:
+                document.errors[component.name] = error
+                complete = complete and not component.required
+        return document, complete
+
+
+composition_engine = CompositionEngine(settings.COMPOSITIONS)
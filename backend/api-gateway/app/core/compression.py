@@ -0,0 +1,128 @@
+import gzip
+import zlib
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli è opzionale: senza il pacchetto si usa solo gzip
+    brotli = None
+
+# Content-Type che vale la pena comprimere (le immagini sono già compresse)
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+
+def available_encodings() -> List[str]:
+    """Codifiche supportate, in ordine di preferenza."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Codifica da usare per il client in base ad Accept-Encoding, o None."""
+    if not settings.COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    best = None
+    best_quality = 0.0
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(response: Response) -> bool:
+    """True se il tipo di contenuto è testuale e la risposta non è già codificata."""
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if "content-encoding" in response.headers:
+        return False
+    content_type = response.headers.get("content-type", "")
+    return content_type.startswith(_COMPRESSIBLE_TYPES)
+
+
+def _add_vary(response: Response) -> None:
+    vary = response.headers.get("vary")
+    if not vary:
+        response.headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        response.headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+def weak_etag(etag: str) -> str:
+    """ETag della rappresentazione compressa: debole, perché i byte sono diversi."""
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+async def _compress_stream(chunks: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        async for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    # wbits=31: formato gzip
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response: Response, accept_encoding: Optional[str]) -> Response:
+    """
+    Comprime la risposta se il client lo accetta e il contenuto lo merita.
+    Le risposte bufferizzate sotto COMPRESSION_MIN_SIZE restano invariate;
+    quelle in streaming vengono compresse chunk per chunk.
+    """
+    encoding = negotiate(accept_encoding)
+    if encoding is None or not is_compressible(response):
+        return response
+
+    if isinstance(response, StreamingResponse):
+        response.body_iterator = _compress_stream(response.body_iterator, encoding)
+        if "content-length" in response.headers:
+            del response.headers["content-length"]
+    else:
+        if len(response.body) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        response.body = compress(response.body, encoding)
+        response.headers["content-length"] = str(len(response.body))
+
+    response.headers["Content-Encoding"] = encoding
+    if "etag" in response.headers:
+        response.headers["ETag"] = weak_etag(response.headers["etag"])
+    _add_vary(response)
+    return response
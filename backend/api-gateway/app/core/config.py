@@ -3,6 +3,12 @@ from typing import List, Dict, Any, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+
+def _url_list(value: str) -> List[str]:
+    """Elenco di URL separati da virgola (es. le repliche di un servizio)."""
+    return [url.strip().rstrip("/") for url in value.split(",") if url.strip()]
+
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Educational App API Gateway"
     API_V1_STR: str = "/api"
@@ -11,16 +17,235 @@ class Settings(BaseSettings):
     SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
     SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
     
-    # Chiave segreta per JWT
+    # Chiave segreta per JWT: deve coincidere con quella usata dall'auth-service per firmare i token
     SECRET_KEY: str = os.getenv("SECRET_KEY", "chiave_segreta_per_sviluppo_da_cambiare_in_produzione")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    JWT_LEEWAY_SECONDS: int = int(os.getenv("JWT_LEEWAY_SECONDS", "10"))
+    
+    # Verifica dei token sul gateway: l'identità verificata viene inoltrata ai
+    # servizi con header X-User-* firmati con IDENTITY_HEADER_SECRET
+    EDGE_AUTH_ENABLED: bool = os.getenv("EDGE_AUTH_ENABLED", "True").lower() == "true"
+    EDGE_AUTH_CACHE_SIZE: int = int(os.getenv("EDGE_AUTH_CACHE_SIZE", "10000"))
+    IDENTITY_HEADER_SECRET: str = os.getenv("IDENTITY_HEADER_SECRET", "shared_identity_secret_for_microservices")
+    # Autenticazione delle chiamate tra servizi (es. gli eventi di logout e
+    # disattivazione inviati dall'auth-service a /api/internal/auth-events)
+    SERVICE_TOKEN: str = os.getenv("SERVICE_TOKEN", "shared_service_token_for_microservices")
+    
+    # Verifica locale dei token di accesso firmati dall'auth-service (RS256):
+    # le chiavi pubbliche (JWKS, di default AUTH_SERVICE_URL/api/auth/jwks)
+    # vengono aggiornate in background ogni JWKS_REFRESH_INTERVAL secondi e
+    # un kid sconosciuto forza un aggiornamento, al più uno ogni
+    # JWKS_MIN_REFRESH_INTERVAL secondi. JWT_ACCEPT_HS256 accetta anche i
+    # token firmati con SECRET_KEY: è disattivato di default e va attivato
+    # esplicitamente solo durante la migrazione, per il tempo di vita dei
+    # token HS256 già emessi (ACCESS_TOKEN_EXPIRE_MINUTES)
+    JWKS_URL: str = os.getenv("JWKS_URL", "")
+    JWKS_REFRESH_INTERVAL: float = float(os.getenv("JWKS_REFRESH_INTERVAL", "300"))
+    JWKS_MIN_REFRESH_INTERVAL: float = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+    JWKS_FETCH_TIMEOUT: float = float(os.getenv("JWKS_FETCH_TIMEOUT", "2"))
+    JWT_ACCEPT_HS256: bool = os.getenv("JWT_ACCEPT_HS256", "False").lower() == "true"
     
     # URL dei servizi
     AUTH_SERVICE_URL: str = os.getenv("AUTH_SERVICE_URL", "http://localhost:8001")
     QUIZ_SERVICE_URL: str = os.getenv("QUIZ_SERVICE_URL", "http://localhost:8002")
     PATH_SERVICE_URL: str = os.getenv("PATH_SERVICE_URL", "http://localhost:8003")
     REWARD_SERVICE_URL: str = os.getenv("REWARD_SERVICE_URL", "http://localhost:8004")
+
+    # Servizi a valle per cui mantenere un pool di connessioni persistente
+    UPSTREAM_SERVICES: Dict[str, str] = {
+        "auth-service": AUTH_SERVICE_URL,
+        "quiz-service": QUIZ_SERVICE_URL,
+        "path-service": PATH_SERVICE_URL,
+        "reward-service": REWARD_SERVICE_URL,
+    }
+
+    # Repliche di ciascun servizio, come URL separati da virgola (es.
+    # QUIZ_SERVICE_REPLICAS="http://quiz-1:8002,http://quiz-2:8002"). Senza la
+    # variabile il servizio ha una sola replica, il suo *_SERVICE_URL
+    UPSTREAM_REPLICAS: Dict[str, List[str]] = {
+        "auth-service": _url_list(os.getenv("AUTH_SERVICE_REPLICAS", AUTH_SERVICE_URL)),
+        "quiz-service": _url_list(os.getenv("QUIZ_SERVICE_REPLICAS", QUIZ_SERVICE_URL)),
+        "path-service": _url_list(os.getenv("PATH_SERVICE_REPLICAS", PATH_SERVICE_URL)),
+        "reward-service": _url_list(os.getenv("REWARD_SERVICE_REPLICAS", REWARD_SERVICE_URL)),
+    }
+    # Scelta della replica: "least_outstanding" (meno richieste in corso)
+    # oppure "p2c" (la più scarica tra due repliche estratte a caso)
+    LOAD_BALANCER_STRATEGY: str = os.getenv("LOAD_BALANCER_STRATEGY", "least_outstanding")
+    
+    # Health check attivi delle repliche (solo per i servizi con più repliche):
+    # una replica esce dalla rotazione dopo HEALTH_CHECK_UNHEALTHY_THRESHOLD
+    # controlli falliti consecutivi e rientra dopo HEALTH_CHECK_HEALTHY_THRESHOLD
+    # riusciti. Anche gli errori di connessione delle richieste contano come fallimenti
+    HEALTH_CHECK_ENABLED: bool = os.getenv("HEALTH_CHECK_ENABLED", "True").lower() == "true"
+    HEALTH_CHECK_PATH: str = os.getenv("HEALTH_CHECK_PATH", "/")
+    HEALTH_CHECK_INTERVAL: float = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+    HEALTH_CHECK_TIMEOUT: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+    HEALTH_CHECK_UNHEALTHY_THRESHOLD: int = int(os.getenv("HEALTH_CHECK_UNHEALTHY_THRESHOLD", "2"))
+    HEALTH_CHECK_HEALTHY_THRESHOLD: int = int(os.getenv("HEALTH_CHECK_HEALTHY_THRESHOLD", "2"))
+
+    # Richieste idempotenti verso i servizi (metodi in RETRY_METHODS e
+    # HEDGE_METHODS; mai POST come /api/quiz-attempts/submit):
+    # - retry con backoff esponenziale e jitter sugli errori di connessione,
+    #   al massimo RETRY_MAX_RETRIES tentativi aggiuntivi;
+    # - hedging: se la risposta non arriva entro il budget del percorso
+    #   (HEDGE_ROUTES, secondi, tipicamente il p95) parte una seconda richiesta
+    #   verso un'altra replica e vince la prima risposta.
+    # Retry e hedging si fermano a UPSTREAM_DEADLINE_SECONDS dall'inizio della richiesta
+    RETRY_ENABLED: bool = os.getenv("RETRY_ENABLED", "True").lower() == "true"
+    RETRY_METHODS: List[str] = ["GET", "HEAD", "OPTIONS"]
+    RETRY_MAX_RETRIES: int = int(os.getenv("RETRY_MAX_RETRIES", "2"))
+    RETRY_BACKOFF_BASE: float = float(os.getenv("RETRY_BACKOFF_BASE", "0.05"))
+    RETRY_BACKOFF_MAX: float = float(os.getenv("RETRY_BACKOFF_MAX", "1"))
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "True").lower() == "true"
+    HEDGE_METHODS: List[str] = ["GET", "HEAD"]
+    HEDGE_ROUTES: Dict[str, float] = {
+        "/api/quiz-templates": 0.3,
+        "/api/path-templates": 0.3,
+        "/api/templates": 0.3,
+        "/api/rewards": 0.3,
+        "/api/quizzes": 0.5,
+        "/api/paths": 0.5,
+    }
+    UPSTREAM_DEADLINE_SECONDS: float = float(os.getenv("UPSTREAM_DEADLINE_SECONDS", "10"))
+
+    # Configurazioni del pool di connessioni verso i servizi
+    UPSTREAM_MAX_CONNECTIONS: int = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    UPSTREAM_KEEPALIVE_EXPIRY: float = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+    UPSTREAM_CONNECT_TIMEOUT: float = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3"))
+    UPSTREAM_READ_TIMEOUT: float = float(os.getenv("UPSTREAM_READ_TIMEOUT", "30"))
+    UPSTREAM_WRITE_TIMEOUT: float = float(os.getenv("UPSTREAM_WRITE_TIMEOUT", "30"))
+    UPSTREAM_POOL_TIMEOUT: float = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "5"))
+    UPSTREAM_HTTP2: bool = os.getenv("UPSTREAM_HTTP2", "False").lower() == "true"
+
+    # Proxy in streaming: i corpi oltre la soglia (o di lunghezza ignota)
+    # vengono inoltrati a chunk invece di essere caricati in memoria
+    PROXY_STREAMING_ENABLED: bool = os.getenv("PROXY_STREAMING_ENABLED", "True").lower() == "true"
+    PROXY_BUFFER_MAX_BYTES: int = int(os.getenv("PROXY_BUFFER_MAX_BYTES", str(64 * 1024)))
+    PROXY_STREAM_CHUNK_SIZE: int = int(os.getenv("PROXY_STREAM_CHUNK_SIZE", str(64 * 1024)))
+
+    # Cache delle risposte GET dei cataloghi (TTL in secondi per percorso).
+    # Le chiavi che terminano con "*" sono prefissi, le altre percorsi esatti:
+    # per /api/rewards/ solo l'elenco, perché gli altri percorsi sono per utente
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+    CACHE_ROUTE_TTLS: Dict[str, int] = {
+        "/api/quiz-templates*": 60,
+        "/api/path-templates*": 60,
+        "/api/templates*": 60,
+        "/api/rewards": 30,
+        "/api/rewards/": 30,
+    }
+    # Prefissi la cui risposta dipende dall'utente e non solo dal ruolo
+    CACHE_VARY_BY_USER: List[str] = ["/api/path-templates"]
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    CACHE_MAX_ENTRY_BYTES: int = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+    
+    # Coalescenza delle GET concorrenti identiche (opt-in per prefisso).
+    # "role": condividono la risposta utenti con lo stesso ruolo (cataloghi);
+    # "user": solo richieste dello stesso utente (risorse per studente)
+    COALESCE_ENABLED: bool = os.getenv("COALESCE_ENABLED", "True").lower() == "true"
+    COALESCE_ROUTES: Dict[str, str] = {
+        "/api/quiz-templates": "role",
+        "/api/templates": "role",
+        "/api/path-templates": "user",
+        "/api/paths": "user",
+        "/api/quizzes": "user",
+    }
+    
+    # Circuit breaker per servizio: si apre quando, sulle ultime
+    # BREAKER_WINDOW_SIZE chiamate (almeno BREAKER_MIN_CALLS), la quota di
+    # errori 5xx/di rete o di chiamate lente supera la soglia
+    BREAKER_ENABLED: bool = os.getenv("BREAKER_ENABLED", "True").lower() == "true"
+    BREAKER_WINDOW_SIZE: int = int(os.getenv("BREAKER_WINDOW_SIZE", "20"))
+    BREAKER_MIN_CALLS: int = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    BREAKER_ERROR_RATE_THRESHOLD: float = float(os.getenv("BREAKER_ERROR_RATE_THRESHOLD", "0.5"))
+    BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "5"))
+    BREAKER_SLOW_CALL_RATE_THRESHOLD: float = float(os.getenv("BREAKER_SLOW_CALL_RATE_THRESHOLD", "0.8"))
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    BREAKER_HALF_OPEN_MAX_CALLS: int = int(os.getenv("BREAKER_HALF_OPEN_MAX_CALLS", "3"))
+    
+    # Bulkhead: richieste contemporanee massime verso ciascun servizio
+    # (BULKHEAD_LIMITS per nome del servizio, es. {"quiz-service": 80})
+    BULKHEAD_MAX_CONCURRENT: int = int(os.getenv("BULKHEAD_MAX_CONCURRENT", "50"))
+    BULKHEAD_LIMITS: Dict[str, int] = {}
+    BULKHEAD_QUEUE_TIMEOUT: float = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT", "0.5"))
+    
+    # Rate limiting con token bucket per classe di percorsi: "rate" token al
+    # secondo, "burst" richieste consecutive al massimo. Bucket per utente
+    # (subject del JWT) o per IP per le richieste senza identità.
+    # Le POST su ".../submit" sono nella classe "submit", i percorsi senza
+    # regola nella classe "read".
+    # Il login ha un bucket per IP e username ("login") e uno per IP
+    # ("login_ip") dimensionato per una classe di 30 studenti dietro lo stesso
+    # NAT che accede tutta insieme; il refresh è per utente ("refresh")
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    RATE_LIMITS: Dict[str, Dict[str, float]] = {
+        "login": {"rate": 0.1, "burst": 5},
+        "login_ip": {"rate": 2, "burst": 60},
+        "refresh": {"rate": 0.2, "burst": 5},
+        "auth": {"rate": 0.5, "burst": 20},
+        "submit": {"rate": 1, "burst": 5},
+        "read": {"rate": 20, "burst": 60},
+        "admin": {"rate": 5, "burst": 20},
+    }
+    RATE_LIMIT_ROUTE_CLASSES: Dict[str, str] = {
+        "/api/auth/login": "login",
+        "/api/auth/register": "auth",
+        "/api/auth/refresh": "refresh",
+        "/gateway": "admin",
+    }
+    # "memory" (singola replica) oppure "redis" (bucket condivisi tra repliche)
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # Usa X-Forwarded-For per l'IP del client (solo dietro un proxy fidato)
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "False").lower() == "true"
+    
+    # Compressione delle risposte (gzip, e brotli se il pacchetto è installato)
+    # negoziata con Accept-Encoding. Le risposte più piccole della soglia non
+    # vengono compresse; quelle in cache sono salvate già compresse.
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    
+    # Access log strutturato (una riga JSON per richiesta, scritta in
+    # background). Errori e richieste lente sono sempre registrati, le
+    # risposte 2xx/3xx con probabilità ACCESS_LOG_SAMPLE_RATE
+    ACCESS_LOG_ENABLED: bool = os.getenv("ACCESS_LOG_ENABLED", "True").lower() == "true"
+    ACCESS_LOG_SAMPLE_RATE: float = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.1"))
+    ACCESS_LOG_SLOW_SECONDS: float = float(os.getenv("ACCESS_LOG_SLOW_SECONDS", "1"))
+    ACCESS_LOG_QUEUE_SIZE: int = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+    
+    # Tracing distribuito: il contesto W3C traceparent viene sempre propagato;
+    # gli span sono esportati in formato OTLP/JSON su file ("file") o verso un
+    # collector OTLP/HTTP ("otlp"), oppure non esportati ("none")
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+    
+    # Endpoint /api/batch: sotto-richieste massime per batch e quante
+    # vengono inoltrate contemporaneamente
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "10"))
+    
+    # Endpoint di composizione (GET /api/compose/{nome}): ogni componente è
+    # una GET verso un percorso del gateway, eseguita in parallelo alle altre
+    # con un proprio timeout. Nei percorsi {user_id} è l'utente del token e gli
+    # altri segnaposto vengono dai parametri della query. Se una componente
+    # fallisce il documento contiene il suo "default" e l'errore in "errors";
+    # solo le componenti "required" rendono fallita l'intera risposta (502)
+    COMPOSE_DEFAULT_TIMEOUT: float = float(os.getenv("COMPOSE_DEFAULT_TIMEOUT", "3"))
+    COMPOSITIONS: Dict[str, Dict[str, Any]] = {
+        "student-home": {
+            "assigned_quizzes": {"path": "/api/quizzes/student/assigned", "default": []},
+            "paths": {"path": "/api/paths/", "default": []},
+            "unredeemed_rewards": {"path": "/api/user-rewards/unredeemed/{user_id}", "default": []},
+            "points": {"path": "/api/rewards/points/user/{user_id}", "default": 0, "timeout": 1.5},
+        },
+    }
     
     # Configurazioni CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000", "*"]
@@ -28,16 +253,16 @@ class Settings(BaseSettings):
     CORS_METHODS: List[str] = ["*"]
     CORS_HEADERS: List[str] = ["*"]
     
-    # Mappatura dei servizi
+    # Mappatura dei servizi: vince sempre il prefisso più lungo che corrisponde
+    # (es. "/api/auth" copre anche "/api/auth/parent", "/api/rewards" copre
+    # "/api/rewards/stats"), indipendentemente dall'ordine delle voci
     SERVICE_ROUTES: Dict[str, str] = {
         "/api/auth": AUTH_SERVICE_URL,
-        "/api/auth/parent": AUTH_SERVICE_URL,  # Aggiungiamo esplicitamente il percorso parent
         "/api/users": AUTH_SERVICE_URL,  # Aggiungiamo il percorso per gli endpoint utente
         "/api/quiz": QUIZ_SERVICE_URL,
         "/api/paths": PATH_SERVICE_URL,
         "/api/path-templates": PATH_SERVICE_URL,
         "/api/rewards": REWARD_SERVICE_URL,
-        "/api/rewards/stats": REWARD_SERVICE_URL,  # Endpoint per statistiche ricompense
         "/api/user-rewards": REWARD_SERVICE_URL,
         "/reward/parent": REWARD_SERVICE_URL,  # Endpoint per ricompense genitore
         "/api/templates": REWARD_SERVICE_URL  # Endpoint per template di ricompense
@@ -48,6 +273,7 @@ class Settings(BaseSettings):
         "/api/auth/login",
         "/api/auth/register",
         "/api/auth/refresh",
+        "/api/auth/logout",
         "/docs",
         "/redoc",
         "/openapi.json",
@@ -0,0 +1,142 @@
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.core.balancer import Replica, ReplicaSet
+from app.core.config import settings
+from app.core.routing import RouteTable
+
+# Errori per cui la richiesta non è arrivata al servizio (o la connessione
+# keep-alive è stata chiusa prima della risposta): si può ritentare
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+
+SendFunction = Callable[[Replica], Awaitable[httpx.Response]]
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, deadline: float) -> None:
+        super().__init__(f"Nessuna risposta entro {deadline:g} secondi")
+        self.deadline = deadline
+
+
+class RequestPolicy:
+    """Tentativi aggiuntivi, attesa prima dell'hedging (None: nessun hedging) e deadline."""
+
+    __slots__ = ("retries", "hedge_delay", "deadline")
+
+    def __init__(self, retries: int, hedge_delay: Optional[float], deadline: float) -> None:
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self.deadline = deadline
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff esponenziale con jitter completo (attempt parte da 0)."""
+    return random.uniform(0, min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+class UpstreamCaller:
+    """
+    Invio delle richieste idempotenti con retry e hedging.
+
+    `send` esegue un singolo tentativo verso una replica e restituisce la
+    risposta non ancora letta; le risposte dei tentativi perdenti vengono
+    chiuse e i tentativi ancora in corso annullati.
+    """
+
+    def __init__(self, hedge_routes: Dict[str, float]) -> None:
+        self._hedge_routes = RouteTable(hedge_routes)
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    def policy_for(self, method: str, path: str, replayable: bool) -> Optional[RequestPolicy]:
+        """Politica per la richiesta; None per le richieste non idempotenti (un solo tentativo)."""
+        if not replayable:
+            return None
+        retries = settings.RETRY_MAX_RETRIES if settings.RETRY_ENABLED and method in settings.RETRY_METHODS else 0
+        hedge_delay = None
+        if settings.HEDGE_ENABLED and method in settings.HEDGE_METHODS:
+            hedge_delay = self._hedge_routes.lookup(path)
+        if not retries and hedge_delay is None:
+            return None
+        return RequestPolicy(retries, hedge_delay, settings.UPSTREAM_DEADLINE_SECONDS)
+
+    async def call(
+        self, replica_set: ReplicaSet, send: SendFunction, policy: Optional[RequestPolicy]
+    ) -> httpx.Response:
+        if policy is None:
+            return await send(replica_set.choose())
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + policy.deadline
+        tried: List[Replica] = []
+        attempt = 0
+        while True:
+            replica = replica_set.choose(exclude=tried)
+            try:
+                return await self._attempt(replica_set, send, replica, policy, deadline)
+            except RETRYABLE_ERRORS:
+                delay = retry_delay(attempt)
+                if attempt >= policy.retries or deadline - loop.time() <= delay:
+                    raise
+                attempt += 1
+                self.retries += 1
+                tried.append(replica)
+                await asyncio.sleep(delay)
+
+    async def _attempt(
+        self, replica_set: ReplicaSet, send: SendFunction, primary: Replica, policy: RequestPolicy, deadline: float
+    ) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        tasks = [asyncio.ensure_future(send(primary))]
+        winner: Optional[asyncio.Future] = None
+        try:
+            if policy.hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=min(policy.hedge_delay, max(0.0, deadline - loop.time())))
+                hedge_replica = replica_set.alternative([primary]) if not done else None
+                if hedge_replica is not None and deadline > loop.time():
+                    self.hedged += 1
+                    tasks.append(asyncio.ensure_future(send(hedge_replica)))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    self.deadline_exceeded += 1
+                    raise DeadlineExceeded(policy.deadline)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        if task is not tasks[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            losers = [task for task in tasks if task is not winner]
+            for task in losers:
+                task.cancel()
+            for result in await asyncio.gather(*losers, return_exceptions=True):
+                if isinstance(result, httpx.Response):
+                    await result.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
+
+    def reset(self) -> None:
+        self.retries = self.hedged = self.hedge_wins = self.deadline_exceeded = 0
+
+
+upstream_caller = UpstreamCaller(settings.HEDGE_ROUTES)
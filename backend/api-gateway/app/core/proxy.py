@@ -0,0 +1,130 @@
+from typing import AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+import httpx
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.core.config import settings
+
+# Header hop-by-hop (RFC 7230, sezione 6.1): valgono solo per la singola
+# connessione e non devono essere inoltrati dal proxy
+HOP_BY_HOP_HEADERS = frozenset([
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+])
+
+
+def filter_headers(
+    headers: Iterable[Tuple[str, str]], exclude: Iterable[str] = ()
+) -> List[Tuple[str, str]]:
+    """
+    Rimuove gli header hop-by-hop, quelli elencati nell'header Connection
+    e quelli indicati in `exclude`. Gli header ripetuti (es. Set-Cookie)
+    vengono mantenuti.
+    """
+    headers = list(headers)
+    dropped = set(HOP_BY_HOP_HEADERS) | {name.lower() for name in exclude}
+    for key, value in headers:
+        if key.lower() == "connection":
+            dropped.update(token.strip().lower() for token in value.split(",") if token.strip())
+    return [(key, value) for key, value in headers if key.lower() not in dropped]
+
+
+def _content_length(headers) -> Optional[int]:
+    try:
+        return int(headers.get("content-length"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_small_body(headers) -> bool:
+    """True se il corpo dichiara una dimensione entro la soglia di buffering."""
+    length = _content_length(headers)
+    return length is not None and length <= settings.PROXY_BUFFER_MAX_BYTES
+
+
+async def request_content(request: Request) -> Union[bytes, AsyncIterator[bytes]]:
+    """
+    Corpo da inoltrare al servizio: i corpi piccoli vengono letti in memoria,
+    quelli grandi o di lunghezza ignota vengono passati come stream.
+    """
+    if not settings.PROXY_STREAMING_ENABLED or is_small_body(request.headers):
+        return await request.body()
+    if "content-length" not in request.headers and "transfer-encoding" not in request.headers:
+        # Nessun corpo dichiarato (tipicamente GET/DELETE)
+        return b""
+    return request.stream()
+
+
+def is_replayable(request: Request) -> bool:
+    """True se il corpo della richiesta può essere inviato più volte (assente o bufferizzato)."""
+    if not settings.PROXY_STREAMING_ENABLED or is_small_body(request.headers):
+        return True
+    return "content-length" not in request.headers and "transfer-encoding" not in request.headers
+
+
+def request_headers(request: Request) -> List[Tuple[str, str]]:
+    """Header della richiesta del client da inoltrare al servizio."""
+    exclude = ["host"]
+    if not settings.PROXY_STREAMING_ENABLED or is_small_body(request.headers):
+        # Il corpo viene bufferizzato: httpx ricalcola Content-Length
+        exclude.append("content-length")
+    return filter_headers(request.headers.items(), exclude=exclude)
+
+
+async def send_upstream(
+    client: httpx.AsyncClient,
+    request: Request,
+    target_url: str,
+    headers: Optional[List[Tuple[str, str]]] = None,
+) -> httpx.Response:
+    """
+    Invia la richiesta al servizio senza leggere il corpo della risposta.
+    Il chiamante deve consumare la risposta con `build_response` (o chiuderla).
+    """
+    upstream_request = client.build_request(
+        method=request.method,
+        url=target_url,
+        content=await request_content(request),
+        headers=headers if headers is not None else request_headers(request),
+        params=request.query_params,
+    )
+    return await client.send(upstream_request, stream=True, follow_redirects=True)
+
+
+async def build_response(upstream_response: httpx.Response) -> Response:
+    """
+    Converte la risposta del servizio in una risposta per il client.
+
+    Le risposte piccole vengono bufferizzate; le altre sono inoltrate chunk per
+    chunk: ogni chunk viene letto dal servizio solo dopo che il precedente è
+    stato inviato al client, così la memoria resta limitata (backpressure).
+    I byte sono inoltrati così come arrivano (senza decodifica), quindi
+    Content-Encoding resta coerente con il corpo.
+    """
+    if not settings.PROXY_STREAMING_ENABLED or is_small_body(upstream_response.headers):
+        try:
+            body = b"".join([chunk async for chunk in upstream_response.aiter_raw()])
+        finally:
+            await upstream_response.aclose()
+        response = Response(content=body, status_code=upstream_response.status_code)
+        for key, value in filter_headers(upstream_response.headers.multi_items(), exclude=["content-length"]):
+            response.headers.append(key, value)
+        return response
+
+    response = StreamingResponse(
+        upstream_response.aiter_raw(chunk_size=settings.PROXY_STREAM_CHUNK_SIZE),
+        status_code=upstream_response.status_code,
+        background=BackgroundTask(upstream_response.aclose),
+    )
+    for key, value in filter_headers(upstream_response.headers.multi_items()):
+        response.headers.append(key, value)
+    return response
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi import Request
+from jose import jwt
+
+from app.core.config import settings
+from app.core.proxy import is_small_body
+from app.core.routing import RouteTable
+
+logger = logging.getLogger(__name__)
+
+# Classe usata per i percorsi senza una regola specifica
+DEFAULT_ROUTE_CLASS = "read"
+
+# Script Lua del token bucket: aggiorna e consuma il bucket in modo atomico
+_REDIS_TOKEN_BUCKET = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated'))
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+if tokens == nil then
+  tokens = burst
+  updated = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, route_class: str, retry_after: float) -> None:
+        super().__init__(f"Limite di richieste superato ({route_class})")
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_seconds(self) -> int:
+        return max(1, math.ceil(self.retry_after))
+
+
+class RateLimitBackend:
+    """Archivio dei bucket. `take` consuma un token e restituisce l'attesa necessaria (0 se consentito)."""
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemoryBackend(RateLimitBackend):
+    """
+    Bucket nella memoria del processo, con un numero massimo di chiavi (LRU).
+    Adatto a un gateway con una sola replica: con più repliche ognuna
+    applica il proprio limite.
+    """
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self._buckets), "max_keys": self.max_keys}
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Bucket condivisi su Redis, per più repliche del gateway.
+    Richiede il pacchetto opzionale `redis`. Se Redis non risponde la
+    richiesta viene lasciata passare (fail-open) e l'errore registrato nel log.
+    """
+
+    def __init__(self, url: str) -> None:
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis richiede il pacchetto 'redis'")
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+        self.errors = 0
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        try:
+            wait = await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time()])
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("Rate limiter Redis non disponibile: %s", exc)
+            return 0.0
+        return float(wait)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"errors": self.errors}
+
+
+def create_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+    return InMemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+
+def client_ip(request: Request) -> str:
+    """Indirizzo del client; X-Forwarded-For solo se il gateway è dietro un proxy fidato."""
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def login_username(request: Request) -> str:
+    """
+    Username del form di login (OAuth2, application/x-www-form-urlencoded),
+    come hash per non conservarlo in chiaro; stringa vuota se assente o se
+    il corpo è troppo grande per essere letto prima dell'inoltro.
+    """
+    if request.method != "POST" or not is_small_body(request.headers):
+        return ""
+    form = parse_qs((await request.body()).decode("utf-8", errors="replace"))
+    username = (form.get("username") or [""])[0].strip().lower()
+    return hashlib.sha256(username.encode("utf-8")).hexdigest()[:32] if username else ""
+
+
+async def refresh_subject(request: Request) -> Optional[str]:
+    """
+    Utente del token di refresh inviato a /api/auth/refresh (firmato con
+    SECRET_KEY); None se il token manca o non è valido.
+    """
+    if request.method != "POST" or not is_small_body(request.headers):
+        return None
+    try:
+        token = json.loads(await request.body())["refresh_token"]
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except (ValueError, KeyError, TypeError, jwt.JWTError):
+        return None
+    if claims.get("type") != "refresh" or not claims.get("sub"):
+        return None
+    return str(claims["sub"])
+
+
+class RateLimiter:
+    """
+    Limitazione delle richieste con token bucket.
+
+    Ogni richiesta appartiene a una classe di percorsi (auth, submit, read,
+    admin) con un budget separato: `rate` token al secondo e al massimo
+    `burst` token accumulati. Il bucket è per utente (subject del JWT) se
+    l'identità è verificata, altrimenti per indirizzo IP.
+
+    Login e refresh arrivano senza token di accesso, spesso da molti utenti
+    dietro lo stesso IP (una classe dietro il NAT della scuola):
+    - login: un bucket per IP e username ("login") più uno per IP, più
+      ampio, che limita i tentativi su molti account ("login_ip");
+    - refresh: un bucket per l'utente del token di refresh ("refresh"),
+      per IP solo se il token non è valido.
+    """
+
+    def __init__(self, route_classes: Dict[str, str], limits: Dict[str, Dict[str, float]]) -> None:
+        self._classes = RouteTable(route_classes)
+        self.limits = limits
+        self.backend: RateLimitBackend = InMemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+        self.allowed: Dict[str, int] = {}
+        self.limited: Dict[str, int] = {}
+
+    def route_class(self, method: str, path: str) -> str:
+        # Invio di quiz e tentativi: POST su percorsi ".../submit"
+        if method == "POST" and path.endswith("/submit"):
+            return "submit"
+        return self._classes.lookup(path) or DEFAULT_ROUTE_CLASS
+
+    async def check_request(self, request: Request, path: str, identity: Optional[Any] = None) -> None:
+        """Applica i limiti della classe del percorso alla richiesta inoltrata."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        route_class = self.route_class(request.method, path)
+        if route_class == "login":
+            ip = client_ip(request)
+            await self.check(request, "login_ip", subject=f"ip:{ip}")
+            await self.check(request, "login", subject=f"ip:{ip}:user:{await login_username(request)}")
+        elif route_class == "refresh":
+            user_id = await refresh_subject(request)
+            await self.check(request, "refresh", subject=f"user:{user_id}" if user_id else None)
+        else:
+            await self.check(request, route_class, identity)
+
+    async def check(
+        self,
+        request: Request,
+        route_class: str,
+        identity: Optional[Any] = None,
+        subject: Optional[str] = None,
+    ) -> None:
+        """
+        Consuma un token dal bucket di `subject` (di default l'utente
+        verificato o l'IP); solleva RateLimitExceeded se il bucket è vuoto.
+        """
+        limit = self.limits.get(route_class)
+        if not settings.RATE_LIMIT_ENABLED or not limit:
+            return
+        if subject is None:
+            subject = f"user:{identity.user_id}" if identity is not None else f"ip:{client_ip(request)}"
+        wait = await self.backend.take(f"{route_class}:{subject}", limit["rate"], limit["burst"])
+        if wait > 0:
+            self.limited[route_class] = self.limited.get(route_class, 0) + 1
+            raise RateLimitExceeded(route_class, wait)
+        self.allowed[route_class] = self.allowed.get(route_class, 0) + 1
+
+    async def start(self) -> None:
+        self.backend = create_backend()
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def reset(self) -> None:
+        self.backend = InMemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+        self.allowed.clear()
+        self.limited.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": settings.RATE_LIMIT_BACKEND,
+            "limits": self.limits,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            **self.backend.stats(),
+        }
+
+
+rate_limiter = RateLimiter(settings.RATE_LIMIT_ROUTE_CLASSES, settings.RATE_LIMITS)
@@ -0,0 +1,219 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailableError(Exception):
+    """Richiesta rifiutata dal gateway senza contattare il servizio."""
+
+    def __init__(self, service: str, reason: str, retry_after: Optional[int] = None) -> None:
+        super().__init__(f"{service}: {reason}")
+        self.service = service
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per un servizio a valle.
+
+    Mantiene l'esito delle ultime chiamate (errori e latenza). Se su almeno
+    `min_calls` chiamate la percentuale di errori o di chiamate lente supera
+    la soglia, il circuito si apre e le richieste vengono rifiutate subito.
+    Dopo `open_seconds` passa in half-open e lascia passare un numero
+    limitato di richieste di prova: se vanno a buon fine si richiude,
+    altrimenti si riapre.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.state = CLOSED
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=settings.BREAKER_WINDOW_SIZE)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self._calls.clear()
+
+    def retry_after(self) -> int:
+        remaining = settings.BREAKER_OPEN_SECONDS - (time.monotonic() - self._opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def before_call(self) -> None:
+        """Solleva UpstreamUnavailableError se il circuito non accetta la richiesta."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < settings.BREAKER_OPEN_SECONDS:
+                self.rejected += 1
+                raise UpstreamUnavailableError(self.name, "circuito aperto", self.retry_after())
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._half_open_in_flight >= settings.BREAKER_HALF_OPEN_MAX_CALLS:
+                self.rejected += 1
+                raise UpstreamUnavailableError(self.name, "circuito in prova (half-open)", 1)
+            self._half_open_in_flight += 1
+
+    def cancel_call(self) -> None:
+        """Annulla una chiamata autorizzata da `before_call` ma non completata."""
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def record(self, success: bool, latency: float) -> None:
+        """Registra l'esito di una chiamata autorizzata da `before_call`."""
+        slow = latency >= settings.BREAKER_SLOW_CALL_SECONDS
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if not success or slow:
+                self._transition(OPEN)
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= settings.BREAKER_HALF_OPEN_MAX_CALLS:
+                self._transition(CLOSED)
+            return
+
+        if self.state != CLOSED:
+            return
+        self._calls.append((success, slow))
+        if len(self._calls) < settings.BREAKER_MIN_CALLS:
+            return
+        failures = sum(1 for ok, _ in self._calls if not ok)
+        slow_calls = sum(1 for _, is_slow in self._calls if is_slow)
+        if (failures / len(self._calls) >= settings.BREAKER_ERROR_RATE_THRESHOLD
+                or slow_calls / len(self._calls) >= settings.BREAKER_SLOW_CALL_RATE_THRESHOLD):
+            self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self._calls)
+        failures = sum(1 for ok, _ in self._calls if not ok)
+        slow_calls = sum(1 for _, is_slow in self._calls if is_slow)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "error_rate": round(failures / calls, 4) if calls else 0.0,
+            "slow_call_rate": round(slow_calls / calls, 4) if calls else 0.0,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after() if self.state == OPEN else None,
+        }
+
+
+class Bulkhead:
+    """Limite alle richieste contemporanee verso un singolo servizio."""
+
+    def __init__(self, name: str, max_concurrent: int) -> None:
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def acquire(self) -> None:
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=settings.BULKHEAD_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise UpstreamUnavailableError(self.name, "troppe richieste contemporanee", 1)
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "rejected": self.rejected,
+        }
+
+
+class GuardedCall:
+    """Singola chiamata protetta da circuit breaker e bulkhead."""
+
+    def __init__(self, guard: "UpstreamGuard") -> None:
+        self._guard = guard
+        self._started_at = 0.0
+        self._success: Optional[bool] = None
+
+    def set_status(self, status_code: int) -> None:
+        """Le risposte 5xx contano come errori del servizio, le 4xx no."""
+        self._success = status_code < 500
+
+    async def __aenter__(self) -> "GuardedCall":
+        breaker = self._guard.breaker
+        if settings.BREAKER_ENABLED:
+            breaker.before_call()
+        try:
+            await self._guard.bulkhead.acquire()
+        except UpstreamUnavailableError:
+            if settings.BREAKER_ENABLED:
+                # La chiamata non è partita: non conta come esito
+                breaker.cancel_call()
+            raise
+        self._started_at = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._guard.bulkhead.release()
+        if not settings.BREAKER_ENABLED:
+            return
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            # Richiesta annullata (es. client disconnesso): non è un errore del servizio
+            self._guard.breaker.cancel_call()
+            return
+        success = exc_type is None and self._success is not False
+        self._guard.breaker.record(success, time.monotonic() - self._started_at)
+
+
+class UpstreamGuard:
+    """Circuit breaker e bulkhead di un servizio."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.bulkhead = Bulkhead(name, settings.BULKHEAD_LIMITS.get(name, settings.BULKHEAD_MAX_CONCURRENT))
+
+    def call(self) -> GuardedCall:
+        return GuardedCall(self)
+
+
+class UpstreamGuards:
+    def __init__(self) -> None:
+        self._guards: Dict[str, UpstreamGuard] = {}
+        self._names = {url: name for name, url in settings.UPSTREAM_SERVICES.items()}
+
+    def get(self, base_url: str) -> UpstreamGuard:
+        guard = self._guards.get(base_url)
+        if guard is None:
+            guard = UpstreamGuard(self._names.get(base_url, base_url))
+            self._guards[base_url] = guard
+        return guard
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            guard.name: {"circuit_breaker": guard.breaker.stats(), "bulkhead": guard.bulkhead.stats()}
+            for guard in self._guards.values()
+        }
+
+    def reset(self) -> None:
+        self._guards.clear()
+
+
+upstream_guards = UpstreamGuards()
@@ -0,0 +1,88 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _TrieNode:
+    __slots__ = ("children", "target", "prefix")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.target: Optional[Any] = None
+        self.prefix: Optional[str] = None
+
+
+class RouteTable:
+    """
+    Tabella di routing compilata in un trie di prefissi.
+
+    La ricerca percorre il path un carattere alla volta e restituisce il
+    servizio associato al prefisso più lungo che corrisponde: il risultato non
+    dipende dall'ordine in cui i prefissi sono definiti e il costo è
+    proporzionale alla lunghezza del path, non al numero di rotte.
+    Come il precedente controllo con `startswith`, il confronto è sui
+    caratteri (es. "/api/quiz" corrisponde anche a "/api/quizzes").
+    """
+
+    def __init__(self, routes: Dict[str, Any]) -> None:
+        self._root = _TrieNode()
+        self.size = 0
+        for prefix, target in routes.items():
+            self._insert(prefix, target)
+        # Coppie (prefisso più generale, prefisso più specifico)
+        self.overlaps: List[Tuple[str, str]] = []
+        # Prefissi che puntano allo stesso servizio di un prefisso più generale
+        self.shadowed: List[Tuple[str, str]] = []
+        self._collect_overlaps(self._root, None)
+
+    def _insert(self, prefix: str, target: Any) -> None:
+        node = self._root
+        for char in prefix:
+            node = node.children.setdefault(char, _TrieNode())
+        if node.target is None:
+            self.size += 1
+        node.target = target
+        node.prefix = prefix
+
+    def _collect_overlaps(self, node: _TrieNode, parent: Optional[_TrieNode]) -> None:
+        if node.target is not None:
+            if parent is not None:
+                if parent.target == node.target:
+                    self.shadowed.append((parent.prefix, node.prefix))
+                else:
+                    self.overlaps.append((parent.prefix, node.prefix))
+            parent = node
+        for child in node.children.values():
+            self._collect_overlaps(child, parent)
+
+    def lookup(self, path: str) -> Optional[Any]:
+        """Servizio associato al prefisso più lungo di `path`, o None."""
+        node = self._root
+        target = node.target
+        for char in path:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.target is not None:
+                target = node.target
+        return target
+
+    def match(self, path: str) -> Optional[Tuple[str, Any]]:
+        """Coppia (prefisso più lungo, servizio) per `path`, o None."""
+        node = self._root
+        best = node if node.target is not None else None
+        for char in path:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.target is not None:
+                best = node
+        return (best.prefix, best.target) if best is not None else None
+
+    def report(self) -> None:
+        """Registra nel log i prefissi sovrapposti o ridondanti."""
+        for general, specific in self.overlaps:
+            logger.info("Rotta '%s' sovrapposta a '%s': prevale la più specifica", specific, general)
+        for general, specific in self.shadowed:
+            logger.warning("Rotta '%s' ridondante: '%s' instrada già allo stesso servizio", specific, general)
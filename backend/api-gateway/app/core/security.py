@@ -0,0 +1,229 @@
+import hashlib
+import hmac
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.jwt_verifier import TokenVerificationError, jwt_verifier
+
+# Header con l'identità verificata dal gateway, inoltrati ai servizi a valle.
+# Quelli inviati dal client vengono sempre rimossi per evitare spoofing.
+USER_ID_HEADER = "X-User-Id"
+USER_ROLE_HEADER = "X-User-Role"
+USER_ROLES_HEADER = "X-User-Roles"
+USER_EXP_HEADER = "X-User-Exp"
+IDENTITY_ISSUED_AT_HEADER = "X-Identity-Issued-At"
+IDENTITY_SIGNATURE_HEADER = "X-Identity-Signature"
+
+IDENTITY_HEADERS = frozenset(name.lower() for name in (
+    USER_ID_HEADER,
+    USER_ROLE_HEADER,
+    USER_ROLES_HEADER,
+    USER_EXP_HEADER,
+    IDENTITY_ISSUED_AT_HEADER,
+    IDENTITY_SIGNATURE_HEADER,
+))
+
+
+class Identity:
+    """Identità estratta da un token di accesso valido."""
+
+    __slots__ = ("user_id", "roles", "exp", "issued_at")
+
+    def __init__(self, user_id: str, roles: List[str], exp: int, issued_at: Optional[int] = None) -> None:
+        self.user_id = user_id
+        self.roles = roles
+        self.exp = exp
+        self.issued_at = issued_at
+
+    @property
+    def role(self) -> str:
+        # Stesso criterio di /api/debug/verify-token dell'auth-service
+        return self.roles[0] if self.roles else "student"
+
+
+def sign_identity(user_id: str, role: str, roles: str, exp: str, issued_at: str) -> str:
+    """Firma HMAC-SHA256 dei campi di identità, verificabile dai servizi a valle."""
+    message = "\n".join([user_id, role, roles, exp, issued_at]).encode("utf-8")
+    return hmac.new(settings.IDENTITY_HEADER_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def identity_headers(identity: Identity) -> List[Tuple[str, str]]:
+    """Header firmati con l'identità dell'utente."""
+    roles = ",".join(identity.roles)
+    exp = str(identity.exp)
+    issued_at = str(int(time.time()))
+    signature = sign_identity(identity.user_id, identity.role, roles, exp, issued_at)
+    return [
+        (USER_ID_HEADER, identity.user_id),
+        (USER_ROLE_HEADER, identity.role),
+        (USER_ROLES_HEADER, roles),
+        (USER_EXP_HEADER, exp),
+        (IDENTITY_ISSUED_AT_HEADER, issued_at),
+        (IDENTITY_SIGNATURE_HEADER, signature),
+    ]
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    """Token dall'header Authorization, se presente."""
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+class EdgeAuthenticator:
+    """
+    Verifica dei token JWT sul gateway, con cache LRU limitata delle identità
+    già decodificate. La chiave della cache è l'hash del token (il token in
+    chiaro non viene conservato) e ogni voce scade insieme al token.
+
+    I servizi a valle si fidano dell'identità inoltrata dal gateway, quindi è
+    qui che vengono rifiutati i token revocati (logout) e quelli degli utenti
+    disattivati, anche se la firma è ancora valida: ogni richiesta, in cache o
+    no, viene confrontata con le revoche e le disattivazioni ricevute.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Identity]" = OrderedDict()
+        # Hash del token revocato -> scadenza della revoca
+        self._revoked: Dict[str, float] = {}
+        # Utente disattivato -> istante della disattivazione
+        self._deactivated: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.denied = 0
+
+    @staticmethod
+    def _cache_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _token_lifetime() -> float:
+        """Durata massima di un token di accesso, tolleranza compresa."""
+        return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + settings.JWT_LEEWAY_SECONDS
+
+    def _deny_reason(self, key: str, identity: Identity) -> Optional[str]:
+        if not self._revoked and not self._deactivated:
+            return None
+        now = time.time()
+        revoked_until = self._revoked.get(key)
+        if revoked_until is not None:
+            if revoked_until >= now:
+                return "Token revocato"
+            del self._revoked[key]
+        deactivated_at = self._deactivated.get(identity.user_id)
+        if deactivated_at is not None:
+            if deactivated_at + self._token_lifetime() < now:
+                # Tutti i token emessi prima della disattivazione sono scaduti
+                del self._deactivated[identity.user_id]
+            elif identity.issued_at is None or identity.issued_at <= deactivated_at:
+                # Senza "iat" (token precedenti al claim) non si può escludere
+                # che il token sia anteriore alla disattivazione
+                return "Utente disattivato"
+        return None
+
+    def _decode(self, token: str) -> Identity:
+        try:
+            # Verifica locale con le chiavi pubbliche (JWKS) dell'auth-service
+            identity = jwt_verifier.verify(token)
+        except TokenVerificationError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token non valido o scaduto",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return Identity(
+            user_id=identity["user_id"], roles=identity["roles"], exp=identity["exp"], issued_at=identity.get("iat")
+        )
+
+    def authenticate(self, token: str) -> Identity:
+        """
+        Restituisce l'identità associata al token.
+        Solleva HTTPException 401 se il token non è valido o è scaduto, se è
+        stato revocato o se l'utente è stato disattivato dopo l'emissione.
+        """
+        key = self._cache_key(token)
+        identity = self._cache.get(key)
+        if identity is not None and identity.exp + settings.JWT_LEEWAY_SECONDS < time.time():
+            del self._cache[key]
+            identity = None
+
+        if identity is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            identity = self._decode(token)
+            self._cache[key] = identity
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        reason = self._deny_reason(key, identity)
+        if reason is not None:
+            self._cache.pop(key, None)
+            self.denied += 1
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=reason,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return identity
+
+    def deactivate_user(self, user_id: str) -> int:
+        """
+        Rifiuta i token dell'utente emessi fino a questo momento e rimuove
+        le sue identità dalla cache; restituisce quante ne ha rimosse.
+        """
+        now = time.time()
+        self._deactivated[user_id] = now
+        # Le disattivazioni i cui token sono ormai tutti scaduti vengono eliminate qui
+        for name in [name for name, at in self._deactivated.items() if at + self._token_lifetime() < now]:
+            del self._deactivated[name]
+        keys = [key for key, identity in self._cache.items() if identity.user_id == user_id]
+        for key in keys:
+            del self._cache[key]
+        return len(keys)
+
+    def revoke(self, key: str, exp: Optional[int] = None) -> None:
+        """
+        Rifiuta il token con hash `key` fino alla sua scadenza (se non nota,
+        fino alla durata massima di un token di accesso).
+        """
+        now = time.time()
+        self._cache.pop(key, None)
+        self._revoked[key] = exp + settings.JWT_LEEWAY_SECONDS if exp else now + self._token_lifetime()
+        for name in [name for name, until in self._revoked.items() if until < now]:
+            del self._revoked[name]
+
+    def clear(self) -> None:
+        """Svuota la cache, le revoche e le disattivazioni e azzera i contatori."""
+        self._cache.clear()
+        self._revoked.clear()
+        self._deactivated.clear()
+        self.hits = 0
+        self.misses = 0
+        self.denied = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revoked": len(self._revoked),
+            "deactivated_users": len(self._deactivated),
+            "denied": self.denied,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+edge_authenticator = EdgeAuthenticator(max_entries=settings.EDGE_AUTH_CACHE_SIZE)
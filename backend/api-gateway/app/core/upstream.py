@@ -0,0 +1,124 @@
+import logging
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamPool:
+    """
+    Pool di client HTTP persistenti, uno per ogni servizio a valle.
+
+    I client vengono creati all'avvio del gateway e chiusi allo spegnimento,
+    in modo che le connessioni TCP verso auth/quiz/path/reward vengano
+    riutilizzate tra una richiesta e l'altra (keep-alive).
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._names: Dict[str, str] = {}
+        # Transport alternativo (es. httpx.MockTransport nei test)
+        self._transport = transport
+
+    def _build_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+        )
+
+    def _build_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=settings.UPSTREAM_CONNECT_TIMEOUT,
+            read=settings.UPSTREAM_READ_TIMEOUT,
+            write=settings.UPSTREAM_WRITE_TIMEOUT,
+            pool=settings.UPSTREAM_POOL_TIMEOUT,
+        )
+
+    def _http2_enabled(self) -> bool:
+        if not settings.UPSTREAM_HTTP2:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("UPSTREAM_HTTP2 attivo ma il pacchetto 'h2' non è installato: uso HTTP/1.1")
+            return False
+        return True
+
+    def _create_client(self) -> httpx.AsyncClient:
+        # Il client è condiviso tra tutti gli utenti: il cookie jar rifiuta ogni
+        # cookie, così un Set-Cookie di una risposta non finisce nelle richieste
+        # di altri utenti. I cookie del client arrivano già nell'header Cookie.
+        return httpx.AsyncClient(
+            limits=self._build_limits(),
+            timeout=self._build_timeout(),
+            http2=self._http2_enabled(),
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            transport=self._transport,
+        )
+
+    async def start(self) -> None:
+        """Crea un client per ciascuna replica dei servizi configurati."""
+        for name, base_url in settings.UPSTREAM_SERVICES.items():
+            replicas = settings.UPSTREAM_REPLICAS.get(name) or [base_url]
+            for index, replica_url in enumerate(replicas, start=1):
+                if replica_url not in self._clients:
+                    self._clients[replica_url] = self._create_client()
+                self._names[replica_url] = name if len(replicas) == 1 else f"{name}#{index}"
+        logger.info("Pool upstream inizializzato per %d servizi", len(self._clients))
+
+    async def close(self) -> None:
+        """Chiude tutti i client e le relative connessioni."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        self._names.clear()
+
+    def get_client(self, base_url: str) -> httpx.AsyncClient:
+        """
+        Restituisce il client associato al servizio indicato.
+
+        Se il servizio non è tra quelli configurati (o il pool non è ancora
+        stato avviato) il client viene creato al primo utilizzo.
+        """
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = self._create_client()
+            self._clients[base_url] = client
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statistiche correnti del pool per ciascun servizio:
+        connessioni in uso, inattive e richieste in attesa di una connessione.
+        """
+        result: Dict[str, Any] = {}
+        for base_url, client in self._clients.items():
+            name = self._names.get(base_url, base_url)
+            result[name] = {"url": base_url, **self._client_stats(client)}
+        return result
+
+    @staticmethod
+    def _client_stats(client: httpx.AsyncClient) -> Dict[str, int]:
+        # httpx non espone pubblicamente lo stato del pool: leggiamo quello di
+        # httpcore in modo difensivo, così un cambio di versione non rompe l'endpoint
+        pool: Optional[Any] = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        waiting = sum(
+            1 for request in getattr(pool, "_requests", []) if getattr(request, "connection", None) is None
+        )
+        return {
+            "connections": len(connections),
+            "in_use": len(connections) - idle,
+            "idle": idle,
+            "waiting": waiting,
+            "max_connections": settings.UPSTREAM_MAX_CONNECTIONS,
+        }
+
+
+upstream_pool = UpstreamPool()
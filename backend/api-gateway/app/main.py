@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request, HTTPException, Response
+from fastapi import FastAPI, Request, HTTPException, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import httpx
@@ -7,6 +7,24 @@ import time
 import uvicorn
 
 from app.core.config import settings
+from app.core.upstream import upstream_pool
+from app.core.balancer import load_balancer
+from app.core.hedging import DeadlineExceeded, upstream_caller
+from app.core.proxy import request_headers, send_upstream, build_response, is_replayable
+from app.core.routing import RouteTable
+from app.core.cache import response_cache
+from app.core.compression import compress_response
+from app.core.access_log import access_log, build_entry
+from app.core.jwt_verifier import setup_jwt_verifier
+from app.core.metrics import observe_upstream, setup_metrics
+from app.core.tracing import SPAN_KIND_CLIENT, format_traceparent, setup_tracing, start_span
+from app.core.coalescing import request_coalescer
+from app.core.resilience import UpstreamUnavailableError, upstream_guards
+from app.core.ratelimit import RateLimitExceeded, rate_limiter
+from app.core.security import IDENTITY_HEADERS, bearer_token, edge_authenticator, identity_headers
+from app.api.endpoints import batch, composition, gateway, internal
+from app.api.dependencies.auth import get_current_admin_identity
+from app.api.dependencies.ratelimit import limit_admin_requests
 
 # Configurazione del logger
 logging.basicConfig(
@@ -33,33 +51,81 @@ app.add_middleware(
     allow_headers=settings.CORS_HEADERS,
 )
 
-# Middleware per il logging delle richieste
+# Avvio e chiusura del pool di connessioni verso i servizi
+@app.on_event("startup")
+async def startup_upstream_pool():
+    await upstream_pool.start()
+    await load_balancer.start()
+    await rate_limiter.start()
+    access_log.start()
+
+@app.on_event("shutdown")
+async def shutdown_upstream_pool():
+    await load_balancer.close()
+    await upstream_pool.close()
+    await rate_limiter.close()
+    access_log.stop()
+
+# Richieste oltre il budget della loro classe di percorsi
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Troppe richieste, riprova più tardi"},
+        headers={"Retry-After": str(exc.retry_after_seconds)},
+    )
+
+# Metriche Prometheus (/metrics): latenza per rotta, richieste in corso,
+# latenza delle chiamate ai servizi
+setup_metrics(app)
+
+# Tracing distribuito: span per richiesta e propagazione di traceparent
+setup_tracing(app, "api-gateway")
+
+# Verifica locale dei token: chiavi pubbliche dell'auth-service aggiornate in background
+setup_jwt_verifier(app)
+
+# Middleware per il logging delle richieste: un record strutturato per
+# richiesta, scritto in background (vedi app.core.access_log)
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    start_time = time.perf_counter()
     response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(f"{request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.4f}s")
+    access_log.record(build_entry(
+        request.method,
+        request.url.path,
+        response.status_code,
+        time.perf_counter() - start_time,
+        request.client.host if request.client else None,
+        request.state,
+        response.headers.get("x-cache"),
+    ))
     return response
 
 # Funzione per verificare se l'endpoint richiede autenticazione
 def requires_auth(path: str) -> bool:
-    return not any(path.startswith(endpoint) for endpoint in settings.PUBLIC_ENDPOINTS)
+    # "/" è pubblico solo come percorso esatto, altrimenti coprirebbe ogni richiesta
+    return not any(
+        path == endpoint if endpoint == "/" else path.startswith(endpoint)
+        for endpoint in settings.PUBLIC_ENDPOINTS
+    )
+
+# Tabella di routing compilata una sola volta all'avvio
+route_table = RouteTable(settings.SERVICE_ROUTES)
+route_table.report()
+
+# Nome del servizio per URL, usato nell'access log
+SERVICE_NAMES = {url: name for name, url in settings.UPSTREAM_SERVICES.items()}
 
 # Funzione per determinare il servizio di destinazione
 def get_target_service(path: str) -> str:
-    # Prima controlliamo percorsi specifici che potrebbero dare problemi
-    if path.startswith('/api/rewards/stats/'):
-        logger.info(f"Routing speciale per percorso nidificato: {path} -> {settings.REWARD_SERVICE_URL}")
-        return settings.REWARD_SERVICE_URL
-        
-    # Gestione normale per tutti gli altri percorsi
-    for prefix, service_url in settings.SERVICE_ROUTES.items():
-        if path.startswith(prefix):
-            return service_url
+    # Prefisso più lungo che corrisponde al percorso
+    service_url = route_table.lookup(path)
+    if service_url is not None:
+        return service_url
             
     # Nessun servizio trovato per questo percorso
-    logger.error(f"Nessun servizio trovato per il percorso: {path}")
+    logger.warning("Nessun servizio trovato per il percorso: %s", path)
     raise HTTPException(status_code=404, detail="Servizio non trovato")
 
 # Endpoint di health check
@@ -67,82 +133,176 @@ def get_target_service(path: str) -> str:
 async def health_check():
     return {"status": "ok", "service": "api-gateway"}
 
+# Endpoint interni del gateway (registrati prima della rotta catch-all)
+app.include_router(
+    gateway.router,
+    prefix="/gateway",
+    tags=["Gateway"],
+    dependencies=[Depends(get_current_admin_identity), Depends(limit_admin_requests)],
+)
+
+# Eventi di logout e disattivazione dall'auth-service (X-Service-Token),
+# prima della rotta catch-all
+app.include_router(internal.router, prefix="/api/internal", tags=["Internal"])
+
+# Richieste multiple in una sola chiamata (prima della rotta catch-all)
+app.include_router(batch.router, prefix="/api/batch", tags=["Batch"])
+
+# Documenti composti da più servizi (prima della rotta catch-all)
+app.include_router(composition.router, prefix="/api/compose", tags=["Composition"])
+
 # Gestione di tutte le richieste API
 @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"])
 async def api_gateway(request: Request, path: str):
     # Costruisci il percorso completo
     full_path = f"/{path}"
     
-    # Log DEBUG dettagliato
-    logger.info(f"API Gateway ricevuto percorso: {full_path}")
+    # Determina il servizio di destinazione
+    target_service = get_target_service(full_path)
+    request.state.upstream_service = SERVICE_NAMES.get(target_service, target_service)
+    # Nelle metriche la rotta è il prefisso configurato, non il percorso
+    request.state.metrics_route = route_table.match(full_path)[0]
     
-    # Caso speciale per le statistiche ricompense
-    if "/api/rewards/stats/" in full_path:
-        logger.info(f"PERCORSO CRITICO RICONOSCIUTO: {full_path}")
-        target_service = settings.REWARD_SERVICE_URL
-        logger.info(f"Reindirizzamento speciale a: {target_service}")
-    else:
-        # Determina il servizio di destinazione
-        try:
-            target_service = get_target_service(full_path)
-            logger.info(f"Servizio target normale: {target_service}")
-        except Exception as e:
-            logger.error(f"Errore nel routing: {e}")
-            raise
-    
-    # Costruisci l'URL di destinazione
+    # URL di destinazione riferito al servizio (la replica è scelta alla chiamata)
     target_url = f"{target_service}{full_path}"
-    logger.info(f"URL finale di destinazione: {target_url}")
     
-    # Crea un nuovo client HTTP
-    async with httpx.AsyncClient() as client:
-        try:
-            # Estrai il corpo della richiesta se presente
-            request_body = await request.body()
-            
-            # Estrai gli header da inoltrare
-            headers = {key: value for key, value in request.headers.items() 
-                      if key.lower() not in ['host', 'content-length']}
-            
-            # Log della richiesta con dettagli header e auth
-            auth_header = headers.get('authorization', 'NESSUNO')
-            auth_present = 'PRESENTE' if auth_header else 'MANCANTE'
-            logger.info(f"Proxy request to: {target_url} - Method: {request.method} - Auth: {auth_present}")
-            
-            # Invia la richiesta al servizio di destinazione
-            response = await client.request(
-                method=request.method,
-                url=target_url,
-                content=request_body,
-                headers=headers,
-                params=request.query_params,
-                cookies=request.cookies,
-                follow_redirects=True
-            )
+    # Estrai gli header da inoltrare (senza header hop-by-hop né header di
+    # identità inviati dal client)
+    headers = [(key, value) for key, value in request_headers(request)
+               if key.lower() not in IDENTITY_HEADERS]
+    accept_encoding = request.headers.get("accept-encoding")
+    if settings.COMPRESSION_ENABLED:
+        # La compressione verso il client è fatta dal gateway: dai servizi
+        # arriva il corpo non compresso, che può essere salvato in cache
+        headers = [(key, value) for key, value in headers if key.lower() != "accept-encoding"]
+        headers.append(("Accept-Encoding", "identity"))
+    
+    # Verifica del token sul gateway: i servizi ricevono l'identità già
+    # verificata e non devono chiamare l'auth-service
+    identity = None
+    if settings.EDGE_AUTH_ENABLED and requires_auth(full_path):
+        token = bearer_token(request)
+        if token:
+            identity = edge_authenticator.authenticate(token)
+            headers.extend(identity_headers(identity))
+            request.state.user_id = identity.user_id
+    
+    # Limite di richieste per utente (o per IP) e classe di percorsi
+    await rate_limiter.check_request(request, full_path, identity)
+    
+    # Cache dei cataloghi: solo GET con identità verificata, perché la
+    # chiave dipende dal ruolo (e per alcuni percorsi dall'utente)
+    cache_key = None
+    cache_ttl = None
+    if settings.CACHE_ENABLED and request.method == "GET" and identity is not None:
+        cache_ttl = response_cache.ttl_for(full_path)
+    if cache_ttl:
+        cache_key = response_cache.make_key(
+            full_path, request.query_params.multi_items(), identity.role, identity.user_id
+        )
+        if "no-cache" not in request.headers.get("cache-control", ""):
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return response_cache.respond(
+                    cached, request.headers.get("if-none-match"), accept_encoding=accept_encoding
+                )
+    
+    # Circuit breaker e bulkhead del servizio
+    guard = upstream_guards.get(target_service)
+    # Repliche del servizio tra cui distribuire le richieste
+    replica_set = load_balancer.get(target_service)
+    
+    # Retry e hedging solo per i metodi idempotenti con corpo ripetibile
+    policy = upstream_caller.policy_for(request.method, full_path, is_replayable(request))
+    
+    async def send_to_replica(replica) -> httpx.Response:
+        replica_url = f"{replica.url}{full_path}"
+        # Usa il client persistente della replica per riutilizzare le connessioni
+        client = upstream_pool.get_client(replica.url)
+        span_attributes = {"http.method": request.method, "http.url": replica_url, "peer.service": guard.name}
+        with start_span(f"{request.method} {guard.name}", SPAN_KIND_CLIENT, span_attributes) as span:
+            # Il servizio riceve il contesto dello span del gateway, non quello del client
+            upstream_headers = [(key, value) for key, value in headers
+                                if key.lower() not in ("traceparent", "tracestate")]
+            upstream_headers.append(("traceparent", format_traceparent(span.context)))
             
-            # Log dettagliato della risposta
-            logger.info(f"Risposta da {target_url}: Status {response.status_code}, Content-Type: {response.headers.get('content-type')}")
+            # Invia la richiesta al servizio di destinazione: il corpo viene
+            # inoltrato in streaming se supera la soglia di buffering
+            start_time = time.perf_counter()
+            try:
+                with replica_set.track(replica):
+                    response = await send_upstream(client, request, replica_url, headers=upstream_headers)
+            except httpx.RequestError as exc:
+                observe_upstream(guard.name, request.method, "error", time.perf_counter() - start_time)
+                if isinstance(exc, httpx.ConnectError):
+                    # Replica non raggiungibile: conta come un health check fallito
+                    replica_set.record_failure(replica, f"{type(exc).__name__}: {exc}")
+                raise
+            observe_upstream(guard.name, request.method, str(response.status_code), time.perf_counter() - start_time)
+            span.set_attribute("http.status_code", response.status_code)
+            return response
+    
+    async def fetch_upstream() -> Response:
+        async with guard.call() as call:
+            response = await upstream_caller.call(replica_set, send_to_replica, policy)
+            call.set_status(response.status_code)
             
-            # Crea la risposta da inviare al client
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.headers.get("content-type")
-            )
+            # Crea la risposta da inviare al client (bufferizzata o in streaming)
+            return await build_response(response)
+    
+    # Le GET identiche concorrenti condividono un'unica chiamata al servizio
+    coalesce_key = None
+    if settings.COALESCE_ENABLED and request.method == "GET":
+        coalesce_key = request_coalescer.make_key(
+            request.method, full_path, request.query_params.multi_items(),
+            identity, request.headers.get("authorization")
+        )
+    
+    try:
+        if coalesce_key is not None:
+            proxied_response = await request_coalescer.run(coalesce_key, fetch_upstream)
+        else:
+            proxied_response = await fetch_upstream()
+        
+        if cache_key is not None:
+            entry = response_cache.put(cache_key, proxied_response, cache_ttl, target_service)
+            if entry is not None:
+                return response_cache.respond(
+                    entry, request.headers.get("if-none-match"), cache_status="MISS", accept_encoding=accept_encoding
+                )
+        elif request.method not in ("GET", "OPTIONS") and proxied_response.status_code < 400:
+            # Una scrittura sul servizio rende obsolete le sue risposte in cache
+            response_cache.invalidate_service(target_service)
         
-        except httpx.RequestError as exc:
-            logger.error(f"Errore durante la richiesta a {target_url}: {exc}")
-            return JSONResponse(
-                status_code=503,
-                content={"detail": f"Errore di comunicazione con il servizio: {str(exc)}"}
-            )
-        except Exception as exc:
-            logger.exception(f"Errore imprevisto: {exc}")
-            return JSONResponse(
-                status_code=500,
-                content={"detail": f"Errore interno del server: {str(exc)}"}
-            )
+        return compress_response(proxied_response, accept_encoding)
+    
+    except UpstreamUnavailableError as exc:
+        # Servizio protetto dal circuit breaker o dal bulkhead: nessuna chiamata effettuata
+        logger.warning("Richiesta a %s rifiutata: %s", target_url, exc)
+        retry_headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after else None
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"Servizio temporaneamente non disponibile: {exc.reason}"},
+            headers=retry_headers,
+        )
+    except DeadlineExceeded as exc:
+        logger.error("Richiesta a %s scaduta: %s", target_url, exc)
+        return JSONResponse(
+            status_code=504,
+            content={"detail": f"Il servizio non ha risposto in tempo: {str(exc)}"}
+        )
+    except httpx.RequestError as exc:
+        logger.error("Errore durante la richiesta a %s: %s", target_url, exc)
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"Errore di comunicazione con il servizio: {str(exc)}"}
+        )
+    except Exception as exc:
+        logger.exception("Errore imprevisto")
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Errore interno del server: {str(exc)}"}
+        )
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field, validator
+from typing import Any, Dict, List, Optional
+
+# Metodi consentiti nelle sotto-richieste
+BATCH_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+# Sotto-richiesta: percorso relativo al gateway (es. "/api/paths/?limit=5")
+class BatchRequestItem(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Optional[Any] = None
+
+    @validator('method')
+    def method_supported(cls, v):
+        v = v.upper()
+        if v not in BATCH_METHODS:
+            raise ValueError(f'Method must be one of: {list(BATCH_METHODS)}')
+        return v
+
+    @validator('path')
+    def path_is_api(cls, v):
+        if not v.startswith('/api/') or v.startswith('/api/batch'):
+            raise ValueError('Path must start with /api/ and cannot be a batch request')
+        return v
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem]
+
+# Risultato di una sotto-richiesta, nello stesso ordine della richiesta
+class BatchResponseItem(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResponseItem]
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict
+
+# Errore di una componente: status della sotto-richiesta (504 se scaduta)
+class ComponentError(BaseModel):
+    status: int
+    detail: Any = None
+
+# Documento composto: dati per componente ed errori delle componenti fallite
+class CompositionResponse(BaseModel):
+    data: Dict[str, Any] = Field(default_factory=dict)
+    errors: Dict[str, ComponentError] = Field(default_factory=dict)
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Benchmark di carico del gateway con servizi a valle simulati.
+
+Avvia in locale un servizio stub per ciascun servizio a valle (latenza,
+dimensione del corpo e status scelti dalla richiesta con gli header
+X-Bench-*), avvia il vero `app.main:app` con uvicorn in un processo separato
+e lo carica con un generatore di richieste concorrenti. Per ogni scenario
+riporta throughput e latenza p50/p95/p99, sia attraverso il gateway sia
+chiamando direttamente lo stub: la differenza è il costo del gateway.
+I risultati vengono salvati in JSON per confrontare esecuzioni diverse.
+
+Nello scenario "upstream-error" il circuit breaker del servizio si apre dopo
+poche richieste e il gateway risponde 503 senza chiamare lo stub; con
+--gateway-env BREAKER_ENABLED=false si misura l'inoltro di ogni errore.
+
+Uso (dalla cartella api-gateway):
+    python tests/benchmarks/bench_gateway_load.py [--concurrency 50] [--duration 10]
+        [--scenario small-json --scenario error] [--latency-ms 5]
+        [--output bench-results.json] [--gateway-env CACHE_ENABLED=true]
+        [--gateway-log gateway.log]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+from jose import jwt
+
+GATEWAY_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+SECRET_KEY = "bench_secret_key"
+SERVICES = ["auth", "quiz", "path", "reward"]
+
+# Scenari: percorso del gateway e comportamento dello stub
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "small-json": {"path": "/api/users/me", "bytes": 200, "status": 200},
+    "large-json": {"path": "/api/paths/", "bytes": 512 * 1024, "status": 200},
+    "upstream-error": {"path": "/api/rewards/points/user/bench", "bytes": 100, "status": 500},
+    "no-route": {"path": "/api/unknown/resource", "bytes": 0, "status": 404, "direct": False},
+}
+
+
+# ---------------------------------------------------------------------------
+# Servizi stub
+# ---------------------------------------------------------------------------
+
+_payloads: Dict[int, bytes] = {}
+
+
+def payload(size: int) -> bytes:
+    """Corpo JSON (una lista di oggetti) di circa `size` byte."""
+    body = _payloads.get(size)
+    if body is None:
+        item = {"id": 0, "title": "Quiz di matematica", "description": "x" * 64, "points": 10}
+        count = max(1, size // (len(json.dumps(item)) + 2))
+        body = json.dumps([{**item, "id": index} for index in range(count)]).encode("utf-8")
+        _payloads[size] = body
+    return body
+
+
+async def stub_app(scope, receive, send) -> None:
+    """Servizio a valle minimale (ASGI puro, per non pesare sulla misura)."""
+    if scope["type"] != "http":
+        return
+    headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+    latency = float(headers.get("x-bench-latency-ms", "0")) / 1000
+    status = int(headers.get("x-bench-status", "200"))
+    size = int(headers.get("x-bench-bytes", "200"))
+
+    # Il corpo della richiesta viene consumato come farebbe un servizio reale
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+    if latency:
+        await asyncio.sleep(latency)
+
+    body = payload(size) if status < 400 else json.dumps({"detail": "Errore simulato"}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def serve_stubs(ports: List[int]) -> None:
+    """Uno stub per servizio, tutti sullo stesso event loop (processo dedicato)."""
+    servers = [
+        uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+        for port in ports
+    ]
+
+    async def serve_all() -> None:
+        await asyncio.gather(*(server.serve() for server in servers))
+
+    asyncio.run(serve_all())
+
+
+# ---------------------------------------------------------------------------
+# Gateway
+# ---------------------------------------------------------------------------
+
+def free_ports(count: int) -> List[int]:
+    """Porte libere distinte: i socket restano aperti finché non sono state scelte tutte."""
+    sockets = []
+    try:
+        for _ in range(count):
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            sockets.append(sock)
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Il processo in ascolto sulla porta {port} è terminato ({process.returncode})")
+        with socket.socket() as sock:
+            # Se nessuno è in ascolto il socket può connettersi a sé stesso
+            # (stessa porta locale e remota): non conta come server pronto
+            if sock.connect_ex(("127.0.0.1", port)) == 0 and sock.getsockname() != sock.getpeername():
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Nessun server in ascolto sulla porta {port}")
+
+
+def start_gateway(port: int, stub_ports: Dict[str, int], overrides: List[str], log_path: str) -> subprocess.Popen:
+    """
+    Avvia `app.main:app` con uvicorn. Cache, coalescenza e rate limiting sono
+    disattivati per misurare il percorso di proxy di ogni richiesta;
+    `overrides` (KEY=VALUE) permette di riattivarli. L'output del gateway
+    va in `log_path`, per non rallentarlo scrivendo sul terminale.
+    """
+    env = dict(os.environ)
+    env.update({
+        "SECRET_KEY": SECRET_KEY,
+        "CACHE_ENABLED": "false",
+        "COALESCE_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "ACCESS_LOG_SAMPLE_RATE": "0",
+        "PYTHONPATH": GATEWAY_DIR,
+    })
+    for name, stub_port in stub_ports.items():
+        env[f"{name.upper()}_SERVICE_URL"] = f"http://127.0.0.1:{stub_port}"
+    for override in overrides:
+        key, _, value = override.partition("=")
+        env[key] = value
+
+    with open(log_path, "ab") as log_file:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=GATEWAY_DIR,
+            env=env,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+    try:
+        wait_for_port(port, process)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process
+
+
+def start_stubs(ports: Dict[str, int]) -> subprocess.Popen:
+    """Avvia gli stub in un processo separato, per non sottrarre CPU al generatore di carico."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve-stubs", ",".join(str(port) for port in ports.values())]
+    )
+    try:
+        for port in ports.values():
+            wait_for_port(port, process)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process
+
+
+def stop(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ---------------------------------------------------------------------------
+# Generatore di carico
+# ---------------------------------------------------------------------------
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentile con interpolazione lineare su valori già ordinati."""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+async def run_load(
+    base_url: str, path: str, headers: Dict[str, str], concurrency: int, duration: float, warmup: float
+) -> Dict[str, Any]:
+    """`concurrency` worker inviano richieste in sequenza per `duration` secondi."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        async def worker(stop_at: float, record: bool) -> None:
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                start_time = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    await response.aread()
+                except httpx.HTTPError:
+                    if record:
+                        errors += 1
+                    continue
+                if record:
+                    latencies.append(time.perf_counter() - start_time)
+                    statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        if warmup > 0:
+            await asyncio.gather(*(worker(time.perf_counter() + warmup, False) for _ in range(concurrency)))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(started + duration, True) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def bench_headers(scenario: Dict[str, Any], latency_ms: float) -> Dict[str, str]:
+    token = jwt.encode(
+        {"sub": "bench-user", "roles": ["student"], "exp": int(time.time()) + 3600},
+        SECRET_KEY,
+        algorithm="HS256",
+    )
+    return {
+        "Authorization": f"Bearer {token}",
+        "X-Bench-Latency-Ms": str(latency_ms),
+        "X-Bench-Bytes": str(scenario["bytes"]),
+        "X-Bench-Status": str(scenario["status"]),
+    }
+
+
+def stub_for(path: str, stub_ports: Dict[str, int]) -> Optional[str]:
+    """URL dello stub che riceverebbe il percorso (per la misura diretta)."""
+    prefixes = {"/api/users": "auth", "/api/paths": "path", "/api/rewards": "reward", "/api/quiz": "quiz"}
+    for prefix, name in prefixes.items():
+        if path.startswith(prefix):
+            return f"http://127.0.0.1:{stub_ports[name]}"
+    return None
+
+
+def print_row(scenario: str, target: str, result: Dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    print(
+        f"{scenario:<15} {target:<8} {result['throughput_rps']:>10.1f} "
+        f"{latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f} {result['errors']:>7}"
+    )
+
+
+async def run_benchmarks(args: argparse.Namespace, gateway_url: str, stub_ports: Dict[str, int]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    print(f"{'scenario':<15} {'target':<8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errori':>7}")
+    for name in args.scenario or list(SCENARIOS):
+        scenario = SCENARIOS[name]
+        headers = bench_headers(scenario, args.latency_ms)
+        entry: Dict[str, Any] = {"path": scenario["path"], "payload_bytes": scenario["bytes"]}
+
+        entry["gateway"] = await run_load(
+            gateway_url, scenario["path"], headers, args.concurrency, args.duration, args.warmup
+        )
+        print_row(name, "gateway", entry["gateway"])
+
+        direct_url = stub_for(scenario["path"], stub_ports)
+        if scenario.get("direct", True) and direct_url is not None:
+            entry["direct"] = await run_load(
+                direct_url, scenario["path"], headers, args.concurrency, args.duration, args.warmup
+            )
+            print_row(name, "diretto", entry["direct"])
+            entry["overhead_ms"] = {
+                key: round(entry["gateway"]["latency_ms"][key] - entry["direct"]["latency_ms"][key], 3)
+                for key in ("p50", "p95", "p99")
+            }
+        results[name] = entry
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=GATEWAY_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="secondi di misura per scenario e target")
+    parser.add_argument("--warmup", type=float, default=1.0, help="secondi di riscaldamento non misurati")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="latenza simulata degli stub")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--gateway-env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--gateway-log", default=os.devnull, help="file per l'output del gateway")
+    parser.add_argument("--serve-stubs", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_stubs:
+        serve_stubs([int(port) for port in args.serve_stubs.split(",")])
+        return
+
+    *ports, gateway_port = free_ports(len(SERVICES) + 1)
+    stub_ports = dict(zip(SERVICES, ports))
+    stubs = start_stubs(stub_ports)
+    try:
+        gateway = start_gateway(gateway_port, stub_ports, args.gateway_env, args.gateway_log)
+        try:
+            results = asyncio.run(run_benchmarks(args, f"http://127.0.0.1:{gateway_port}", stub_ports))
+        finally:
+            stop(gateway)
+    finally:
+        stop(stubs)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "stub_latency_ms": args.latency_ms,
+            "gateway_env": args.gateway_env,
+        },
+        "scenarios": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Risultati salvati in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
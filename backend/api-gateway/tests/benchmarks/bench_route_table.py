@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: tabella di routing a trie contro la scansione lineare con
+`startswith` usata in precedenza dal gateway.
+
+Uso (dalla cartella api-gateway):
+    python tests/benchmarks/bench_route_table.py [--routes 300] [--lookups 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from typing import Dict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.routing import RouteTable  # noqa: E402
+
+SERVICES = ["http://auth:8001", "http://quiz:8002", "http://path:8003", "http://reward:8004"]
+
+
+def build_routes(count: int) -> Dict[str, str]:
+    """Genera `count` prefissi su più livelli, con sovrapposizioni."""
+    rng = random.Random(42)
+    routes: Dict[str, str] = {}
+    while len(routes) < count:
+        depth = rng.randint(1, 3)
+        segments = [f"res{rng.randint(0, count // 4)}" for _ in range(depth)]
+        routes["/api/" + "/".join(segments)] = rng.choice(SERVICES)
+    return routes
+
+
+def linear_lookup(routes: Dict[str, str], path: str):
+    """Implementazione precedente: primo prefisso che corrisponde, in ordine di definizione."""
+    for prefix, service_url in routes.items():
+        if path.startswith(prefix):
+            return service_url
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=300)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    routes = build_routes(args.routes)
+    rng = random.Random(7)
+    prefixes = list(routes)
+    paths = [rng.choice(prefixes) + f"/{rng.randint(1, 1000)}/details" for _ in range(1000)]
+    paths += [f"/api/missing/{i}" for i in range(100)]
+
+    table = RouteTable(routes)
+    print(f"Rotte: {table.size} - sovrapposte: {len(table.overlaps)} - ridondanti: {len(table.shadowed)}")
+
+    iterations = max(1, args.lookups // len(paths))
+    linear = timeit.timeit(lambda: [linear_lookup(routes, p) for p in paths], number=iterations)
+    trie = timeit.timeit(lambda: [table.lookup(p) for p in paths], number=iterations)
+    total = iterations * len(paths)
+
+    print(f"Scansione lineare: {linear / total * 1e6:8.2f} µs/lookup")
+    print(f"Trie:              {trie / total * 1e6:8.2f} µs/lookup")
+    print(f"Speedup:           {linear / trie:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
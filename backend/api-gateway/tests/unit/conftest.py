@@ -0,0 +1,110 @@
+import inspect
+import time
+
+import pytest
+import httpx
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.main import app
+from app.core.balancer import load_balancer
+from app.core.config import settings
+from app.core.hedging import upstream_caller
+from app.core.ratelimit import rate_limiter
+from app.core.resilience import upstream_guards
+from app.core.upstream import upstream_pool
+
+
+class FakeUpstream:
+    """
+    Servizi a valle simulati tramite httpx.MockTransport.
+    Registra le richieste ricevute e risponde con l'handler configurato.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.handler = self.echo
+
+    @staticmethod
+    def echo(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={
+                "host": request.url.host,
+                "port": request.url.port,
+                "path": request.url.path,
+                "query": request.url.query.decode(),
+                "method": request.method,
+                "body": request.content.decode(),
+            },
+        )
+
+    @staticmethod
+    def _as_network_response(response: httpx.Response) -> httpx.Response:
+        # Come una risposta di rete: il corpo non è ancora stato letto
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=response.stream,
+        )
+
+    def __call__(self, request: httpx.Request):
+        self.requests.append(request)
+        response = self.handler(request)
+        if inspect.isawaitable(response):
+            async def wait_response():
+                return self._as_network_response(await response)
+            return wait_response()
+        return self._as_network_response(response)
+
+
+@pytest.fixture(autouse=True)
+def accept_hs256_tokens(monkeypatch):
+    """I test firmano i token con SECRET_KEY, come durante la migrazione a RS256."""
+    monkeypatch.setattr(settings, "JWT_ACCEPT_HS256", True)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="function")
+def upstream():
+    fake = FakeUpstream()
+    upstream_pool._transport = httpx.MockTransport(fake)
+    yield fake
+    upstream_pool._transport = None
+    upstream_pool._clients.clear()
+    upstream_guards.reset()
+    load_balancer.reset()
+    upstream_caller.reset()
+    rate_limiter.reset()
+
+
+@pytest.fixture(scope="function")
+def client(upstream):
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def admin_headers():
+    """Header Authorization di un amministratore, per gli endpoint /gateway."""
+    payload = {"sub": "admin-uuid", "roles": ["admin"], "exp": int(time.time()) + 300}
+    token = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+QUIZ_REPLICAS = ["http://quiz-1:8002", "http://quiz-2:8002"]
+
+
+@pytest.fixture
+def quiz_replicas(upstream, monkeypatch):
+    """Due repliche del quiz-service; gli health check vengono lanciati dai test."""
+    monkeypatch.setitem(settings.UPSTREAM_REPLICAS, "quiz-service", QUIZ_REPLICAS)
+    monkeypatch.setattr(settings, "HEALTH_CHECK_ENABLED", False)
+    load_balancer.reset()
+    yield load_balancer.get(settings.QUIZ_SERVICE_URL)
+    monkeypatch.undo()
+    load_balancer.reset()
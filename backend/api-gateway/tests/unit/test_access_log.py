@@ -0,0 +1,91 @@
+import json
+import logging
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.main import app
+from app.core.access_log import AccessLog, access_log
+from app.core.config import settings
+
+
+def bearer(sub):
+    token = jwt.encode(
+        {"sub": sub, "roles": ["student"], "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def written_records(caplog):
+    # Il thread di scrittura viene fermato (e la coda svuotata) alla chiusura del client
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == "app.access"]
+
+
+@pytest.fixture(autouse=True)
+def reset_counters():
+    access_log.written = access_log.dropped = access_log.sampled_out = 0
+
+
+def test_one_structured_record_per_request(upstream, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 1.0)
+    caplog.set_level(logging.INFO, logger="app.access")
+    with TestClient(app) as client:
+        client.get("/api/paths/", headers=bearer("u-7"))
+
+    records = written_records(caplog)
+    assert len(records) == 1
+    record = records[0]
+    assert record["method"] == "GET"
+    assert record["path"] == "/api/paths/"
+    assert record["status"] == 200
+    assert record["service"] == "path-service"
+    assert record["user_id"] == "u-7"
+    assert record["duration_ms"] >= 0
+    # Nessun log per richiesta sul logger applicativo
+    assert not [r for r in caplog.records if r.name == "app.main"]
+
+
+def test_success_is_sampled_but_errors_are_always_logged(upstream, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    caplog.set_level(logging.INFO, logger="app.access")
+
+    def handler(request):
+        status = 500 if request.url.path.endswith("/broken") else 200
+        return httpx.Response(status, json={})
+    upstream.handler = handler
+
+    with TestClient(app) as client:
+        for _ in range(5):
+            client.get("/api/paths/")
+        client.get("/api/paths/broken")
+
+    records = written_records(caplog)
+    assert [r["status"] for r in records] == [500]
+    assert access_log.sampled_out == 5
+
+
+def test_slow_requests_are_always_logged(monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "ACCESS_LOG_SLOW_SECONDS", 0.5)
+    log = AccessLog()
+
+    assert log.should_log(200, 0.6)
+    assert not log.should_log(200, 0.1)
+    assert log.should_log(404, 0.1)
+
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_QUEUE_SIZE", 2)
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 1.0)
+    log = AccessLog()  # thread non avviato: la coda non viene svuotata
+
+    for _ in range(5):
+        log.record({"status": 200, "duration_ms": 1.0})
+
+    assert log.stats()["queued"] == 2
+    assert log.dropped == 3
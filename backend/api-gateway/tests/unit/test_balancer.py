@@ -0,0 +1,106 @@
+import httpx
+
+from app.core.balancer import ReplicaSet, load_balancer
+from app.core.config import settings
+from app.core.upstream import upstream_pool
+
+QUIZ_REPLICAS = ["http://quiz-1:8002", "http://quiz-2:8002"]
+
+
+def hosts(upstream):
+    return [request.url.host for request in upstream.requests if request.url.path != "/"]
+
+
+def test_least_outstanding_prefers_idle_replica(monkeypatch):
+    replica_set = ReplicaSet("quiz-service", QUIZ_REPLICAS + ["http://quiz-3:8002"])
+    busy, idle, other = replica_set.replicas
+    busy.outstanding, other.outstanding = 3, 1
+
+    assert replica_set.choose() is idle
+
+    monkeypatch.setattr(settings, "LOAD_BALANCER_STRATEGY", "p2c")
+    # Con p2c vince sempre la meno carica delle due estratte, mai la più carica in assoluto
+    assert all(replica_set.choose() is not busy for _ in range(50))
+
+
+def test_requests_are_tracked_while_in_flight():
+    replica_set = ReplicaSet("quiz-service", QUIZ_REPLICAS)
+    first = replica_set.choose()
+
+    with replica_set.track(first):
+        assert first.outstanding == 1
+        assert replica_set.choose() is not first
+
+    assert first.outstanding == 0
+    assert first.requests == 1
+
+
+def test_requests_are_spread_across_replicas(quiz_replicas, client, upstream):
+    for _ in range(20):
+        assert client.get("/api/quiz-templates").status_code == 200
+
+    assert set(hosts(upstream)) == {"quiz-1", "quiz-2"}
+    assert sum(replica.requests for replica in quiz_replicas.replicas) == 20
+
+
+def test_failing_replica_is_ejected_and_restored(quiz_replicas, client, upstream):
+    def handler(request):
+        if request.url.host == "quiz-2" and request.url.path == "/":
+            return httpx.Response(503)
+        return upstream.echo(request)
+
+    upstream.handler = handler
+    for _ in range(settings.HEALTH_CHECK_UNHEALTHY_THRESHOLD):
+        client.portal.call(load_balancer.check_all)
+
+    healthy = {replica.url: replica.healthy for replica in quiz_replicas.replicas}
+    assert healthy == {"http://quiz-1:8002": True, "http://quiz-2:8002": False}
+    for _ in range(10):
+        client.get("/api/quiz-templates")
+    assert set(hosts(upstream)) == {"quiz-1"}
+
+    upstream.handler = upstream.echo
+    for _ in range(settings.HEALTH_CHECK_HEALTHY_THRESHOLD):
+        client.portal.call(load_balancer.check_all)
+
+    assert all(replica.healthy for replica in quiz_replicas.replicas)
+
+
+def test_connection_errors_eject_replica(quiz_replicas, client, upstream):
+    def handler(request):
+        if request.url.host == "quiz-2":
+            raise httpx.ConnectError("Connection refused", request=request)
+        return upstream.echo(request)
+
+    upstream.handler = handler
+    for _ in range(10):
+        client.get("/api/quiz-templates")
+
+    unreachable = quiz_replicas.replicas[1]
+    assert not unreachable.healthy
+    assert "ConnectError" in unreachable.last_error
+
+    upstream.requests.clear()
+    for _ in range(5):
+        assert client.get("/api/quiz-templates").status_code == 200
+    assert set(hosts(upstream)) == {"quiz-1"}
+
+
+def test_all_replicas_down_still_tries(quiz_replicas):
+    for replica in quiz_replicas.replicas:
+        replica.healthy = False
+
+    assert quiz_replicas.choose() in quiz_replicas.replicas
+
+
+def test_replica_stats_endpoint(quiz_replicas, client, admin_headers):
+    client.get("/api/quiz-templates")
+
+    data = client.get("/gateway/replicas", headers=admin_headers).json()
+    quiz = data["services"]["quiz-service"]
+    assert quiz["healthy"] == 2
+    assert [replica["url"] for replica in quiz["replicas"]] == QUIZ_REPLICAS
+
+    pool = client.get("/gateway/pool", headers=admin_headers).json()
+    assert {"quiz-service#1", "quiz-service#2"} <= pool.keys()
+    assert upstream_pool.get_client(QUIZ_REPLICAS[0]) is not upstream_pool.get_client(QUIZ_REPLICAS[1])
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from jose import jwt
+
+from app.core.config import settings
+
+
+def bearer(sub="student-1", roles=("student",)):
+    token = jwt.encode(
+        {"sub": sub, "roles": list(roles), "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+
+
+def test_batch_returns_results_in_order(client, upstream):
+    response = client.post("/api/batch", headers=bearer(), json={"requests": [
+        {"id": "quizzes", "path": "/api/quizzes/student/assigned"},
+        {"id": "paths", "path": "/api/paths/?limit=5"},
+        {"id": "points", "path": "/api/rewards/points/user/7"},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()["responses"]
+    assert [r["id"] for r in results] == ["quizzes", "paths", "points"]
+    assert all(r["status"] == 200 for r in results)
+    assert results[1]["body"]["path"] == "/api/paths/"
+    assert results[1]["body"]["query"] == "limit=5"
+    assert results[2]["body"]["port"] == 8004
+
+
+def test_sub_requests_reuse_batch_authorization(client, upstream):
+    """Le sotto-richieste passano dalla verifica del token come le richieste dirette."""
+    client.post("/api/batch", headers=bearer(sub="u-42"), json={"requests": [{"path": "/api/paths/"}]})
+
+    forwarded = upstream.requests[0].headers
+    assert forwarded["x-user-id"] == "u-42"
+
+    response = client.post("/api/batch", headers={"Authorization": "Bearer non-valido"},
+                           json={"requests": [{"path": "/api/paths/"}]})
+    assert response.json()["responses"][0]["status"] == 401
+    assert len(upstream.requests) == 1
+
+
+def test_sub_request_body_and_errors(client, upstream):
+    def handler(request):
+        if request.url.path.startswith("/api/rewards"):
+            return httpx.Response(404, json={"detail": "non trovato"})
+        return upstream.echo(request)
+    upstream.handler = handler
+
+    results = client.post("/api/batch", headers=bearer(), json={"requests": [
+        {"method": "POST", "path": "/api/quiz-attempts/submit", "body": {"answers": [1, 2]}},
+        {"path": "/api/rewards/99"},
+    ]}).json()["responses"]
+
+    assert results[0]["body"]["method"] == "POST"
+    assert results[0]["body"]["body"] == '{"answers": [1, 2]}'
+    assert results[1]["status"] == 404
+    assert results[1]["body"] == {"detail": "non trovato"}
+
+
+def test_batch_size_is_limited(client, upstream, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_REQUESTS", 2)
+
+    response = client.post("/api/batch", headers=bearer(), json={"requests": [{"path": "/api/paths/"}] * 3})
+
+    assert response.status_code == 400
+    assert upstream.requests == []
+
+
+def test_batch_rejects_non_api_paths(client, upstream):
+    for path in ("/gateway/pool", "/api/batch"):
+        response = client.post("/api/batch", json={"requests": [{"path": path}]})
+        assert response.status_code == 422
+
+
+def test_sub_requests_run_concurrently(client, upstream, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_CONCURRENCY", 5)
+
+    async def slow(request):
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, json={})
+    upstream.handler = slow
+
+    started = time.monotonic()
+    response = client.post("/api/batch", headers=bearer(), json={
+        "requests": [{"path": f"/api/paths/{i}"} for i in range(5)]
+    })
+
+    assert response.status_code == 200
+    assert time.monotonic() - started < 0.4
@@ -0,0 +1,104 @@
+import time
+
+import httpx
+import pytest
+from jose import jwt
+
+from app.core.config import settings
+from app.core.cache import response_cache
+from app.core.security import edge_authenticator
+
+
+def auth_headers(sub="student-1", roles=("student",)):
+    token = jwt.encode(
+        {"sub": sub, "roles": list(roles), "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    response_cache.clear()
+    edge_authenticator.clear()
+    yield
+    response_cache.clear()
+
+
+def test_catalog_get_served_from_cache(client, upstream):
+    """La seconda richiesta identica non raggiunge il servizio."""
+    headers = auth_headers()
+
+    first = client.get("/api/quiz-templates?limit=10&skip=0", headers=headers)
+    second = client.get("/api/quiz-templates?skip=0&limit=10", headers=headers)
+
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+    assert len(upstream.requests) == 1
+
+
+def test_if_none_match_returns_304_without_upstream(client, upstream):
+    headers = auth_headers()
+    etag = client.get("/api/templates/", headers=headers).headers["etag"]
+
+    response = client.get("/api/templates/", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert len(upstream.requests) == 1
+
+
+def test_cache_key_varies_by_role_and_user(client, upstream):
+    """Ruoli diversi non condividono le risposte; path-templates varia anche per utente."""
+    client.get("/api/quiz-templates", headers=auth_headers("s-1", ["student"]))
+    client.get("/api/quiz-templates", headers=auth_headers("a-1", ["admin"]))
+    client.get("/api/path-templates/", headers=auth_headers("p-1", ["parent"]))
+    client.get("/api/path-templates/", headers=auth_headers("p-2", ["parent"]))
+
+    assert len(upstream.requests) == 4
+
+
+def test_only_configured_paths_are_cached(client, upstream):
+    """Solo l'elenco /api/rewards/ è in cache, non i percorsi per utente."""
+    headers = auth_headers()
+    for _ in range(2):
+        client.get("/api/rewards/points/user/student-1", headers=headers)
+        client.get("/api/quiz-attempts/", headers=headers)
+
+    assert len(upstream.requests) == 4
+
+
+def test_write_invalidates_service_entries(client, upstream):
+    headers = auth_headers("a-1", ["admin"])
+    client.get("/api/templates/", headers=headers)
+
+    client.post("/api/templates/", json={"name": "Nuovo"}, headers=headers)
+    response = client.get("/api/templates/", headers=headers)
+
+    assert response.headers["x-cache"] == "MISS"
+    assert len(upstream.requests) == 3
+
+
+def test_error_responses_not_cached(client, upstream):
+    upstream.handler = lambda request: httpx.Response(500, json={"detail": "errore"})
+    headers = auth_headers()
+
+    client.get("/api/quiz-templates", headers=headers)
+    client.get("/api/quiz-templates", headers=headers)
+
+    assert len(upstream.requests) == 2
+
+
+def test_lru_is_bounded_in_bytes(monkeypatch):
+    from fastapi import Response
+
+    monkeypatch.setattr(response_cache, "max_bytes", 250)
+    for i in range(5):
+        response_cache.put(f"k{i}", Response(content=b"x" * 100), ttl=60, service="svc")
+
+    assert response_cache.stats()["bytes"] <= 250
+    assert response_cache.get("k0") is None
+    assert response_cache.get("k4") is not None
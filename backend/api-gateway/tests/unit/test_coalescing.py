@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from jose import jwt
+
+from app.main import app
+from app.core.config import settings
+from app.core.cache import response_cache
+from app.core.coalescing import RequestCoalescer, request_coalescer
+
+
+def bearer(sub, roles):
+    token = jwt.encode(
+        {"sub": sub, "roles": roles, "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    # La cache servirebbe le richieste successive: la disattiviamo per
+    # osservare solo la coalescenza
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    response_cache.clear()
+    request_coalescer.reset()
+    yield
+    request_coalescer.reset()
+
+
+async def gather_gets(requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as gateway:
+        return await asyncio.gather(*(gateway.get(url, headers=headers) for url, headers in requests))
+
+
+def slow_handler(delay=0.05):
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"path": request.url.path})
+    return handler
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_gets_share_one_call(upstream):
+    """30 studenti che aprono lo stesso template generano una sola chiamata."""
+    upstream.handler = slow_handler()
+    requests = [("/api/quiz-templates/7", bearer(f"student-{i}", ["student"])) for i in range(30)]
+
+    responses = await gather_gets(requests)
+
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.json() == {"path": "/api/quiz-templates/7"} for r in responses)
+    assert len(upstream.requests) == 1
+    stats = request_coalescer.stats()
+    assert stats["coalesced"] == 29
+    assert stats["coalescing_ratio"] == pytest.approx(29 / 30, rel=1e-3)
+
+
+@pytest.mark.anyio
+async def test_user_scoped_routes_coalesce_per_user(upstream):
+    upstream.handler = slow_handler()
+    requests = [("/api/paths/3/nodes", bearer(f"student-{i % 3}", ["student"])) for i in range(9)]
+
+    await gather_gets(requests)
+
+    assert len(upstream.requests) == 3
+
+
+@pytest.mark.anyio
+async def test_routes_without_opt_in_are_not_coalesced(upstream):
+    upstream.handler = slow_handler()
+    headers = bearer("student-1", ["student"])
+
+    await gather_gets([("/api/quiz-attempts/", headers)] * 5)
+
+    assert len(upstream.requests) == 5
+
+
+@pytest.mark.anyio
+async def test_leader_error_is_shared_with_followers():
+    coalescer = RequestCoalescer({"/api/x": "role"})
+    calls = 0
+
+    async def failing_fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise httpx.ConnectError("servizio non raggiungibile")
+
+    results = await asyncio.gather(
+        *(coalescer.run("/api/x|GET|k|/api/x?", failing_fetch) for _ in range(4)),
+        return_exceptions=True,
+    )
+
+    assert calls == 1
+    assert all(isinstance(result, httpx.ConnectError) for result in results)
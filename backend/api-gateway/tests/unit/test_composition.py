@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from jose import jwt
+
+from app.core.composition import Component, CompositionEngine, composition_engine
+from app.core.config import settings
+
+
+def bearer(sub="student-1", roles=("student",)):
+    token = jwt.encode(
+        {"sub": sub, "roles": list(roles), "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+
+
+def test_student_home_is_composed_concurrently(client, upstream):
+    async def slow(request):
+        # Ogni componente impiega 0.2s: in sequenza servirebbero 0.8s
+        await asyncio.sleep(0.2)
+        return upstream.echo(request)
+
+    upstream.handler = slow
+    start_time = time.monotonic()
+
+    response = client.get("/api/compose/student-home", headers=bearer(sub="student-7"))
+
+    assert response.status_code == 200
+    assert time.monotonic() - start_time < 0.6
+    document = response.json()
+    assert document["errors"] == {}
+    assert set(document["data"]) == {"assigned_quizzes", "paths", "unredeemed_rewards", "points"}
+    assert document["data"]["assigned_quizzes"]["path"] == "/api/quizzes/student/assigned"
+    assert document["data"]["unredeemed_rewards"]["path"] == "/api/user-rewards/unredeemed/student-7"
+    assert document["data"]["points"]["path"] == "/api/rewards/points/user/student-7"
+    # Le sotto-richieste portano l'identità verificata dal gateway
+    assert all(request.headers["x-user-id"] == "student-7" for request in upstream.requests)
+
+
+def test_failed_component_uses_default(client, upstream):
+    def handler(request):
+        if request.url.path.startswith("/api/user-rewards"):
+            return httpx.Response(500, json={"detail": "errore del database"})
+        return upstream.echo(request)
+
+    upstream.handler = handler
+
+    response = client.get("/api/compose/student-home", headers=bearer())
+
+    assert response.status_code == 200
+    document = response.json()
+    assert document["data"]["unredeemed_rewards"] == []
+    assert document["errors"] == {"unredeemed_rewards": {"status": 500, "detail": "errore del database"}}
+    assert document["data"]["paths"]["path"] == "/api/paths/"
+
+
+def test_slow_component_times_out(client, upstream):
+    async def handler(request):
+        if request.url.path.startswith("/api/rewards/points"):
+            await asyncio.sleep(3)
+        return upstream.echo(request)
+
+    upstream.handler = handler
+    start_time = time.monotonic()
+
+    response = client.get("/api/compose/student-home", headers=bearer())
+
+    assert response.status_code == 200
+    assert time.monotonic() - start_time < 2.5
+    document = response.json()
+    assert document["data"]["points"] == 0
+    assert document["errors"]["points"]["status"] == 504
+
+
+def test_required_component_failure_returns_bad_gateway(client, upstream, monkeypatch):
+    engine = CompositionEngine({"dashboard": {
+        "paths": {"path": "/api/paths/", "required": True},
+        "rewards": {"path": "/api/rewards/"},
+    }})
+    monkeypatch.setattr("app.api.endpoints.composition.composition_engine", engine)
+    upstream.handler = lambda request: httpx.Response(503, json={"detail": "non disponibile"})
+
+    response = client.get("/api/compose/dashboard", headers=bearer())
+
+    assert response.status_code == 502
+    assert set(response.json()["errors"]) == {"paths", "rewards"}
+
+
+def test_query_parameters_fill_path_variables(client, upstream, monkeypatch):
+    engine = CompositionEngine({"child": {
+        "points": {"path": "/api/rewards/points/user/{student_id}"},
+    }})
+    monkeypatch.setattr("app.api.endpoints.composition.composition_engine", engine)
+
+    response = client.get("/api/compose/child?student_id=abc/def", headers=bearer(roles=("parent",)))
+    assert response.status_code == 200
+    # Il valore viene codificato: non può aggiungere segmenti al percorso
+    assert upstream.requests[-1].url.raw_path == b"/api/rewards/points/user/abc%2Fdef"
+
+    response = client.get("/api/compose/child", headers=bearer(roles=("parent",)))
+    assert response.json()["errors"]["points"] == {"status": 400, "detail": "Parametro mancante: student_id"}
+
+
+def test_user_id_cannot_be_overridden(client, upstream):
+    response = client.get("/api/compose/student-home?user_id=someone-else", headers=bearer(sub="student-7"))
+
+    assert response.json()["data"]["points"]["path"] == "/api/rewards/points/user/student-7"
+
+
+def test_composition_requires_token_and_known_name(client, upstream):
+    assert client.get("/api/compose/student-home").status_code == 401
+    assert client.get("/api/compose/unknown", headers=bearer()).status_code == 404
+    assert upstream.requests == []
+
+
+def test_invalid_component_paths_are_rejected():
+    with pytest.raises(ValueError):
+        Component("loop", {"path": "/api/compose/student-home"})
+    with pytest.raises(ValueError):
+        Component("external", {"path": "http://example.com/api"})
+    assert composition_engine.get("student-home") is not None
@@ -0,0 +1,103 @@
+import gzip
+import time
+
+import httpx
+import pytest
+from jose import jwt
+
+from app.core import cache as cache_module
+from app.core.cache import response_cache
+from app.core.compression import negotiate
+from app.core.config import settings
+
+
+def bearer(sub="teacher-1", roles=("admin",)):
+    token = jwt.encode(
+        {"sub": sub, "roles": list(roles), "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def json_handler(size):
+    items = [{"id": i, "text": "Domanda di esempio con opzioni"} for i in range(size)]
+    return lambda request: httpx.Response(200, json=items)
+
+
+def raw_get(client, url, accept_encoding="gzip", **headers):
+    # Il corpo non viene decompresso, per verificare i byte inviati dal gateway
+    with client.stream("GET", url, headers={"Accept-Encoding": accept_encoding, **bearer(), **headers}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+def test_negotiation():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("br;q=0, gzip;q=0.5") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") == "gzip"
+    assert negotiate(None) is None
+
+
+def test_large_json_is_gzipped(client, upstream):
+    upstream.handler = json_handler(200)
+
+    response, body = raw_get(client, "/api/paths/")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert len(body) < len(gzip.decompress(body)) / 5
+    # Dal servizio viene richiesto il corpo non compresso
+    assert upstream.requests[0].headers["accept-encoding"] == "identity"
+
+
+def test_small_or_unaccepted_responses_are_not_compressed(client, upstream):
+    upstream.handler = json_handler(2)
+    response, _ = raw_get(client, "/api/paths/")
+    assert "content-encoding" not in response.headers
+
+    upstream.handler = json_handler(200)
+    response, body = raw_get(client, "/api/paths/", accept_encoding="identity")
+    assert "content-encoding" not in response.headers
+    assert body.startswith(b"[")
+
+
+def test_streamed_responses_are_compressed(client, upstream, monkeypatch):
+    monkeypatch.setattr(settings, "PROXY_BUFFER_MAX_BYTES", 1024)
+    upstream.handler = json_handler(2000)
+
+    response, body = raw_get(client, "/api/paths/")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body).startswith(b'[{"id": 0')
+
+
+def test_cached_catalog_is_compressed_once(client, upstream, monkeypatch):
+    """Le risposte in cache sono salvate compresse: nessuna compressione sui HIT."""
+    calls = []
+    original = cache_module.compress
+    monkeypatch.setattr(cache_module, "compress", lambda body, encoding: calls.append(encoding) or original(body, encoding))
+    upstream.handler = json_handler(200)
+
+    first, first_body = raw_get(client, "/api/quiz-templates")
+    second, second_body = raw_get(client, "/api/quiz-templates")
+    plain, plain_body = raw_get(client, "/api/quiz-templates", accept_encoding="identity")
+
+    assert first.headers["x-cache"] == "MISS" and second.headers["x-cache"] == "HIT"
+    assert second.headers["content-encoding"] == "gzip"
+    assert second_body == first_body
+    assert calls == ["gzip"]
+    assert "content-encoding" not in plain.headers
+    assert gzip.decompress(second_body) == plain_body
+    # La rappresentazione compressa ha un ETag debole, valido per la revalidazione
+    assert second.headers["etag"] == "W/" + plain.headers["etag"]
+    revalidated, _ = raw_get(client, "/api/quiz-templates", **{"If-None-Match": second.headers["etag"]})
+    assert revalidated.status_code == 304
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.hedging import upstream_caller
+from app.core.routing import RouteTable
+
+
+@pytest.fixture
+def fast_hedging(monkeypatch):
+    """Budget di hedging breve per /api/quiz-templates."""
+    monkeypatch.setattr(upstream_caller, "_hedge_routes", RouteTable({"/api/quiz-templates": 0.05}))
+
+
+def test_policy_only_for_idempotent_requests():
+    assert upstream_caller.policy_for("POST", "/api/quiz-attempts/submit", True) is None
+    assert upstream_caller.policy_for("GET", "/api/quiz-templates", False) is None
+
+    policy = upstream_caller.policy_for("GET", "/api/quiz-templates", True)
+    assert policy.retries == settings.RETRY_MAX_RETRIES
+    assert policy.hedge_delay == settings.HEDGE_ROUTES["/api/quiz-templates"]
+
+    # Retry ma nessun hedging per i percorsi senza budget
+    policy = upstream_caller.policy_for("GET", "/api/users/me", True)
+    assert policy.retries == settings.RETRY_MAX_RETRIES
+    assert policy.hedge_delay is None
+
+
+def test_connection_errors_are_retried(client, upstream):
+    def flaky(request):
+        if len(upstream.requests) == 1:
+            raise httpx.ConnectError("connessione rifiutata", request=request)
+        return upstream.echo(request)
+
+    upstream.handler = flaky
+
+    response = client.get("/api/users/me")
+
+    assert response.status_code == 200
+    assert len(upstream.requests) == 2
+    assert upstream_caller.retries == 1
+
+
+def test_retries_are_bounded(client, upstream):
+    def refuse(request):
+        raise httpx.ConnectError("connessione rifiutata", request=request)
+
+    upstream.handler = refuse
+
+    response = client.get("/api/users/me")
+
+    assert response.status_code == 503
+    assert len(upstream.requests) == 1 + settings.RETRY_MAX_RETRIES
+
+
+def test_submit_is_never_retried(client, upstream):
+    def refuse(request):
+        raise httpx.ConnectError("connessione rifiutata", request=request)
+
+    upstream.handler = refuse
+
+    response = client.post("/api/quiz-attempts/submit", json={"answers": []})
+
+    assert response.status_code == 503
+    assert len(upstream.requests) == 1
+    assert upstream_caller.retries == 0
+
+
+def test_slow_replica_is_hedged(quiz_replicas, fast_hedging, client, upstream):
+    slow, fast = quiz_replicas.replicas
+    # La replica lenta viene scelta per prima perché risulta più scarica
+    fast.outstanding = 1
+
+    async def handler(request):
+        if request.url.host == "quiz-1":
+            await asyncio.sleep(2)
+        return upstream.echo(request)
+
+    upstream.handler = handler
+    start_time = time.monotonic()
+
+    response = client.get("/api/quiz-templates")
+
+    assert response.status_code == 200
+    assert response.json()["host"] == "quiz-2"
+    assert time.monotonic() - start_time < 1
+    assert [request.url.host for request in upstream.requests] == ["quiz-1", "quiz-2"]
+    assert upstream_caller.stats()["hedged"] == 1
+    assert upstream_caller.stats()["hedge_wins"] == 1
+    # Il tentativo perdente è stato annullato
+    assert slow.outstanding == 0
+
+
+def test_fast_response_is_not_hedged(quiz_replicas, fast_hedging, client, upstream):
+    for _ in range(5):
+        assert client.get("/api/quiz-templates").status_code == 200
+
+    assert len(upstream.requests) == 5
+    assert upstream_caller.hedged == 0
+
+
+def test_deadline_returns_gateway_timeout(client, upstream, monkeypatch):
+    monkeypatch.setattr(settings, "UPSTREAM_DEADLINE_SECONDS", 0.1)
+
+    async def slow(request):
+        await asyncio.sleep(2)
+        return upstream.echo(request)
+
+    upstream.handler = slow
+
+    response = client.get("/api/users/me")
+
+    assert response.status_code == 504
+    assert upstream_caller.deadline_exceeded == 1
+
+
+def test_hedging_stats_endpoint(client, admin_headers):
+    response = client.get("/gateway/hedging", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.json() == {"retries": 0, "hedged": 0, "hedge_wins": 0, "deadline_exceeded": 0}
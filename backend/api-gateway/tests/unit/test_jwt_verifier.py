@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+import urllib.request
+
+import pytest
+import rsa
+from jose import jwk, jwt
+
+from app.core.config import Settings, settings
+from app.core.jwt_verifier import TokenVerificationError, jwt_verifier
+from app.core.security import edge_authenticator
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    """Chiave RSA come quelle dell'auth-service, con il suo JWK pubblico."""
+    _, private_key = rsa.newkeys(1024)
+    private_pem = private_key.save_pkcs1().decode("ascii")
+    public_jwk = {**jwk.construct(private_pem, "RS256").public_key().to_dict(), "kid": "key-1", "use": "sig"}
+    return private_pem, public_jwk
+
+
+@pytest.fixture
+def jwks_file(tmp_path, signing_key, monkeypatch):
+    """JWKS servito da file: urllib lo legge come farebbe con /api/auth/jwks."""
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [signing_key[1]]}))
+    monkeypatch.setattr(jwt_verifier, "jwks_url", path.as_uri())
+    monkeypatch.setattr(jwt_verifier, "_keys", {})
+    monkeypatch.setattr(jwt_verifier, "_last_attempt", float("-inf"))
+    monkeypatch.setattr(jwt_verifier, "refreshes", 0)
+    monkeypatch.setattr(jwt_verifier, "_pending", None)
+    # Come all'avvio del gateway: il JWKS è già stato scaricato
+    jwt_verifier.refresh()
+    edge_authenticator.clear()
+    yield path
+    edge_authenticator.clear()
+
+
+def make_token(signing_key, kid="key-1", sub="student-uuid", roles=("student",), expires_in=300):
+    payload = {"sub": sub, "roles": list(roles), "exp": int(time.time()) + expires_in}
+    return jwt.encode(payload, signing_key[0], algorithm="RS256", headers={"kid": kid})
+
+
+def test_token_is_verified_with_fetched_key_set(jwks_file, signing_key):
+    identity = jwt_verifier.verify(make_token(signing_key, roles=["parent", "admin"]))
+
+    assert identity["user_id"] == "student-uuid"
+    assert identity["role"] == "parent"
+    assert identity["roles"] == ["parent", "admin"]
+    assert jwt_verifier.stats()["kids"] == ["key-1"]
+
+    # Il key set è in cache: nessun nuovo download
+    jwt_verifier.verify(make_token(signing_key, sub="other"))
+    assert jwt_verifier.refreshes == 1
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval(jwks_file, signing_key):
+    for _ in range(3):
+        with pytest.raises(TokenVerificationError):
+            jwt_verifier.verify(make_token(signing_key, kid="rotated"))
+    assert jwt_verifier.refreshes == 1
+
+
+def test_rotated_key_is_picked_up(jwks_file, signing_key, monkeypatch):
+    rotated = {**signing_key[1], "kid": "key-2"}
+    jwks_file.write_text(json.dumps({"keys": [rotated, signing_key[1]]}))
+    monkeypatch.setattr(jwt_verifier, "min_refresh_interval", 0)
+
+    # Il primo token con la chiave nuova è rifiutato e avvia l'aggiornamento
+    with pytest.raises(TokenVerificationError):
+        jwt_verifier.verify(make_token(signing_key, kid="key-2"))
+    jwt_verifier.wait_for_refresh(5)
+
+    identity = jwt_verifier.verify(make_token(signing_key, kid="key-2"))
+
+    assert identity["user_id"] == "student-uuid"
+    assert jwt_verifier.stats()["kids"] == ["key-1", "key-2"]
+
+
+def test_unknown_kid_does_not_wait_for_the_network(jwks_file, signing_key, monkeypatch):
+    """Un kid sconosciuto non blocca la verifica mentre il JWKS viene scaricato."""
+    release = threading.Event()
+    original_urlopen = urllib.request.urlopen
+
+    def slow_urlopen(*args, **kwargs):
+        release.wait(5)
+        return original_urlopen(*args, **kwargs)
+
+    monkeypatch.setattr(urllib.request, "urlopen", slow_urlopen)
+    monkeypatch.setattr(jwt_verifier, "min_refresh_interval", 0)
+    try:
+        started = time.perf_counter()
+        for _ in range(3):
+            with pytest.raises(TokenVerificationError):
+                jwt_verifier.verify(make_token(signing_key, kid="random"))
+        assert time.perf_counter() - started < 1
+        # Un solo aggiornamento in corso alla volta
+        assert jwt_verifier.refreshes == 1
+    finally:
+        release.set()
+        jwt_verifier.wait_for_refresh(5)
+    assert jwt_verifier.refreshes == 2
+
+
+def test_failed_refresh_keeps_known_keys(jwks_file, signing_key):
+    jwks_file.unlink()
+
+    assert jwt_verifier.refresh() is False
+    assert jwt_verifier.verify(make_token(signing_key))["user_id"] == "student-uuid"
+
+
+def test_invalid_tokens_are_rejected(jwks_file, signing_key, monkeypatch):
+    with pytest.raises(TokenVerificationError):
+        jwt_verifier.verify(make_token(signing_key, expires_in=-3600))
+    with pytest.raises(TokenVerificationError):
+        jwt_verifier.verify("non-un-token")
+
+    legacy = jwt.encode(
+        {"sub": "student-uuid", "roles": [], "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    assert jwt_verifier.verify(legacy)["role"] == "student"
+    monkeypatch.setattr(settings, "JWT_ACCEPT_HS256", False)
+    with pytest.raises(TokenVerificationError):
+        jwt_verifier.verify(legacy)
+
+
+def test_hs256_tokens_are_rejected_by_default(monkeypatch):
+    """HS256 access tokens are accepted only when the migration enables them."""
+    monkeypatch.delenv("JWT_ACCEPT_HS256", raising=False)
+    assert Settings().JWT_ACCEPT_HS256 is False
+
+
+def test_gateway_accepts_asymmetric_tokens(jwks_file, signing_key, client, upstream):
+    token = make_token(signing_key, sub="u-1", roles=["parent"])
+
+    response = client.get("/api/paths/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert upstream.requests[0].headers["x-user-id"] == "u-1"
+
+    forged = make_token(signing_key, kid="unknown")
+    assert client.get("/api/paths/", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
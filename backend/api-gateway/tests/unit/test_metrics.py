@@ -0,0 +1,64 @@
+import httpx
+
+from app.core.config import settings
+from app.core import metrics
+from app.core.metrics import Histogram, HTTP_REQUEST_DURATION, UPSTREAM_REQUEST_DURATION
+
+
+def test_metrics_endpoint_exposes_prometheus_text(client, upstream):
+    client.get("/api/paths/42")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert "# TYPE http_requests_in_flight gauge" in body
+    assert 'upstream_request_duration_seconds_count{service="path-service",method="GET",status="200"}' in body
+
+
+def test_routes_are_labelled_by_prefix_not_raw_path(client, upstream):
+    before = HTTP_REQUEST_DURATION.count("GET", "/api/paths", "200")
+
+    for path_id in range(5):
+        client.get(f"/api/paths/{path_id}")
+
+    assert HTTP_REQUEST_DURATION.count("GET", "/api/paths", "200") == before + 5
+    assert HTTP_REQUEST_DURATION.count("GET", "/api/paths/3", "200") == 0
+
+
+def test_upstream_errors_are_recorded(client, upstream):
+    def refuse(request):
+        raise httpx.ConnectError("connessione rifiutata", request=request)
+    upstream.handler = refuse
+    before = UPSTREAM_REQUEST_DURATION.count("reward-service", "GET", "error")
+
+    client.get("/api/rewards/")
+
+    # Ogni tentativo (il primo più i retry) viene registrato
+    assert UPSTREAM_REQUEST_DURATION.count("reward-service", "GET", "error") == before + 1 + settings.RETRY_MAX_RETRIES
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "/a")
+
+    lines = histogram.render()
+
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+
+
+def test_series_per_metric_are_bounded(monkeypatch):
+    monkeypatch.setattr(metrics, "MAX_SERIES_PER_METRIC", 3)
+    histogram = Histogram("bounded_seconds", "test", ("route",))
+
+    for index in range(10):
+        histogram.observe(0.1, f"/r/{index}")
+
+    assert len(histogram._series) == 3
+    assert histogram.dropped_series == 7
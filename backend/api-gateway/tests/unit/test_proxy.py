@@ -0,0 +1,74 @@
+import gzip
+
+import httpx
+import pytest
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.proxy import build_response, filter_headers
+
+
+def test_filter_headers_removes_hop_by_hop():
+    """Gli header hop-by-hop e quelli elencati in Connection non vengono inoltrati."""
+    headers = [
+        ("Connection", "keep-alive, X-Internal"),
+        ("Keep-Alive", "timeout=5"),
+        ("Transfer-Encoding", "chunked"),
+        ("X-Internal", "1"),
+        ("Set-Cookie", "a=1"),
+        ("Set-Cookie", "b=2"),
+        ("Content-Type", "application/json"),
+    ]
+
+    assert filter_headers(headers) == [
+        ("Set-Cookie", "a=1"),
+        ("Set-Cookie", "b=2"),
+        ("Content-Type", "application/json"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_large_response_is_streamed(monkeypatch):
+    """Le risposte oltre la soglia vengono inoltrate in streaming."""
+    monkeypatch.setattr(settings, "PROXY_BUFFER_MAX_BYTES", 10)
+    upstream = httpx.Response(
+        200,
+        headers={"Content-Type": "text/plain", "Content-Length": "100"},
+        stream=httpx.ByteStream(b"x" * 100),
+    )
+
+    response = await build_response(upstream)
+
+    assert isinstance(response, StreamingResponse)
+    assert response.headers["content-length"] == "100"
+
+
+def test_large_bodies_proxied_intact(client, upstream, monkeypatch):
+    """Corpi di richiesta e risposta grandi arrivano integri in modalità streaming."""
+    monkeypatch.setattr(settings, "PROXY_BUFFER_MAX_BYTES", 16)
+    monkeypatch.setattr(settings, "PROXY_STREAM_CHUNK_SIZE", 8)
+    payload = b"0123456789" * 1000
+    upstream.handler = lambda request: httpx.Response(
+        200, content=request.content, headers={"Content-Type": "application/octet-stream"}
+    )
+
+    response = client.post("/api/paths/import", content=payload)
+
+    assert response.status_code == 200
+    assert response.content == payload
+    assert upstream.requests[0].headers["content-length"] == str(len(payload))
+
+
+def test_encoded_response_forwarded_raw(client, upstream):
+    """Il corpo compresso dal servizio viene inoltrato senza decodifica."""
+    compressed = gzip.compress(b'{"ok": true}')
+    upstream.handler = lambda request: httpx.Response(
+        200,
+        content=compressed,
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+
+    response = client.get("/api/rewards/")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == {"ok": True}
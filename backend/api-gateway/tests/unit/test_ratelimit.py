@@ -0,0 +1,173 @@
+import time
+
+import pytest
+from jose import jwt
+
+from app.core.config import settings
+from app.core.ratelimit import InMemoryBackend, rate_limiter
+
+
+def bearer(sub, roles=("student",)):
+    token = jwt.encode(
+        {"sub": sub, "roles": list(roles), "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(autouse=True)
+def small_budgets(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    monkeypatch.setattr(rate_limiter, "limits", {
+        "login": {"rate": 0.01, "burst": 2},
+        "login_ip": {"rate": 0.01, "burst": 4},
+        "refresh": {"rate": 0.01, "burst": 2},
+        "auth": {"rate": 0.01, "burst": 2},
+        "submit": {"rate": 0.01, "burst": 1},
+        "read": {"rate": 0.01, "burst": 3},
+        "admin": {"rate": 0.01, "burst": 1},
+    })
+    rate_limiter.reset()
+    yield
+    rate_limiter.reset()
+
+
+def test_route_classes():
+    assert rate_limiter.route_class("POST", "/api/auth/login") == "login"
+    assert rate_limiter.route_class("POST", "/api/auth/refresh") == "refresh"
+    assert rate_limiter.route_class("POST", "/api/auth/register") == "auth"
+    assert rate_limiter.route_class("POST", "/api/quiz-attempts/submit") == "submit"
+    assert rate_limiter.route_class("POST", "/api/quizzes/12/submit") == "submit"
+    assert rate_limiter.route_class("GET", "/api/paths/") == "read"
+    assert rate_limiter.route_class("GET", "/gateway/breakers") == "admin"
+
+
+def test_user_over_budget_gets_429_with_retry_after(client, upstream):
+    """Oltre il burst il gateway risponde 429 senza contattare il servizio."""
+    headers = bearer("student-1")
+
+    for _ in range(3):
+        assert client.get("/api/paths/", headers=headers).status_code == 200
+    response = client.get("/api/paths/", headers=headers)
+
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert len(upstream.requests) == 3
+    assert rate_limiter.stats()["limited"] == {"read": 1}
+
+
+def test_budgets_are_per_user_and_per_class(client, upstream):
+    first, second = bearer("student-1"), bearer("student-2")
+
+    assert client.post("/api/quiz-attempts/submit", json={}, headers=first).status_code == 200
+    assert client.post("/api/quiz-attempts/submit", json={}, headers=first).status_code == 429
+    # Un altro utente ha il proprio bucket, e le letture hanno un budget separato
+    assert client.post("/api/quiz-attempts/submit", json={}, headers=second).status_code == 200
+    assert client.get("/api/paths/", headers=first).status_code == 200
+
+
+def refresh_body(sub):
+    token = jwt.encode(
+        {"sub": sub, "type": "refresh", "exp": int(time.time()) + 300},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"refresh_token": token}
+
+
+def test_anonymous_requests_are_limited_by_ip(client, upstream):
+    for _ in range(2):
+        assert client.post("/api/auth/register", json={"username": "a"}).status_code == 200
+    response = client.post("/api/auth/register", json={"username": "b"})
+
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+
+def test_login_is_limited_per_username_and_ip(client, upstream):
+    """Tentativi ripetuti sullo stesso account non consumano il budget degli altri."""
+    for _ in range(2):
+        assert client.post("/api/auth/login", data={"username": "anna", "password": "x"}).status_code == 200
+    response = client.post("/api/auth/login", data={"username": " Anna ", "password": "x"})
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+    assert client.post("/api/auth/login", data={"username": "marco", "password": "x"}).status_code == 200
+    # Il bucket per IP limita comunque i tentativi su molti account
+    assert client.post("/api/auth/login", data={"username": "luca", "password": "x"}).status_code == 429
+    assert rate_limiter.stats()["limited"] == {"login": 1, "login_ip": 1}
+
+
+def test_a_class_behind_one_nat_can_log_in_together(client, upstream, monkeypatch):
+    """Con i limiti predefiniti 30 studenti dietro lo stesso IP accedono insieme."""
+    monkeypatch.setattr(rate_limiter, "limits", dict(settings.RATE_LIMITS))
+
+    for index in range(30):
+        response = client.post("/api/auth/login", data={"username": f"studente{index}", "password": "x"})
+        assert response.status_code == 200
+    # Alla scadenza dei token di accesso tutti rinnovano dallo stesso IP
+    for index in range(30):
+        response = client.post("/api/auth/refresh", json=refresh_body(f"studente-{index}"))
+        assert response.status_code == 200
+
+
+def test_refresh_is_limited_per_user(client, upstream):
+    for _ in range(2):
+        assert client.post("/api/auth/refresh", json=refresh_body("student-1")).status_code == 200
+    assert client.post("/api/auth/refresh", json=refresh_body("student-1")).status_code == 429
+
+    # Stesso IP, altro utente: bucket separato
+    assert client.post("/api/auth/refresh", json=refresh_body("student-2")).status_code == 200
+    # Un token non valido ricade sul bucket per IP
+    for _ in range(2):
+        assert client.post("/api/auth/refresh", json={"refresh_token": "x"}).status_code == 200
+    assert client.post("/api/auth/refresh", json={"refresh_token": "x"}).status_code == 429
+
+
+def test_forwarded_ip_only_when_trusted(client, upstream, monkeypatch):
+    for index in range(3):
+        forwarded = {"X-Forwarded-For": f"10.0.0.{index}"}
+        response = client.post("/api/auth/register", json={}, headers=forwarded)
+    # Senza proxy fidato l'header è ignorato: stesso IP per tutte le richieste
+    assert response.status_code == 429
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+    rate_limiter.reset()
+    for index in range(3):
+        forwarded = {"X-Forwarded-For": f"10.0.0.{index}, 172.16.0.1"}
+        assert client.post("/api/auth/register", json={}, headers=forwarded).status_code == 200
+
+
+def test_admin_endpoints_have_their_own_budget(client, upstream, admin_headers):
+    assert client.get("/gateway/cache", headers=admin_headers).status_code == 200
+    assert client.get("/gateway/cache", headers=admin_headers).status_code == 429
+
+
+@pytest.mark.anyio
+async def test_token_bucket_refills_over_time():
+    backend = InMemoryBackend(max_keys=10)
+
+    assert await backend.take("k", rate=1000, burst=1) == 0
+    assert await backend.take("k", rate=1000, burst=1) > 0
+    time.sleep(0.005)
+    assert await backend.take("k", rate=1000, burst=1) == 0
+
+
+@pytest.mark.anyio
+async def test_in_memory_backend_is_bounded():
+    backend = InMemoryBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        await backend.take(key, rate=1, burst=1)
+
+    assert backend.stats()["keys"] == 2
+
+
+def test_rate_limit_stats_endpoint(client, upstream, admin_headers, monkeypatch):
+    monkeypatch.setitem(rate_limiter.limits, "admin", {"rate": 1, "burst": 5})
+    client.get("/api/paths/", headers=bearer("student-1"))
+
+    stats = client.get("/gateway/rate-limit", headers=admin_headers).json()
+
+    assert stats["backend"] == "memory"
+    assert stats["allowed"]["read"] == 1
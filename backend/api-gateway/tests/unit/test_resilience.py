@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.main import app
+from app.core.config import settings
+from app.core.resilience import CLOSED, HALF_OPEN, OPEN, upstream_guards
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "COALESCE_ENABLED", False)
+    monkeypatch.setattr(settings, "BREAKER_WINDOW_SIZE", 10)
+    monkeypatch.setattr(settings, "BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "BREAKER_ERROR_RATE_THRESHOLD", 0.5)
+    monkeypatch.setattr(settings, "BREAKER_OPEN_SECONDS", 30)
+    monkeypatch.setattr(settings, "BREAKER_HALF_OPEN_MAX_CALLS", 2)
+    upstream_guards.reset()
+    yield
+    upstream_guards.reset()
+
+
+def quiz_breaker():
+    return upstream_guards.get(settings.QUIZ_SERVICE_URL).breaker
+
+
+def test_breaker_opens_after_errors_and_fails_fast(client, upstream):
+    """Dopo troppi errori 5xx il gateway risponde 503 senza contattare il servizio."""
+    upstream.handler = lambda request: httpx.Response(500, json={"detail": "errore"})
+
+    for _ in range(4):
+        assert client.get("/api/quiz-templates").status_code == 500
+    assert quiz_breaker().state == OPEN
+
+    response = client.get("/api/quiz-templates")
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) > 0
+    assert len(upstream.requests) == 4
+
+    # Gli altri servizi non sono coinvolti
+    upstream.handler = upstream.echo
+    assert client.get("/api/rewards/").status_code == 200
+
+
+def test_client_errors_do_not_open_breaker(client, upstream):
+    upstream.handler = lambda request: httpx.Response(404, json={"detail": "non trovato"})
+
+    for _ in range(6):
+        client.get("/api/quiz-templates/99")
+
+    assert quiz_breaker().state == CLOSED
+
+
+def test_half_open_recovers_after_successful_probes(client, upstream):
+    breaker = quiz_breaker()
+    upstream.handler = lambda request: httpx.Response(503)
+    for _ in range(4):
+        client.get("/api/quiz-templates")
+    assert breaker.state == OPEN
+
+    # Trascorso il tempo di apertura il circuito lascia passare le richieste di prova
+    breaker._opened_at = time.monotonic() - settings.BREAKER_OPEN_SECONDS
+    upstream.handler = upstream.echo
+    assert client.get("/api/quiz-templates").status_code == 200
+    assert breaker.state == HALF_OPEN
+    assert client.get("/api/quiz-templates").status_code == 200
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_breaker(client, upstream):
+    breaker = quiz_breaker()
+    upstream.handler = lambda request: httpx.Response(502)
+    for _ in range(4):
+        client.get("/api/quiz-templates")
+
+    breaker._opened_at = time.monotonic() - settings.BREAKER_OPEN_SECONDS
+    assert client.get("/api/quiz-templates").status_code == 502
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+
+def test_connection_errors_count_as_failures(client, upstream):
+    def refuse(request):
+        raise httpx.ConnectError("connessione rifiutata", request=request)
+    upstream.handler = refuse
+
+    for _ in range(4):
+        assert client.get("/api/quiz-templates").status_code == 503
+    assert quiz_breaker().state == OPEN
+
+
+@pytest.mark.anyio
+async def test_bulkhead_rejects_excess_concurrency(upstream, monkeypatch):
+    """Oltre il limite di richieste contemporanee le altre vengono rifiutate."""
+    monkeypatch.setattr(settings, "BULKHEAD_LIMITS", {"quiz-service": 2})
+    monkeypatch.setattr(settings, "BULKHEAD_QUEUE_TIMEOUT", 0.01)
+
+    async def slow(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={})
+    upstream.handler = slow
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as gateway:
+        responses = await asyncio.gather(*(gateway.get("/api/quiz-templates") for _ in range(5)))
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200, 200, 503, 503, 503]
+    assert len(upstream.requests) == 2
+    bulkhead = upstream_guards.get(settings.QUIZ_SERVICE_URL).bulkhead
+    assert bulkhead.rejected == 3
+    assert bulkhead.in_flight == 0
+
+
+def test_breaker_endpoint_requires_admin(client, upstream, admin_headers):
+    client.get("/api/quiz-templates")
+
+    assert client.get("/gateway/breakers").status_code == 401
+
+    response = client.get("/gateway/breakers", headers=admin_headers)
+    assert response.status_code == 200
+    quiz = response.json()["quiz-service"]
+    assert quiz["circuit_breaker"]["state"] == CLOSED
+    assert quiz["bulkhead"]["in_flight"] == 0
@@ -0,0 +1,57 @@
+from app.core.config import settings
+from app.core.routing import RouteTable
+
+
+def test_longest_prefix_wins_regardless_of_order():
+    """Il prefisso più specifico prevale anche se definito prima di quello generale."""
+    routes = {
+        "/api/rewards/stats": "stats-service",
+        "/api/rewards": "reward-service",
+    }
+
+    table = RouteTable(routes)
+    reversed_table = RouteTable(dict(reversed(list(routes.items()))))
+
+    for t in (table, reversed_table):
+        assert t.lookup("/api/rewards/stats/42") == "stats-service"
+        assert t.lookup("/api/rewards/42") == "reward-service"
+        assert t.lookup("/api/unknown") is None
+
+
+def test_character_prefix_semantics():
+    """Come `startswith`: il prefisso non deve terminare su un separatore."""
+    table = RouteTable({"/api/quiz": "quiz-service"})
+
+    assert table.lookup("/api/quizzes/1") == "quiz-service"
+    assert table.lookup("/api/quiz-templates") == "quiz-service"
+    assert table.lookup("/api/qui") is None
+
+
+def test_overlaps_and_shadowed_prefixes_reported():
+    """Le sovrapposizioni vengono rilevate alla costruzione della tabella."""
+    table = RouteTable({
+        "/api/auth": "auth",
+        "/api/auth/parent": "auth",
+        "/api/rewards": "reward",
+        "/api/rewards/stats": "stats",
+    })
+
+    assert table.shadowed == [("/api/auth", "/api/auth/parent")]
+    assert table.overlaps == [("/api/rewards", "/api/rewards/stats")]
+
+
+def test_service_routes_match_linear_scan():
+    """Per le rotte configurate il trie dà lo stesso risultato della scansione lineare."""
+    table = RouteTable(settings.SERVICE_ROUTES)
+    paths = [
+        "/api/auth/login", "/api/auth/parent/students", "/api/users/me",
+        "/api/quiz-templates", "/api/paths/1/nodes", "/api/path-templates",
+        "/api/rewards/stats/7", "/api/user-rewards/unredeemed/1", "/api/templates",
+        "/reward/parent/1",
+    ]
+
+    for path in paths:
+        expected = max(
+            (prefix for prefix in settings.SERVICE_ROUTES if path.startswith(prefix)), key=len
+        )
+        assert table.lookup(path) == settings.SERVICE_ROUTES[expected]
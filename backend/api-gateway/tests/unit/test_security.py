@@ -0,0 +1,154 @@
+import time
+
+import pytest
+from jose import jwt
+
+from app.core.config import settings
+from app.core.security import edge_authenticator, sign_identity
+
+
+def make_token(sub="student-uuid", roles=("student",), expires_in=300, **claims):
+    payload = {"sub": sub, "roles": list(roles), "exp": int(time.time()) + expires_in, **claims}
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_cache():
+    edge_authenticator.clear()
+    yield
+    edge_authenticator.clear()
+
+
+def test_valid_token_forwards_signed_identity(client, upstream):
+    """Il gateway verifica il token e inoltra l'identità con header firmati."""
+    token = make_token(sub="u-1", roles=["parent", "admin"])
+
+    response = client.get("/api/paths/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+    forwarded = upstream.requests[0].headers
+    assert forwarded["x-user-id"] == "u-1"
+    assert forwarded["x-user-role"] == "parent"
+    assert forwarded["x-user-roles"] == "parent,admin"
+    assert forwarded["x-identity-signature"] == sign_identity(
+        "u-1", "parent", "parent,admin", forwarded["x-user-exp"], forwarded["x-identity-issued-at"]
+    )
+    assert forwarded["authorization"] == f"Bearer {token}"
+
+
+def test_invalid_token_rejected_at_edge(client, upstream):
+    """Un token non valido viene rifiutato senza contattare il servizio."""
+    expired = make_token(expires_in=-3600)
+    forged = jwt.encode({"sub": "x", "exp": int(time.time()) + 60}, "altra-chiave", algorithm="HS256")
+
+    for token in (expired, forged, "non-un-jwt"):
+        response = client.get("/api/quiz-templates", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+
+    assert upstream.requests == []
+
+
+def test_refresh_token_not_accepted_as_access_token(client, upstream):
+    token = make_token(type="refresh", roles=())
+
+    response = client.get("/api/rewards/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 401
+
+
+def test_client_identity_headers_are_stripped(client, upstream):
+    """Gli header di identità inviati dal client non arrivano ai servizi."""
+    client.get("/api/rewards/", headers={"X-User-Id": "admin", "X-User-Role": "admin"})
+
+    forwarded = upstream.requests[0].headers
+    assert "x-user-id" not in forwarded
+    assert "x-user-role" not in forwarded
+
+
+def test_public_endpoints_skip_verification(client, upstream):
+    """Sugli endpoint pubblici un token scaduto non blocca la richiesta."""
+    response = client.post(
+        "/api/auth/login",
+        data={"username": "a", "password": "b"},
+        headers={"Authorization": f"Bearer {make_token(expires_in=-3600)}"},
+    )
+
+    assert response.status_code == 200
+    assert "x-user-id" not in upstream.requests[0].headers
+
+
+def test_decoded_claims_are_cached(client, upstream):
+    token = make_token(roles=["admin"])
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for _ in range(3):
+        client.get("/api/paths/", headers=headers)
+
+    # Anche la verifica del token per l'endpoint /gateway usa la cache
+    stats = client.get("/gateway/auth-cache", headers=headers).json()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 3
+    assert stats["entries"] == 1
+
+
+def test_deactivated_user_rejected_with_valid_token(client, upstream):
+    """Dopo la disattivazione il token ancora valido non passa più dal gateway."""
+    issued_at = int(time.time()) - 5
+    token = make_token(sub="u-2", iat=issued_at)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/paths/", headers=headers).status_code == 200
+
+    edge_authenticator.deactivate_user("u-2")
+
+    response = client.get("/api/paths/", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Utente disattivato"
+    assert len(upstream.requests) == 1
+
+    # Un token emesso dopo la disattivazione (utente riattivato) è accettato
+    fresh = make_token(sub="u-2", iat=int(time.time()) + 1)
+    assert client.get("/api/paths/", headers={"Authorization": f"Bearer {fresh}"}).status_code == 200
+
+
+def test_revoked_token_rejected(client, upstream):
+    token = make_token(sub="u-3")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/rewards/", headers=headers).status_code == 200
+
+    edge_authenticator.revoke(edge_authenticator._cache_key(token))
+
+    response = client.get("/api/rewards/", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token revocato"
+    # Gli altri token dello stesso utente restano validi
+    other = make_token(sub="u-3", expires_in=600)
+    assert client.get("/api/rewards/", headers={"Authorization": f"Bearer {other}"}).status_code == 200
+
+
+def test_auth_events_from_the_auth_service(client, upstream):
+    """Logout e disattivazione arrivano come eventi e valgono per tutto il traffico."""
+    service_headers = {"X-Service-Token": settings.SERVICE_TOKEN}
+    student = make_token(sub="u-4", iat=int(time.time()) - 5)
+    logged_out = make_token(sub="u-5")
+    for token in (student, logged_out):
+        assert client.get("/api/paths/", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+    response = client.post("/api/internal/auth-events", json={"event": "user_deactivated", "user_id": "u-4"})
+    assert response.status_code == 401
+
+    response = client.post(
+        "/api/internal/auth-events",
+        json={"event": "user_deactivated", "user_id": "u-4"},
+        headers=service_headers,
+    )
+    assert response.json() == {"event": "user_deactivated", "invalidated": 1}
+    response = client.post(
+        "/api/internal/auth-events",
+        json={"event": "token_revoked", "token_hash": edge_authenticator._cache_key(logged_out)},
+        headers=service_headers,
+    )
+    assert response.status_code == 200
+
+    for token in (student, logged_out):
+        assert client.get("/api/paths/", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+    assert len(upstream.requests) == 2
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.config import settings
+from app.core.tracing import format_traceparent, parse_traceparent, start_span, tracer
+
+CLIENT_TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACING_EXPORTER", "file")
+    monkeypatch.setattr(settings, "TRACING_FILE", str(path))
+    yield path
+    tracer.shutdown()
+
+
+def exported_spans(path):
+    tracer.shutdown()
+    spans = []
+    for line in path.read_text().splitlines():
+        request = json.loads(line)
+        for resource in request["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                spans.extend(scope["spans"])
+    return spans
+
+
+def test_traceparent_parsing():
+    context = parse_traceparent(CLIENT_TRACEPARENT)
+    assert context.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert context.span_id == "00f067aa0ba902b7"
+    assert context.sampled
+    assert format_traceparent(context) == CLIENT_TRACEPARENT
+
+    for invalid in (None, "", "00-xyz-00f067aa0ba902b7-01", "ff-" + CLIENT_TRACEPARENT[3:],
+                    "00-00000000000000000000000000000000-00f067aa0ba902b7-01"):
+        assert parse_traceparent(invalid) is None
+
+
+def test_gateway_continues_client_trace(client, upstream):
+    """Il servizio riceve lo stesso trace id con lo span del gateway come padre."""
+    client.get("/api/paths/", headers={"traceparent": CLIENT_TRACEPARENT})
+
+    forwarded = parse_traceparent(upstream.requests[0].headers["traceparent"])
+    assert forwarded.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert forwarded.span_id != "00f067aa0ba902b7"
+
+
+def test_gateway_starts_trace_without_traceparent(client, upstream):
+    client.get("/api/paths/")
+
+    assert parse_traceparent(upstream.requests[0].headers["traceparent"]) is not None
+
+
+def test_server_and_client_spans_are_exported(upstream, trace_file):
+    with TestClient(app) as client:
+        client.get("/api/paths/42", headers={"traceparent": CLIENT_TRACEPARENT})
+
+    spans = exported_spans(trace_file)
+    server = next(span for span in spans if span["kind"] == 2)
+    upstream_call = next(span for span in spans if span["kind"] == 3)
+
+    assert server["name"] == "GET /api/paths"
+    assert server["parentSpanId"] == "00f067aa0ba902b7"
+    assert upstream_call["parentSpanId"] == server["spanId"]
+    assert upstream_call["name"] == "GET path-service"
+    assert {span["traceId"] for span in spans} == {"4bf92f3577b34da6a3ce929d0e0e4736"}
+    forwarded = parse_traceparent(upstream.requests[0].headers["traceparent"])
+    assert forwarded.span_id == upstream_call["spanId"]
+
+
+def test_unsampled_traces_are_propagated_but_not_exported(trace_file):
+    parent = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00")
+
+    with start_span("work", parent=parent) as span:
+        assert not span.context.sampled
+
+    tracer.shutdown()
+    assert not trace_file.exists()
@@ -0,0 +1,51 @@
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.config import settings
+from app.core.upstream import upstream_pool
+
+
+def test_proxy_uses_pooled_client(client, upstream):
+    """Le richieste verso lo stesso servizio riutilizzano lo stesso client."""
+    pooled = upstream_pool.get_client(settings.QUIZ_SERVICE_URL)
+
+    for _ in range(3):
+        response = client.get("/api/quiz-templates?limit=5")
+        assert response.status_code == 200
+        assert response.json()["path"] == "/api/quiz-templates"
+        assert response.json()["query"] == "limit=5"
+
+    assert len(upstream.requests) == 3
+    assert upstream_pool.get_client(settings.QUIZ_SERVICE_URL) is pooled
+
+
+def test_pool_stats_endpoint(client, upstream, admin_headers):
+    """L'endpoint delle statistiche riporta lo stato del pool per ogni servizio."""
+    response = client.get("/gateway/pool", headers=admin_headers)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert set(data.keys()) == set(settings.UPSTREAM_SERVICES.keys())
+    for stats in data.values():
+        assert {"in_use", "idle", "waiting", "connections", "max_connections"} <= stats.keys()
+
+
+def test_shared_client_does_not_store_cookies(client, upstream):
+    """Un Set-Cookie di un servizio non deve essere inoltrato alle richieste successive."""
+    upstream.handler = lambda request: httpx.Response(
+        200, json={"cookie": request.headers.get("cookie")}, headers={"set-cookie": "session=abc; Path=/"}
+    )
+
+    client.get("/api/users/me")
+    client.cookies.clear()
+    response = client.get("/api/users/me")
+
+    assert response.json()["cookie"] is None
+
+
+def test_pool_closed_on_shutdown(upstream):
+    """Allo spegnimento del gateway tutti i client vengono chiusi."""
+    with TestClient(app):
+        clients = list(upstream_pool._clients.values())
+    assert clients and all(c.is_closed for c in clients)
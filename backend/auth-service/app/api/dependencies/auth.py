@@ -5,6 +5,7 @@ from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.principal_cache import Principal, principal_cache
 from app.core.security import decode_token
 from app.db.base import get_db
 from app.db.repositories.user_repository import UserRepository
@@ -16,12 +17,13 @@ oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
-async def get_current_user(
+async def get_current_principal(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     """
-    Verifica il token JWT e ottiene l'utente corrente.
+    Verifica il token JWT e ottiene il principal dell'utente corrente
+    (identità, stato e ruoli), dalla cache quando possibile.
     """
     try:
         # Decodifica il token
@@ -39,9 +41,27 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Ottieni l'utente dal database
-    user = UserRepository.get_by_uuid(db, token_data.sub)
+    # Ottieni utente e ruoli (una query in caso di cache miss)
+    principal = UserRepository.get_principal(db, token_data.sub)
+    if not principal:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Utente non trovato",
+        )
+    
+    return principal
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Ottiene l'utente corrente. I controlli di stato e ruolo usano il
+    principal: i ruoli dell'utente vengono caricati solo se l'endpoint li usa.
+    """
+    user = db.get(User, principal.id)
     if not user:
+        principal_cache.invalidate(principal.uuid)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Utente non trovato",
@@ -50,12 +70,13 @@ async def get_current_user(
     return user
 
 async def get_current_active_user(
+    principal: Principal = Depends(get_current_principal),
     current_user: User = Depends(get_current_user)
 ) -> User:
     """
     Verifica che l'utente corrente sia attivo.
     """
-    if not current_user.is_active:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Utente inattivo",
@@ -64,13 +85,14 @@ async def get_current_active_user(
     return current_user
 
 async def get_current_admin_user(
+    principal: Principal = Depends(get_current_principal),
     current_user: User = Depends(get_current_active_user)
 ) -> User:
     """
     Verifica che l'utente corrente sia un amministratore.
     """
     # Verifica se l'utente ha il ruolo admin
-    if not any(role.name == "admin" for role in current_user.roles):
+    if not principal.has_role("admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Permessi insufficienti",
@@ -79,13 +101,14 @@ async def get_current_admin_user(
     return current_user
 
 async def get_current_parent_user(
+    principal: Principal = Depends(get_current_principal),
     current_user: User = Depends(get_current_active_user)
 ) -> User:
     """
     Verifica che l'utente corrente sia un genitore.
     """
     # Verifica se l'utente ha il ruolo parent
-    if not any(role.name == "parent" for role in current_user.roles):
+    if not principal.has_role("parent"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Permessi insufficienti. È richiesto il ruolo di genitore.",
@@ -94,13 +117,14 @@ async def get_current_parent_user(
     return current_user
 
 async def get_current_student_user(
+    principal: Principal = Depends(get_current_principal),
     current_user: User = Depends(get_current_active_user)
 ) -> User:
     """
     Verifica che l'utente corrente sia uno studente.
     """
     # Verifica se l'utente ha il ruolo student
-    if not any(role.name == "student" for role in current_user.roles):
+    if not principal.has_role("student"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Permessi insufficienti. È richiesto il ruolo di studente.",
@@ -114,10 +138,11 @@ def get_current_user_with_role(allowed_roles: list[str]):
     Esempio: get_current_user_with_role(["admin", "parent"])
     """
     async def _get_user_with_role(
+        principal: Principal = Depends(get_current_principal),
         current_user: User = Depends(get_current_active_user)
     ) -> User:
         # Verifica se l'utente ha almeno uno dei ruoli richiesti
-        if not any(role.name in allowed_roles for role in current_user.roles):
+        if not principal.has_role(*allowed_roles):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Permessi insufficienti. È richiesto uno dei seguenti ruoli: {', '.join(allowed_roles)}.",
@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Body, Header, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-from typing import Any, List
+from typing import Any, List, Optional
 import uuid
 
 from app.db.base import get_db
 from app.core.config import settings
+from app.core.events import publish_auth_event, token_hash
+from app.core.hashing import password_hasher
+from app.core.keys import key_ring
 from app.core.security import create_access_token, create_refresh_token, decode_token
+from app.core.system_stats import system_stats
 from app.db.repositories.user_repository import UserRepository
 from app.db.repositories.role_repository import RoleRepository
 from app.db.repositories.profile_repository import ParentProfileRepository
-from app.schemas.user import Token, RefreshToken, UserCreate, User, SystemStats, AdminActivity, UserInList, ParentProfileCreate
+from app.schemas.user import Token, RefreshToken, UserCreate, User, SystemStats, AdminActivity, UserInList, ParentProfileCreate, UserStatus
 from app.api.dependencies.auth import get_current_user, get_current_admin_user
 
 router = APIRouter()
@@ -24,9 +28,13 @@ async def login(
     """
     Ottiene un token di accesso JWT utilizzando username/email e password.
     """
-    # Autentica l'utente
-    user = UserRepository.authenticate(db, form_data.username, form_data.password)
-    if not user:
+    # Autentica l'utente: la verifica bcrypt gira nel pool dedicato, così
+    # l'event loop resta libero per le altre richieste
+    user = UserRepository.get_by_username_or_email(db, form_data.username)
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Username/email o password non corretti",
@@ -40,6 +48,11 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Hash calcolato con un costo bcrypt diverso da quello attuale: lo
+    # sostituiamo ora che conosciamo la password in chiaro
+    if new_hash:
+        UserRepository.update_password_hash(db, user, new_hash)
+    
     # Genera il token di accesso
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
@@ -163,11 +176,14 @@ async def refresh_token(
 
 @router.post("/logout")
 async def logout(
+    background_tasks: BackgroundTasks,
     refresh_token_data: RefreshToken = Body(...),
+    authorization: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ) -> Any:
     """
-    Revoca un token di refresh.
+    Revoca un token di refresh. Se la richiesta porta anche il token di
+    accesso, i servizi lo rifiutano da subito invece che alla scadenza.
     """
     # Revoca il token di refresh
     success = UserRepository.revoke_refresh_token(db, refresh_token_data.refresh_token)
@@ -177,8 +193,53 @@ async def logout(
             detail="Token di refresh non valido",
         )
     
+    if authorization and authorization.startswith("Bearer "):
+        access_token = authorization[len("Bearer "):]
+        access_token_data = decode_token(access_token)
+        if access_token_data:
+            background_tasks.add_task(
+                publish_auth_event,
+                "token_revoked",
+                token_hash=token_hash(access_token),
+                exp=int(access_token_data.exp),
+            )
+    
     return {"detail": "Logout effettuato con successo"}
 
+@router.get("/jwks")
+async def get_jwks(response: Response) -> Any:
+    """
+    Chiavi pubbliche (JWKS) con cui gli altri servizi verificano localmente
+    i token di accesso. Il kid nell'header del token indica la chiave.
+    """
+    response.headers["Cache-Control"] = f"public, max-age={settings.JWKS_MAX_AGE}"
+    return key_ring.jwks()
+
+@router.get("/status/{user_id}", response_model=UserStatus)
+async def get_user_status(
+    user_id: str,
+    x_service_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    Controllo online leggero per i servizi che verificano i token localmente:
+    indica solo se l'utente esiste ed è ancora attivo.
+    Accessibile solo con il token di servizio.
+    """
+    if x_service_token != settings.SERVICE_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token del servizio non valido",
+        )
+    
+    is_active = UserRepository.get_active_status(db, user_id)
+    if is_active is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Utente non trovato",
+        )
+    return UserStatus(user_id=user_id, is_active=is_active)
+
 @router.post("/register", response_model=User)
 async def register(
     user_data: UserCreate = Body(...),
@@ -219,8 +280,9 @@ async def register(
         selected_role = RoleRepository.get_by_name(db, "student")
         print(f"Usando ruolo student come fallback")
     
-    # Crea l'utente con il ruolo selezionato
-    user = UserRepository.create(db, user_data, [selected_role])
+    # Crea l'utente con il ruolo selezionato (hash calcolato nel pool bcrypt)
+    hashed_password = await password_hasher.hash(user_data.password)
+    user = UserRepository.create(db, user_data, [selected_role], hashed_password=hashed_password)
     
     # Se il ruolo è parent, crea automaticamente un profilo genitore
     if selected_role.name == "parent":
@@ -242,31 +304,27 @@ async def register(
 
 @router.get("/stats", response_model=SystemStats)
 async def get_stats(
-    db: Session = Depends(get_db),
     current_user = Depends(get_current_admin_user)
 ) -> Any:
     """
     Ottiene le statistiche del sistema. Solo per admin.
-    """
-    # In una implementazione reale, queste informazioni verrebbero recuperate dal database
-    # e da altri microservizi, ma per ora restituiamo dati segnaposto
     
-    # Otteniamo le statistiche degli utenti dal repository
-    user_stats = UserRepository.get_user_statistics(db)
-    
-    # Per i valori che provengono da altri servizi, usiamo valori segnaposto
-    # In un'implementazione reale, questi valori verrebbero recuperati dagli altri servizi
+    I conteggi degli utenti vengono dal database dell'auth-service, quelli di
+    percorsi, quiz e premi dai rispettivi servizi; il risultato è in cache
+    per STATS_CACHE_TTL secondi (vedi app.core.system_stats).
+    """
+    stats = await system_stats.get()
     return SystemStats(
-        totalUsers=user_stats.get('total_users', 0),
-        activeStudents=user_stats.get('active_students', 0),
-        activeParents=user_stats.get('active_parents', 0),
-        totalPaths=25,  # Dati segnaposto
-        completedPaths=12,  # Dati segnaposto
-        totalQuizzes=48,  # Dati segnaposto
-        completedQuizzes=36,  # Dati segnaposto
-        averageScore=78.5,  # Dati segnaposto
-        totalRewards=15,  # Dati segnaposto
-        redeemedRewards=7  # Dati segnaposto
+        totalUsers=stats.get('total_users', 0),
+        activeStudents=stats.get('active_students', 0),
+        activeParents=stats.get('active_parents', 0),
+        totalPaths=stats.get('total_paths', 0),
+        completedPaths=stats.get('completed_paths', 0),
+        totalQuizzes=stats.get('total_quizzes', 0),
+        completedQuizzes=stats.get('completed_quizzes', 0),
+        averageScore=stats.get('average_score') or 0.0,
+        totalRewards=stats.get('total_rewards', 0),
+        redeemedRewards=stats.get('redeemed_rewards', 0)
     )
 
 @router.get("/users", response_model=List[UserInList])
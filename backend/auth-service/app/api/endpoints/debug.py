@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Body
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from jose import jwt
 from pydantic import ValidationError
 import traceback
@@ -10,12 +10,27 @@ from app.db.base import get_db
 from app.db.models.user import User
 
 from app.core.config import settings
-from app.core.security import decode_token
-from app.schemas.user import TokenPayload
+from app.core.principal_cache import Principal
+from app.core.security import decode_token, decode_token_quietly
+from app.schemas.user import (
+    TokenPayload, BulkTokenVerificationRequest, BulkTokenVerificationResponse, TokenVerificationResult
+)
 from app.db.repositories.user_repository import UserRepository
 
 router = APIRouter()
 
+def _user_data(principal: Principal, decoded_token: TokenPayload) -> Dict[str, Any]:
+    """Dati dell'utente restituiti dalla verifica dei token."""
+    return {
+        "user_id": principal.uuid,
+        "email": principal.email,
+        "username": principal.username,
+        "is_active": principal.is_active,
+        "role": principal.role,  # student se l'utente non ha ruoli
+        "roles": list(principal.roles),
+        "exp": decoded_token.exp
+    }
+
 @router.post("/verify-token")
 async def verify_token(
     token_data: Dict[str, str] = Body(...),
@@ -43,8 +58,8 @@ async def verify_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Ottieni l'utente
-    user = UserRepository.get_by_uuid(db, decoded_token.sub)
+    # Ottieni utente e ruoli (dalla cache dei principal)
+    user = UserRepository.get_principal(db, decoded_token.sub)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,23 +74,60 @@ async def verify_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Estrai i nomi dei ruoli
-    role_names = [role.name for role in user.roles]
-    
     # Restituisci i dati dell'utente in formato compatibile con tutti i servizi
-    result = {
-        "user_id": user.uuid,
-        "email": user.email,
-        "username": user.username,
-        "is_active": user.is_active,
-        "role": role_names[0] if role_names else "student",  # Default role
-        "roles": role_names,
-        "exp": decoded_token.exp
-    }
+    result = _user_data(user, decoded_token)
     
     print(f"DEBUG: Verifica token completata: {result}")
     return result
 
+@router.post("/verify-tokens", response_model=BulkTokenVerificationResponse)
+async def verify_tokens(
+    request_data: BulkTokenVerificationRequest = Body(...),
+    x_service_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    Verifica più token JWT in una sola chiamata (import, replay, consegne in coda).
+    Accessibile solo con il token di servizio.
+    
+    Tutti i token vengono decodificati prima di interrogare il database; gli
+    utenti e i loro ruoli sono poi caricati con un'unica query. Il risultato
+    i-esimo corrisponde all'i-esimo token: un token non valido non fa fallire
+    la richiesta ma produce un risultato con valid=false.
+    """
+    if x_service_token != settings.SERVICE_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token del servizio non valido",
+        )
+    
+    if len(request_data.tokens) > settings.BULK_VERIFY_MAX_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Al massimo {settings.BULK_VERIFY_MAX_TOKENS} token per richiesta",
+        )
+    
+    # Senza l'output di debug di decode_token, che stamperebbe ogni payload
+    decoded_tokens = [decode_token_quietly(token) for token in request_data.tokens]
+    users = UserRepository.get_many_by_uuid_with_roles(
+        db, [decoded.sub for decoded in decoded_tokens if decoded]
+    )
+    
+    results = []
+    for decoded in decoded_tokens:
+        if not decoded:
+            results.append(TokenVerificationResult(valid=False, detail="Token non valido o decodifica fallita"))
+            continue
+        user = users.get(decoded.sub)
+        if not user:
+            results.append(TokenVerificationResult(valid=False, detail=f"Utente {decoded.sub} non trovato"))
+        elif not user.is_active:
+            results.append(TokenVerificationResult(valid=False, detail="Utente disattivato", user_id=user.uuid, is_active=False))
+        else:
+            results.append(TokenVerificationResult(valid=True, **_user_data(Principal.from_user(user), decoded)))
+    
+    return BulkTokenVerificationResponse(results=results)
+
 @router.get("/token-debug")
 async def debug_token(request: Request) -> Dict[str, Any]:
     """
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Body, Query, status
-from typing import List, Optional, Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Path, Body, Query, Response, status
+from typing import List, Optional, Any, Dict, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+import base64
+import json
 
-from app.api.dependencies.auth import get_current_user_with_role
+from app.api.dependencies.auth import get_current_principal, get_current_user_with_role
 from app.api.dependencies.database import get_db
+from app.core.principal_cache import Principal
+from app.core.hashing import password_hasher
 from app.db.repositories.user_repository import UserRepository
 from app.db.repositories.parent_profile_repository import ParentProfileRepository
 from app.db.repositories.student_profile_repository import StudentProfileRepository
@@ -75,70 +79,92 @@ async def get_parent_activities(
     
     return sample_activities
 
+# Tipo del valore nel cursore per ciascuna chiave di ordinamento
+_CURSOR_VALUE_TYPES = {"id": int, "points": int, "name": str}
+
+def _encode_cursor(sort: str, after: Tuple[Any, int]) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, *after]).encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """
+    Coppia `after` del cursore. Il cursore contiene l'ordinamento per cui è
+    stato emesso: se non coincide con `sort`, o se il valore non è del tipo
+    della chiave di ordinamento, la richiesta è rifiutata con 400 invece di
+    arrivare alla query.
+    """
+    try:
+        cursor_sort, value, profile_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        key, _ = StudentProfileRepository.SORTS[sort]
+        value_type = _CURSOR_VALUE_TYPES[key]
+        # bool è una sottoclasse di int: true/false non sono valori validi
+        valid = (
+            cursor_sort == sort
+            and type(value) is value_type
+            and type(profile_id) is int
+        )
+        if not valid:
+            raise ValueError(cursor)
+        return value, profile_id
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursore di paginazione non valido",
+        )
+
+def _format_student(row: Any) -> Dict[str, Any]:
+    """Studente nel formato atteso dal frontend."""
+    return {
+        "id": str(row.id),
+        "userId": str(row.user_id),
+        "name": row.name,
+        "username": row.username,
+        "points": row.points or 0,
+        "level": 1,  # Valore predefinito o calcolato in base ai punti
+        "age": None,  # Se disponibile nel profilo
+        "grade": row.school_grade or "Non specificato",
+        "parentId": str(row.parent_id) if row.parent_id else None,
+        "createdAt": row.created_at.isoformat() if row.created_at else None,
+        "updatedAt": row.updated_at.isoformat() if row.updated_at else None,
+        "pendingRewards": 0  # Questo valore andrà recuperato dal servizio reward quando implementato
+    }
+
 @router.get("/students", response_model=List[Dict[str, Any]])
 async def get_parent_students(
+    response: Response,
+    sort: str = Query("id", pattern="^(id|-?points|-?name)$"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    principal: Principal = Depends(get_current_principal),
     current_user: UserModel = Depends(get_current_user_with_role(["parent", "admin"])),
     db: Session = Depends(get_db)
 ) -> Any:
     """
-    Recupera gli studenti associati al genitore.
-    Solo genitori e admin possono accedere.
+    Recupera gli studenti associati al genitore (tutti gli studenti per gli
+    admin). Solo genitori e admin possono accedere.
+    
+    Gli studenti e i loro utenti sono letti con un'unica query. Ordinamento
+    con `sort` (id, points, name; -points e -name in ordine decrescente). Senza
+    `limit` restituisce l'elenco completo; con `limit` restituisce una
+    pagina e, se ce ne sono altre, l'header X-Next-Cursor da passare come
+    `cursor` per la pagina successiva.
     """
-    # Se l'utente è un amministratore e si sta cercando di recuperare tutti gli studenti
-    if "admin" in [role.name for role in current_user.roles]:
-        # Gli admin possono vedere tutti gli studenti
-        all_students = StudentProfileRepository.get_all(db)
-        formatted_students = []
-        
-        for student in all_students:
-            # Recupera l'utente associato allo studente
-            user = UserRepository.get(db, student.user_id)
-            formatted_students.append({
-                "id": str(student.id),
-                "userId": str(user.id),
-                "name": f"{user.first_name or ''} {user.last_name or ''}".strip() or user.username,
-                "username": user.username,
-                "points": student.points or 0,
-                "level": 1,  # Valore predefinito o calcolato in base ai punti
-                "age": None,  # Se disponibile nel profilo
-                "grade": student.school_grade or "Non specificato",
-                "parentId": str(student.parent_id) if student.parent_id else None,
-                "createdAt": user.created_at.isoformat() if user and user.created_at else None,
-                "updatedAt": user.updated_at.isoformat() if user and user.updated_at else None,
-                "pendingRewards": 0  # Questo valore andrà recuperato dal servizio reward quando implementato
-            })
-            
-        return formatted_students
-    else:
-        # Se l'utente è un genitore, recupera il suo profilo
-        parent_profile = ParentProfileRepository.get_by_user_id(db, current_user.id)
-        
-        if not parent_profile:
-            # Il genitore non ha un profilo
-            return []
-        
-        # Recupera tutti gli studenti associati al genitore
-        formatted_students = []
-        
-        for student in parent_profile.students:
-            # Recupera l'utente associato allo studente
-            user = UserRepository.get(db, student.user_id)
-            formatted_students.append({
-                "id": str(student.id),
-                "userId": str(user.id),
-                "name": f"{user.first_name or ''} {user.last_name or ''}".strip() or user.username,
-                "username": user.username,
-                "points": student.points or 0,
-                "level": 1,  # Valore predefinito o calcolato in base ai punti
-                "age": None,  # Se disponibile nel profilo
-                "grade": student.school_grade or "Non specificato",
-                "parentId": str(student.parent_id) if student.parent_id else None,
-                "createdAt": user.created_at.isoformat() if user and user.created_at else None,
-                "updatedAt": user.updated_at.isoformat() if user and user.updated_at else None,
-                "pendingRewards": 0  # Questo valore andrà recuperato dal servizio reward quando implementato
-            })
-            
-        return formatted_students
+    # Gli admin possono vedere tutti gli studenti, i genitori solo i propri figli
+    parent_user_id = None if principal.has_role("admin") else principal.id
+    after = _decode_cursor(cursor, sort) if cursor else None
+    
+    # Una riga in più per sapere se esiste una pagina successiva
+    rows = StudentProfileRepository.list_students(
+        db,
+        parent_user_id=parent_user_id,
+        sort=sort,
+        limit=limit + 1 if limit else None,
+        after=after,
+    )
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(sort, StudentProfileRepository.sort_key(rows[-1], sort))
+    
+    return [_format_student(row) for row in rows]
 
 @router.post("/students", response_model=StudentProfile)
 async def create_parent_student(
@@ -224,7 +250,8 @@ async def create_parent_student(
             role="student"
         )
         
-        new_user = UserRepository.create(db, user_create)
+        hashed_password = await password_hasher.hash(password)
+        new_user = UserRepository.create(db, user_create, hashed_password=hashed_password)
         
         # Aggiungi il ruolo studente all'utente
         student_role = RoleRepository.get_by_name(db, "student")
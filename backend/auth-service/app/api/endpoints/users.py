@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body, Path, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Body, Header, Path, Query
 from sqlalchemy.orm import Session
-from typing import Any, List
+from typing import Any, List, Optional
 
+from app.core.config import settings
+from app.core.events import publish_auth_event
+from app.core.hashing import password_hasher
 from app.db.base import get_db
 from app.api.dependencies.auth import get_current_user, get_current_active_user, get_current_admin_user
 from app.db.repositories.user_repository import UserRepository
@@ -11,7 +14,7 @@ from app.schemas.user import (
     User, UserCreate, UserUpdate, 
     ParentProfile, ParentProfileCreate, ParentProfileUpdate,
     StudentProfile, StudentProfileCreate, StudentProfileUpdate,
-    Role
+    Role, UserBatchRequest, UserBatchResponse, UserCard
 )
 from app.db.models.user import User as UserModel
 
@@ -31,6 +34,37 @@ async def get_users(
     users = UserRepository.get_all(db, skip=skip, limit=limit)
     return users
 
+@router.post("/batch", response_model=UserBatchResponse)
+async def get_users_batch(
+    request_data: UserBatchRequest = Body(...),
+    x_service_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    Ottiene più utenti per UUID e/o ID in una sola chiamata tra servizi:
+    dati essenziali, ruoli e genitore collegato, letti con un'unica query.
+    Accessibile solo con il token di servizio.
+    """
+    if x_service_token != settings.SERVICE_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token del servizio non valido",
+        )
+    
+    if len(request_data.uuids) + len(request_data.ids) > settings.USER_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Al massimo {settings.USER_BATCH_MAX_SIZE} utenti per richiesta",
+        )
+    
+    cards = UserRepository.get_cards(db, request_data.uuids, request_data.ids)
+    found_uuids = {card["uuid"] for card in cards}
+    found_ids = {card["id"] for card in cards}
+    missing = [uuid for uuid in request_data.uuids if uuid not in found_uuids]
+    missing += [str(user_id) for user_id in request_data.ids if user_id not in found_ids]
+    
+    return UserBatchResponse(users=[UserCard(**card) for card in cards], missing=missing)
+
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: int = Path(..., gt=0),
@@ -70,13 +104,15 @@ async def create_user(
             detail="Username già utilizzato",
         )
     
-    # Crea l'utente
-    user = UserRepository.create(db, user_data)
+    # Crea l'utente (hash calcolato nel pool bcrypt)
+    hashed_password = await password_hasher.hash(user_data.password)
+    user = UserRepository.create(db, user_data, hashed_password=hashed_password)
     
     return user
 
 @router.put("/{user_id}", response_model=User)
 async def update_user(
+    background_tasks: BackgroundTasks,
     user_id: int = Path(..., gt=0),
     user_data: UserUpdate = Body(...),
     current_user: UserModel = Depends(get_current_admin_user),
@@ -134,26 +170,28 @@ async def update_user(
         user_data = UserUpdate(**user_data_dict)
     
     # Aggiorna l'utente
-    updated_user = UserRepository.update(db, user, user_data)
+    was_active = user.is_active
+    hashed_password = await password_hasher.hash(user_data.password) if user_data.password else None
+    updated_user = UserRepository.update(db, user, user_data, hashed_password=hashed_password)
+    
+    # Utente disattivato: i servizi invalidano i suoi token in cache
+    if was_active and not updated_user.is_active:
+        background_tasks.add_task(publish_auth_event, "user_deactivated", user_id=updated_user.uuid)
     
     # Aggiorna il ruolo dell'utente se necessario
     if role_to_set:
         print(f"Aggiornamento ruolo utente a: {role_name}")
         # Rimuovi tutti i ruoli esistenti
-        updated_user.roles = []
-        db.add(updated_user)
-        db.commit()
+        UserRepository.remove_roles_from_user(db, updated_user, list(updated_user.roles))
         
         # Aggiungi il nuovo ruolo
-        updated_user.roles = [role_to_set]
-        db.add(updated_user)
-        db.commit()
-        db.refresh(updated_user)
+        updated_user = UserRepository.add_roles_to_user(db, updated_user, [role_to_set])
     
     return updated_user
 
 @router.delete("/{user_id}")
 async def delete_user(
+    background_tasks: BackgroundTasks,
     user_id: int = Path(..., gt=0),
     current_user: UserModel = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -169,6 +207,7 @@ async def delete_user(
         )
     
     # Elimina l'utente
+    user = UserRepository.get(db, user_id)
     success = UserRepository.delete(db, user_id)
     if not success:
         raise HTTPException(
@@ -176,6 +215,9 @@ async def delete_user(
             detail="Utente non trovato",
         )
     
+    # I token dell'utente eliminato non devono più essere accettati dai servizi
+    background_tasks.add_task(publish_auth_event, "user_deactivated", user_id=user.uuid)
+    
     return {"detail": "Utente eliminato con successo"}
 
 # Endpoint per i ruoli
@@ -383,13 +425,15 @@ async def update_current_user_profile(
                 detail="Username già utilizzato",
             )
     
-    # Aggiorna l'utente
-    updated_user = UserRepository.update(db, current_user, user_data)
+    # Aggiorna l'utente (hash della nuova password calcolato nel pool bcrypt)
+    hashed_password = await password_hasher.hash(user_data.password) if user_data.password else None
+    updated_user = UserRepository.update(db, current_user, user_data, hashed_password=hashed_password)
     
     return updated_user
 
 @router.put("/{user_id}/deactivate", response_model=User)
 async def deactivate_user(
+    background_tasks: BackgroundTasks,
     user_id: int = Path(..., gt=0),
     current_user: UserModel = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -412,10 +456,10 @@ async def deactivate_user(
         )
     
     # Disattiva l'utente
-    user.is_active = False
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    user = UserRepository.deactivate(db, user)
+    
+    # I servizi invalidano i token dell'utente presenti nella loro cache
+    background_tasks.add_task(publish_auth_event, "user_deactivated", user_id=user.uuid)
     
     return user
 
@@ -447,7 +491,8 @@ async def reset_user_password(
     # Utilizziamo UserUpdate per aggiornare solo la password
     user_update = UserUpdate(password=new_password)
     
-    # Aggiorna la password dell'utente
-    updated_user = UserRepository.update(db, user, user_update)
+    # Aggiorna la password dell'utente (hash calcolato nel pool bcrypt)
+    hashed_password = await password_hasher.hash(new_password)
+    updated_user = UserRepository.update(db, user, user_update, hashed_password=hashed_password)
     
     return {"detail": "Password reimpostata con successo"}
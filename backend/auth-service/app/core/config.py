@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 from pydantic import PostgresDsn, validator
@@ -19,6 +20,67 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 giorni
+    JWT_LEEWAY_SECONDS: int = int(os.getenv("JWT_LEEWAY_SECONDS", "10"))
+    
+    # Firma asimmetrica dei token di accesso: gli altri servizi li verificano
+    # localmente con le chiavi pubbliche esposte su /api/auth/jwks.
+    # JWT_PRIVATE_KEY_FILES è un elenco di file PEM separati da virgola: il
+    # primo firma, gli altri restano pubblicati durante la rotazione.
+    # I token di refresh restano firmati con SECRET_KEY (li verifica solo
+    # l'auth-service); JWT_ACCEPT_HS256 accetta anche i token di accesso
+    # HS256 emessi prima della migrazione: è disattivato di default e va
+    # attivato esplicitamente solo per ACCESS_TOKEN_EXPIRE_MINUTES dopo il
+    # passaggio a RS256
+    JWT_SIGNING_ALGORITHM: str = os.getenv("JWT_SIGNING_ALGORITHM", "RS256")
+    JWT_PRIVATE_KEY_FILES: str = os.getenv("JWT_PRIVATE_KEY_FILES", "")
+    JWT_ACCEPT_HS256: bool = os.getenv("JWT_ACCEPT_HS256", "False").lower() == "true"
+    JWKS_MAX_AGE: int = int(os.getenv("JWKS_MAX_AGE", "300"))
+    # Senza JWT_PRIVATE_KEY_FILES l'avvio fallisce, tranne in sviluppo
+    # (ENVIRONMENT=development, da impostare esplicitamente) dove una chiave
+    # viene generata una volta in JWT_DEV_KEY_FILE e condivisa da tutti i
+    # worker della stessa macchina
+    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "production")
+    JWT_DEV_KEY_FILE: str = os.getenv(
+        "JWT_DEV_KEY_FILE", os.path.join(tempfile.gettempdir(), "edu-app-auth-dev-key.pem")
+    )
+    
+    # Autenticazione tra servizi
+    SERVICE_TOKEN: str = os.getenv("SERVICE_TOKEN", "shared_service_token_for_microservices")
+    
+    # Gateway e servizi che tengono in cache i token verificati: ricevono gli
+    # eventi "user_deactivated" e "token_revoked" (URL separati da virgola).
+    # Il gateway li applica a tutto il traffico che passa da lui; con più
+    # repliche del gateway vanno elencate tutte
+    AUTH_EVENT_SUBSCRIBERS: str = os.getenv(
+        "AUTH_EVENT_SUBSCRIBERS",
+        "http://localhost:8000/api/internal/auth-events,"
+        "http://localhost:8002/api/internal/auth-events,"
+        "http://localhost:8003/api/internal/auth-events",
+    )
+    AUTH_EVENT_TIMEOUT: float = float(os.getenv("AUTH_EVENT_TIMEOUT", "2"))
+    
+    # Statistiche della dashboard admin (/api/auth/stats): i conteggi di quiz,
+    # percorsi e premi arrivano da /api/internal/stats degli altri servizi.
+    # Il risultato combinato è servito dalla cache per STATS_CACHE_TTL secondi;
+    # fino a STATS_STALE_TTL viene restituito subito e aggiornato in background
+    QUIZ_SERVICE_URL: str = os.getenv("QUIZ_SERVICE_URL", "http://localhost:8002")
+    PATH_SERVICE_URL: str = os.getenv("PATH_SERVICE_URL", "http://localhost:8003")
+    REWARD_SERVICE_URL: str = os.getenv("REWARD_SERVICE_URL", "http://localhost:8004")
+    STATS_CACHE_TTL: float = float(os.getenv("STATS_CACHE_TTL", "30"))
+    STATS_STALE_TTL: float = float(os.getenv("STATS_STALE_TTL", "300"))
+    STATS_FETCH_TIMEOUT: float = float(os.getenv("STATS_FETCH_TIMEOUT", "2"))
+    
+    # Numero massimo di token per richiesta a /api/debug/verify-tokens
+    BULK_VERIFY_MAX_TOKENS: int = int(os.getenv("BULK_VERIFY_MAX_TOKENS", "500"))
+    # Numero massimo di utenti (uuid + id) per richiesta a /api/users/batch
+    USER_BATCH_MAX_SIZE: int = int(os.getenv("USER_BATCH_MAX_SIZE", "500"))
+    
+    # Cache dei principal (utente + nomi dei ruoli) usata dall'autenticazione:
+    # al più PRINCIPAL_CACHE_SIZE voci per PRINCIPAL_CACHE_TTL secondi. Le
+    # modifiche fatte da questo processo la invalidano subito; il TTL limita
+    # quanto restano visibili dagli altri worker quelle fatte altrove
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL: float = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
     
     # Database settings
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
@@ -41,7 +103,22 @@ class Settings(BaseSettings):
     ]
     
     # Security settings
-    BCRYPT_ROUNDS: int = 12
+    # Costo bcrypt delle nuove password; gli hash con un costo diverso vengono
+    # ricalcolati in modo trasparente al login successivo
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Pool dedicato all'hashing delle password, fuori dall'event loop:
+    # PASSWORD_HASH_WORKERS operazioni in parallelo (0 = nel chiamante) e al
+    # più PASSWORD_HASH_MAX_QUEUE in attesa, oltre le quali si risponde 503
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    
+    # Tracing distribuito: il contesto W3C traceparent viene sempre propagato;
+    # gli span sono esportati in formato OTLP/JSON su file ("file") o verso un
+    # collector OTLP/HTTP ("otlp"), oppure non esportati ("none")
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
     
     model_config = {
         "case_sensitive": True,
@@ -0,0 +1,37 @@
+import hashlib
+import logging
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def token_hash(token: str) -> str:
+    """Hash del token con cui i servizi indicizzano la loro cache."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def publish_auth_event(event: str, **fields: Any) -> None:
+    """
+    Invia un evento di invalidazione ("user_deactivated", "token_revoked")
+    ai servizi in AUTH_EVENT_SUBSCRIBERS. L'invio è best effort: un servizio
+    che non lo riceve si riallinea alla scadenza della sua cache.
+    Pensata per essere eseguita come BackgroundTask, dopo la risposta.
+    """
+    subscribers = [url.strip() for url in settings.AUTH_EVENT_SUBSCRIBERS.split(",") if url.strip()]
+    payload = {"event": event, **fields}
+    for url in subscribers:
+        try:
+            response = httpx.post(
+                url,
+                json=payload,
+                headers={"X-Service-Token": settings.SERVICE_TOKEN},
+                timeout=settings.AUTH_EVENT_TIMEOUT,
+            )
+            if response.status_code >= 400:
+                logger.warning("Evento %s rifiutato da %s: %s", event, url, response.status_code)
+        except httpx.HTTPError as exc:
+            logger.warning("Invio dell'evento %s a %s non riuscito: %s", event, url, exc)
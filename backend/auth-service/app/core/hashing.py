@@ -0,0 +1,127 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.security import pwd_context
+
+PASSWORD_HASH_QUEUE_DEPTH = registry.gauge(
+    "password_hash_queue_depth",
+    "Operazioni bcrypt in attesa di un worker",
+)
+PASSWORD_HASH_IN_PROGRESS = registry.gauge(
+    "password_hash_in_progress",
+    "Operazioni bcrypt in esecuzione",
+)
+PASSWORD_HASH_WAIT = registry.histogram(
+    "password_hash_wait_seconds",
+    "Attesa in coda prima dell'hashing o della verifica di una password",
+    ("operation",),
+)
+PASSWORD_HASH_DURATION = registry.histogram(
+    "password_hash_duration_seconds",
+    "Durata dell'hashing o della verifica di una password",
+    ("operation",),
+)
+PASSWORD_HASH_REJECTED = registry.counter(
+    "password_hash_rejected_total",
+    "Operazioni bcrypt rifiutate perché la coda era piena",
+    ("operation",),
+)
+
+
+class PasswordHashingBusy(Exception):
+    """La coda delle operazioni bcrypt è piena: il client deve riprovare."""
+
+
+class PasswordHasher:
+    """
+    Hashing e verifica delle password bcrypt in un pool di thread dedicato.
+
+    bcrypt rilascia il GIL, quindi l'event loop continua a servire le altre
+    richieste (es. verify-token) mentre un login è in corso. Al più `workers`
+    operazioni girano insieme e al più `max_queue` attendono un worker; oltre
+    il limite la richiesta viene rifiutata invece di accumulare latenza.
+    Con `workers` a 0 le operazioni vengono eseguite direttamente nel
+    chiamante, come prima dell'introduzione del pool.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Operazioni inviate e non ancora concluse (in coda o in esecuzione);
+        # modificato solo dall'event loop
+        self.pending = 0
+
+    def _update_queue_depth(self) -> None:
+        in_progress = PASSWORD_HASH_IN_PROGRESS.value()
+        PASSWORD_HASH_QUEUE_DEPTH.set(max(self.pending - in_progress, 0))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        if self.workers <= 0:
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                PASSWORD_HASH_DURATION.observe(time.perf_counter() - started, operation)
+
+        if self.pending >= self.workers + self.max_queue:
+            PASSWORD_HASH_REJECTED.inc(operation)
+            raise PasswordHashingBusy()
+
+        queued_at = time.perf_counter()
+
+        def job() -> Any:
+            started = time.perf_counter()
+            PASSWORD_HASH_WAIT.observe(started - queued_at, operation)
+            PASSWORD_HASH_IN_PROGRESS.inc()
+            self._update_queue_depth()
+            try:
+                return func(*args)
+            finally:
+                PASSWORD_HASH_IN_PROGRESS.dec()
+                PASSWORD_HASH_DURATION.observe(time.perf_counter() - started, operation)
+
+        self.pending += 1
+        self._update_queue_depth()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), job)
+        finally:
+            self.pending -= 1
+            self._update_queue_depth()
+
+    async def hash(self, password: str) -> str:
+        """Hash bcrypt della password con il costo BCRYPT_ROUNDS."""
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verifica la password. Se è corretta ma l'hash è stato calcolato con
+        un costo diverso da BCRYPT_ROUNDS, restituisce anche il nuovo hash
+        da salvare al posto del precedente (rehash trasparente al login).
+        """
+        return await self._run("verify", pwd_context.verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "in_progress": int(PASSWORD_HASH_IN_PROGRESS.value()),
+        }
+
+
+password_hasher = PasswordHasher(workers=settings.PASSWORD_HASH_WORKERS, max_queue=settings.PASSWORD_HASH_MAX_QUEUE)
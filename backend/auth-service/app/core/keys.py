@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import rsa
+from jose import jwk
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _thumbprint(public_jwk: Dict[str, Any]) -> str:
+    """kid della chiave: thumbprint RFC 7638 della chiave pubblica."""
+    members = {name: public_jwk[name] for name in ("e", "kty", "n")}
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+class SigningKey:
+    """Chiave privata RSA con il suo kid e la forma pubblica JWK."""
+
+    def __init__(self, private_pem: str, algorithm: str) -> None:
+        self.private_pem = private_pem
+        self.algorithm = algorithm
+        public = jwk.construct(private_pem, algorithm).public_key().to_dict()
+        self.kid = _thumbprint(public)
+        self.public_jwk = {**public, "kid": self.kid, "use": "sig", "alg": algorithm}
+
+
+class KeyRing:
+    """
+    Chiavi di firma dei token di accesso.
+
+    La prima chiave di JWT_PRIVATE_KEY_FILES firma i nuovi token; le altre
+    restano pubblicate nel JWKS finché i token firmati con esse non sono
+    scaduti. La rotazione consiste quindi nell'aggiungere la nuova chiave in
+    testa all'elenco e nel rimuovere la vecchia dopo ACCESS_TOKEN_EXPIRE_MINUTES.
+
+    Senza file configurati, solo in sviluppo (`dev_key_file` impostato), la
+    chiave viene generata una volta e salvata in `dev_key_file`, così tutti
+    i worker della macchina firmano con la stessa chiave; altrimenti il
+    caricamento fallisce. Le chiavi vanno caricate all'avvio (`load`), non
+    alla prima richiesta.
+    """
+
+    def __init__(self, key_files: List[str], algorithm: str, dev_key_file: Optional[str] = None) -> None:
+        self.key_files = key_files
+        self.algorithm = algorithm
+        self.dev_key_file = dev_key_file
+        self._keys: Optional[List[SigningKey]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def keys(self) -> List[SigningKey]:
+        if self._keys is None:
+            with self._lock:
+                if self._keys is None:
+                    self._keys = self._load()
+        return self._keys
+
+    def load(self) -> None:
+        """Carica le chiavi (da chiamare all'avvio: fallisce subito se mancano)."""
+        self.keys
+
+    def _load(self) -> List[SigningKey]:
+        if not self.key_files:
+            if not self.dev_key_file:
+                raise RuntimeError("JWT_PRIVATE_KEY_FILES non configurato: nessuna chiave per firmare i token")
+            return [SigningKey(self._dev_key(self.dev_key_file), self.algorithm)]
+
+        keys = []
+        for path in self.key_files:
+            with open(path, "r", encoding="utf-8") as key_file:
+                keys.append(SigningKey(key_file.read(), self.algorithm))
+        return keys
+
+    @staticmethod
+    def _dev_key(path: str) -> str:
+        """
+        Chiave di sviluppo condivisa: il primo processo la genera e la
+        pubblica in modo atomico, gli altri leggono quella già presente.
+        """
+        if not os.path.exists(path):
+            logger.warning("JWT_PRIVATE_KEY_FILES non configurato: genero la chiave di sviluppo %s", path)
+            _, private_key = rsa.newkeys(2048)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, "wb") as key_file:
+                key_file.write(private_key.save_pkcs1())
+            try:
+                # Fallisce se un altro processo l'ha pubblicata nel frattempo
+                os.link(temporary, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(temporary)
+        with open(path, "r", encoding="utf-8") as key_file:
+            return key_file.read()
+
+    @property
+    def active(self) -> SigningKey:
+        """Chiave usata per firmare i nuovi token."""
+        return self.keys[0]
+
+    def get(self, kid: Optional[str]) -> Optional[SigningKey]:
+        return next((key for key in self.keys if key.kid == kid), None)
+
+    def jwks(self) -> Dict[str, Any]:
+        """Key set pubblico (RFC 7517) servito da /api/auth/jwks."""
+        return {"keys": [key.public_jwk for key in self.keys]}
+
+
+key_ring = KeyRing(
+    [path.strip() for path in settings.JWT_PRIVATE_KEY_FILES.split(",") if path.strip()],
+    settings.JWT_SIGNING_ALGORITHM,
+    dev_key_file=settings.JWT_DEV_KEY_FILE if settings.ENVIRONMENT == "development" else None,
+)
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+PRINCIPAL_CACHE_REQUESTS = registry.counter(
+    "principal_cache_requests_total",
+    "Consultazioni della cache dei principal per esito (hit, miss)",
+    ("result",),
+)
+PRINCIPAL_CACHE_INVALIDATIONS = registry.counter(
+    "principal_cache_invalidations_total",
+    "Principal rimossi dalla cache dopo una modifica dell'utente o dei ruoli",
+)
+PRINCIPAL_CACHE_ENTRIES = registry.gauge(
+    "principal_cache_entries",
+    "Principal presenti in cache",
+)
+
+
+class Principal(NamedTuple):
+    """Identità dell'utente autenticato: quanto serve per autorizzare una richiesta."""
+
+    uuid: str
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    roles: Tuple[str, ...]
+
+    @classmethod
+    def from_user(cls, user: Any) -> "Principal":
+        return cls(
+            uuid=user.uuid,
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=user.is_active,
+            roles=tuple(role.name for role in user.roles),
+        )
+
+    @property
+    def role(self) -> str:
+        """Ruolo principale, come nel payload restituito agli altri servizi."""
+        return self.roles[0] if self.roles else "student"
+
+    def has_role(self, *names: str) -> bool:
+        return any(name in self.roles for name in names)
+
+
+class PrincipalCache:
+    """
+    Cache LRU limitata dei principal indicizzata per UUID, così le richieste
+    autenticate non rileggono utente e ruoli dal database ogni volta.
+
+    Le voci vengono invalidate da UserRepository quando cambiano i ruoli, lo
+    stato o i dati dell'utente, e svuotate del tutto quando cambia un ruolo.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, uuid: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(uuid)
+            if entry is not None and entry[1] >= time.monotonic():
+                self._entries.move_to_end(uuid)
+                self.hits += 1
+                PRINCIPAL_CACHE_REQUESTS.inc("hit")
+                return entry[0]
+            if entry is not None:
+                del self._entries[uuid]
+            self.misses += 1
+        PRINCIPAL_CACHE_REQUESTS.inc("miss")
+        return None
+
+    def put(self, principal: Principal) -> None:
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[principal.uuid] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.uuid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            PRINCIPAL_CACHE_ENTRIES.set(len(self._entries))
+
+    def invalidate(self, uuid: str) -> None:
+        with self._lock:
+            removed = self._entries.pop(uuid, None) is not None
+            PRINCIPAL_CACHE_ENTRIES.set(len(self._entries))
+        if removed:
+            PRINCIPAL_CACHE_INVALIDATIONS.inc()
+
+    def clear(self) -> None:
+        """Svuota la cache (es. dopo la modifica o l'eliminazione di un ruolo)."""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            PRINCIPAL_CACHE_ENTRIES.set(0)
+        PRINCIPAL_CACHE_INVALIDATIONS.inc(amount=removed)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+principal_cache = PrincipalCache(max_entries=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
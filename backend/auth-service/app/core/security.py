@@ -1,15 +1,16 @@
 from datetime import datetime, timedelta, timezone
-from typing import Any, List, Optional, Union
+from typing import Any, List, Optional, Tuple, Union
 
 from jose import jwt
 from passlib.context import CryptContext
 from pydantic import ValidationError
 
 from app.core.config import settings
+from app.core.keys import key_ring
 from app.schemas.user import TokenPayload
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing (costo configurabile con BCRYPT_ROUNDS)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica che la password in chiaro corrisponda a quella hashata."""
@@ -31,17 +32,27 @@ def create_access_token(subject: Union[str, Any], roles: List[str], expires_delt
     Returns:
         Token JWT codificato
     """
+    issued_at = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = issued_at + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = issued_at + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode = {
         "exp": int(expire.timestamp()),  # Conversione esplicita in intero per compatibilità standard JWT
+        # Il gateway rifiuta i token emessi prima della disattivazione dell'utente
+        "iat": int(issued_at.timestamp()),
         "sub": str(subject),
         "roles": roles
     }
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    # Firma asimmetrica: il kid nell'header indica quale chiave del JWKS usare
+    signing_key = key_ring.active
+    encoded_jwt = jwt.encode(
+        to_encode,
+        signing_key.private_pem,
+        algorithm=signing_key.algorithm,
+        headers={"kid": signing_key.kid},
+    )
     return encoded_jwt
 
 def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
@@ -68,6 +79,70 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = No
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def _verification_key(token: str) -> Tuple[Any, str]:
+    """
+    Chiave e algoritmo con cui verificare il token, in base al suo header:
+    la chiave pubblica indicata dal kid per i token di accesso asimmetrici,
+    SECRET_KEY per i token di refresh e per i token di accesso HS256 emessi
+    prima della migrazione (se JWT_ACCEPT_HS256 è attivo).
+    """
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm == settings.ALGORITHM:
+        return settings.SECRET_KEY, algorithm
+    signing_key = key_ring.get(header.get("kid"))
+    if signing_key is None or algorithm != signing_key.algorithm:
+        raise jwt.JWTError("Chiave di firma sconosciuta")
+    return signing_key.public_jwk, algorithm
+
+def _decode_payload(token: str) -> TokenPayload:
+    """
+    Verifica firma e scadenza del token e ne restituisce il payload;
+    solleva un'eccezione se il token non è valido. Non scrive nulla sui log.
+    """
+    # Decodifica il token usando la libreria jose senza verifica della scadenza
+    # per gestirla manualmente con più controllo
+    key, algorithm = _verification_key(token)
+    payload = jwt.decode(
+        token, 
+        key, 
+        algorithms=[algorithm],
+        options={"verify_exp": False}  # Disabilitiamo temporaneamente per gestire manualmente
+    )
+    
+    # I token di accesso HS256 sono accettati solo durante la migrazione
+    if algorithm == settings.ALGORITHM and payload.get("type") != "refresh" and not settings.JWT_ACCEPT_HS256:
+        raise jwt.JWTError("Token di accesso HS256 non più accettati")
+    
+    # Verifica manuale della scadenza con tolleranza di 10 secondi
+    if "exp" in payload:
+        exp_timestamp = payload["exp"]
+        current_time = int(datetime.now(timezone.utc).timestamp())
+        
+        # Verifica se il token è scaduto con la tolleranza JWT_LEEWAY_SECONDS (10 secondi)
+        if current_time > exp_timestamp + settings.JWT_LEEWAY_SECONDS:
+            raise jwt.JWTError(f"Token expired. Current time: {current_time}, exp: {exp_timestamp}")
+    
+    # Creazione del TokenPayload con gestione esplicita dei tipi
+    # Assicuriamoci che tutti i campi siano nel formato corretto
+    cleaned_payload = {
+        'sub': str(payload.get('sub', '')),
+        'exp': payload.get('exp'),  # Può essere int o float grazie alla modifica in TokenPayload
+        'roles': payload.get('roles', [])
+    }
+    
+    return TokenPayload(**cleaned_payload)
+
+def decode_token_quietly(token: str) -> Optional[TokenPayload]:
+    """
+    Come decode_token ma senza output di debug: per le verifiche in blocco,
+    dove stampare payload ed errori di ogni token riempirebbe i log.
+    """
+    try:
+        return _decode_payload(token)
+    except Exception:
+        return None
+
 def decode_token(token: str) -> Optional[TokenPayload]:
     """
     Decodifica un token JWT.
@@ -96,36 +171,7 @@ def decode_token(token: str) -> Optional[TokenPayload]:
         except Exception as e:
             print(f"DEBUG: Error inspecting token: {e}")
             
-        # Decodifica il token usando la libreria jose
-        # Decodifica il token usando la libreria jose senza verifica della scadenza
-        # per gestirla manualmente con più controllo
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM],
-            options={"verify_exp": False}  # Disabilitiamo temporaneamente per gestire manualmente
-        )
-        
-        # Verifica manuale della scadenza con tolleranza di 10 secondi
-        if "exp" in payload:
-            exp_timestamp = payload["exp"]
-            current_time = int(datetime.now(timezone.utc).timestamp())
-            
-            # Verifica se il token è scaduto con una tolleranza di 10 secondi
-            if current_time > exp_timestamp + 10:  # Tolleranza di 10 secondi
-                print(f"DEBUG: Token scaduto. Current time: {current_time}, exp: {exp_timestamp}")
-                raise jwt.JWTError("Token expired")
-        
-        # Creazione del TokenPayload con gestione esplicita dei tipi
-        # Assicuriamoci che tutti i campi siano nel formato corretto
-        cleaned_payload = {
-            'sub': str(payload.get('sub', '')),
-            'exp': payload.get('exp'),  # Può essere int o float grazie alla modifica in TokenPayload
-            'roles': payload.get('roles', [])
-        }
-        
-        token_data = TokenPayload(**cleaned_payload)
-        return token_data
+        return _decode_payload(token)
     except Exception as e:
         print(f"DEBUG: Token validation error: {str(e)}")
         return None
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.base import SessionLocal
+from app.db.repositories.user_repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_REQUESTS = registry.counter(
+    "stats_cache_requests_total",
+    "Richieste delle statistiche di sistema per esito della cache (fresh, stale, miss)",
+    ("result",),
+)
+STATS_FETCH_ERRORS = registry.counter(
+    "stats_fetch_errors_total",
+    "Letture di /api/internal/stats non riuscite, per servizio",
+    ("service",),
+)
+
+
+class SystemStatsAggregator:
+    """
+    Statistiche della dashboard admin: conteggi degli utenti letti dal
+    database dell'auth-service e aggregati di quiz, percorsi e premi letti in
+    parallelo da /api/internal/stats degli altri servizi.
+
+    Il risultato combinato resta valido per `ttl` secondi. Fino a `stale_ttl`
+    viene restituito subito e aggiornato in background; oltre, la richiesta
+    attende l'aggiornamento. Gli aggiornamenti non si sovrappongono: chi
+    arriva durante un aggiornamento ne attende il risultato. Un servizio che
+    non risponde mantiene gli ultimi valori ricevuti (zero se mai letti).
+    """
+
+    def __init__(
+        self,
+        services: Dict[str, str],
+        ttl: float,
+        stale_ttl: float,
+        timeout: float,
+        session_factory: Callable[[], Any] = SessionLocal,
+    ) -> None:
+        self.services = services
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.session_factory = session_factory
+        self._service_stats: Dict[str, Dict[str, Any]] = {}
+        self._stats: Optional[Dict[str, Any]] = None
+        self._updated_at = 0.0
+        self._refresh: Optional[asyncio.Task] = None
+
+    async def get(self) -> Dict[str, Any]:
+        if self._stats is not None:
+            age = time.monotonic() - self._updated_at
+            if age < self.ttl:
+                STATS_CACHE_REQUESTS.inc("fresh")
+                return self._stats
+            if age < self.stale_ttl:
+                STATS_CACHE_REQUESTS.inc("stale")
+                self._start_refresh()
+                return self._stats
+        STATS_CACHE_REQUESTS.inc("miss")
+        # shield: se il client si disconnette l'aggiornamento prosegue per gli altri
+        return await asyncio.shield(self._start_refresh())
+
+    def clear(self) -> None:
+        self._service_stats.clear()
+        self._stats = None
+        self._updated_at = 0.0
+        self._refresh = None
+
+    def _start_refresh(self) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        if self._refresh is None or self._refresh.done() or self._refresh.get_loop() is not loop:
+            self._refresh = loop.create_task(self._collect())
+            self._refresh.add_done_callback(self._log_failure)
+        return self._refresh
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Aggiornamento delle statistiche di sistema non riuscito: %s", task.exception())
+
+    async def _collect(self) -> Dict[str, Any]:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            user_stats, *service_stats = await asyncio.gather(
+                run_in_threadpool(self._user_statistics),
+                *(self.fetch_service(client, name, url) for name, url in self.services.items()),
+            )
+
+        stats = dict(user_stats)
+        for name, values in zip(self.services, service_stats):
+            if values is not None:
+                self._service_stats[name] = values
+            stats.update(self._service_stats.get(name, {}))
+        self._stats = stats
+        self._updated_at = time.monotonic()
+        return stats
+
+    def _user_statistics(self) -> Dict[str, int]:
+        db = self.session_factory()
+        try:
+            return UserRepository.get_user_statistics(db)
+        finally:
+            db.close()
+
+    async def fetch_service(self, client: httpx.AsyncClient, name: str, url: str) -> Optional[Dict[str, Any]]:
+        """Aggregati di un servizio; None (e un warning) se la lettura non riesce."""
+        try:
+            response = await client.get(
+                f"{url}/api/internal/stats",
+                headers={"X-Service-Token": settings.SERVICE_TOKEN},
+            )
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            STATS_FETCH_ERRORS.inc(name)
+            logger.warning("Statistiche di %s non disponibili: %s", name, exc)
+            return None
+
+
+system_stats = SystemStatsAggregator(
+    services={
+        "quiz-service": settings.QUIZ_SERVICE_URL,
+        "path-service": settings.PATH_SERVICE_URL,
+        "reward-service": settings.REWARD_SERVICE_URL,
+    },
+    ttl=settings.STATS_CACHE_TTL,
+    stale_ttl=settings.STATS_STALE_TTL,
+    timeout=settings.STATS_FETCH_TIMEOUT,
+)
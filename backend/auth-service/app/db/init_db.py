@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 
+from app.core.security import get_password_hash
 from app.db.base import Base, engine
 from app.db.repositories.role_repository import RoleRepository
 from app.db.repositories.user_repository import UserRepository
@@ -32,7 +33,12 @@ def init_db(db: Session) -> None:
             is_active=True
         )
         
-        admin_user = UserRepository.create(db, admin_user_data, [admin_role])
+        admin_user = UserRepository.create(
+            db,
+            admin_user_data,
+            [admin_role],
+            hashed_password=get_password_hash(admin_user_data.password),
+        )
         print(f"Utente admin creato: {admin_user.username} ({admin_user.email})")
     else:
         print(f"Utente admin già esistente: {admin_user.username} ({admin_user.email})")
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
 
+from app.core.principal_cache import principal_cache
 from app.db.models.user import Role
 from app.schemas.user import RoleCreate, RoleUpdate
 
@@ -47,6 +48,8 @@ class RoleRepository:
         db.add(role)
         db.commit()
         db.refresh(role)
+        # Il nome del ruolo compare nei principal di tutti i suoi utenti
+        principal_cache.clear()
         
         return role
     
@@ -57,6 +60,7 @@ class RoleRepository:
         if role:
             db.delete(role)
             db.commit()
+            principal_cache.clear()
             return True
         return False
     
@@ -1,8 +1,9 @@
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.db.models.user import User, StudentProfile
+from app.db.models.user import User, ParentProfile, StudentProfile
 from app.schemas.user import UserCreate
 
 
@@ -43,4 +44,88 @@ class StudentProfileRepository:
     @staticmethod
     def get_all(db: Session) -> List[StudentProfile]:
         """Recupera tutti i profili studente nel sistema"""
-        return db.query(StudentProfile).all()
\ No newline at end of file
+        return db.query(StudentProfile).all()
+    
+    # Ordinamenti ammessi per list_students: (chiave, discendente)
+    SORTS = {
+        "id": ("id", False),
+        "points": ("points", False),
+        "-points": ("points", True),
+        "name": ("name", False),
+        "-name": ("name", True),
+    }
+    
+    @staticmethod
+    def list_students(
+        db: Session,
+        parent_user_id: Optional[int] = None,
+        sort: str = "id",
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, int]] = None,
+    ) -> List[Any]:
+        """
+        Elenco degli studenti con i dati dell'utente, in un'unica query che
+        legge solo le colonne necessarie. Con `parent_user_id` restituisce
+        solo i figli del genitore con quell'ID utente.
+        
+        Paginazione keyset: `after` è la coppia (valore di ordinamento, id del
+        profilo) dell'ultima riga della pagina precedente, restituita da
+        `sort_key`; l'id del profilo rende l'ordine stabile a parità di valore.
+        """
+        key, descending = StudentProfileRepository.SORTS[sort]
+        name = func.coalesce(
+            func.nullif(
+                func.trim(func.coalesce(User.first_name, "") + " " + func.coalesce(User.last_name, "")),
+                "",
+            ),
+            User.username,
+        )
+        sort_column = {
+            "id": StudentProfile.id,
+            "points": func.coalesce(StudentProfile.points, 0),
+            "name": name,
+        }[key]
+        
+        query = (
+            db.query(
+                StudentProfile.id,
+                StudentProfile.points,
+                StudentProfile.school_grade,
+                StudentProfile.parent_id,
+                User.id.label("user_id"),
+                User.username,
+                User.first_name,
+                User.last_name,
+                User.created_at,
+                User.updated_at,
+                name.label("name"),
+            )
+            .join(User, User.id == StudentProfile.user_id)
+        )
+        if parent_user_id is not None:
+            query = query.join(ParentProfile, ParentProfile.id == StudentProfile.parent_id).filter(
+                ParentProfile.user_id == parent_user_id
+            )
+        
+        if after is not None:
+            value, profile_id = after
+            if key == "id":
+                query = query.filter(StudentProfile.id > profile_id)
+            else:
+                beyond = sort_column < value if descending else sort_column > value
+                query = query.filter(
+                    or_(beyond, and_(sort_column == value, StudentProfile.id > profile_id))
+                )
+        
+        order = sort_column.desc() if descending else sort_column.asc()
+        query = query.order_by(order) if key == "id" else query.order_by(order, StudentProfile.id.asc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+    
+    @staticmethod
+    def sort_key(row: Any, sort: str) -> Tuple[Any, int]:
+        """Coppia (valore di ordinamento, id del profilo) da usare come `after`."""
+        key, _ = StudentProfileRepository.SORTS[sort]
+        value = {"id": row.id, "points": row.points or 0, "name": row.name}[key]
+        return value, row.id
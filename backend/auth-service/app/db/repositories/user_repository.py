@@ -1,10 +1,10 @@
 from typing import List, Optional, Dict, Any, Union
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy import and_, case, func, or_
 
-from app.db.models.user import User, Role, ParentProfile, StudentProfile, RefreshToken
+from app.db.models.user import User, Role, ParentProfile, StudentProfile, RefreshToken, user_role
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash
+from app.core.principal_cache import Principal, principal_cache
 
 class UserRepository:
     """Repository per la gestione degli utenti."""
@@ -29,17 +29,132 @@ class UserRepository:
         """Ottiene un utente dal database per UUID."""
         return db.query(User).filter(User.uuid == uuid).first()
     
+    @staticmethod
+    def get_many_by_uuid_with_roles(db: Session, uuids: List[str]) -> Dict[str, User]:
+        """
+        Ottiene più utenti per UUID con i loro ruoli in un'unica query
+        (IN sugli UUID e join eager dei ruoli). Restituisce un dizionario
+        UUID -> utente; gli UUID inesistenti non compaiono.
+        """
+        if not uuids:
+            return {}
+        users = (
+            db.query(User)
+            .options(joinedload(User.roles))
+            .filter(User.uuid.in_(set(uuids)))
+            .all()
+        )
+        return {user.uuid: user for user in users}
+    
+    @staticmethod
+    def get_cards(db: Session, uuids: List[str], ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Ottiene i dati essenziali di più utenti, cercati per UUID o per ID,
+        con un'unica query: ruoli e genitore collegato (per gli studenti)
+        arrivano tramite outer join. Gli utenti sono restituiti nell'ordine
+        in cui compaiono nella richiesta, uuids prima degli ids.
+        """
+        if not uuids and not ids:
+            return []
+        
+        parent_user = aliased(User)
+        rows = (
+            db.query(
+                User.id, User.uuid, User.username, User.first_name, User.last_name, User.is_active,
+                Role.name, parent_user.uuid,
+            )
+            .outerjoin(user_role, user_role.c.user_id == User.id)
+            .outerjoin(Role, Role.id == user_role.c.role_id)
+            .outerjoin(StudentProfile, StudentProfile.user_id == User.id)
+            .outerjoin(ParentProfile, ParentProfile.id == StudentProfile.parent_id)
+            .outerjoin(parent_user, parent_user.id == ParentProfile.user_id)
+            .filter(or_(User.uuid.in_(set(uuids)), User.id.in_(set(ids))))
+            .all()
+        )
+        
+        cards: Dict[int, Dict[str, Any]] = {}
+        for user_id, uuid, username, first_name, last_name, is_active, role_name, parent_uuid in rows:
+            card = cards.get(user_id)
+            if card is None:
+                card = cards[user_id] = {
+                    "id": user_id,
+                    "uuid": uuid,
+                    "username": username,
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "is_active": is_active,
+                    "roles": [],
+                    "parent_id": parent_uuid,
+                }
+            if role_name is not None and role_name not in card["roles"]:
+                card["roles"].append(role_name)
+        
+        by_uuid = {card["uuid"]: card for card in cards.values()}
+        requested = [by_uuid.get(uuid) for uuid in uuids] + [cards.get(user_id) for user_id in ids]
+        
+        # Un utente chiesto più volte (o sia per UUID sia per ID) compare una volta sola
+        result: List[Dict[str, Any]] = []
+        for card in requested:
+            if card is not None and "role" not in card:
+                card["role"] = card["roles"][0] if card["roles"] else "student"
+                result.append(card)
+        return result
+    
+    @staticmethod
+    def get_principal(db: Session, uuid: str) -> Optional[Principal]:
+        """
+        Ottiene il principal dell'utente (identità, stato e nomi dei ruoli)
+        dalla cache oppure, se assente, con un'unica query in outer join sui
+        ruoli. None se l'utente non esiste.
+        """
+        principal = principal_cache.get(uuid)
+        if principal is not None:
+            return principal
+        
+        rows = (
+            db.query(User.id, User.uuid, User.username, User.email, User.is_active, Role.name)
+            .outerjoin(user_role, user_role.c.user_id == User.id)
+            .outerjoin(Role, Role.id == user_role.c.role_id)
+            .filter(User.uuid == uuid)
+            .all()
+        )
+        if not rows:
+            return None
+        
+        user_id, user_uuid, username, email, is_active, _ = rows[0]
+        principal = Principal(
+            uuid=user_uuid,
+            id=user_id,
+            username=username,
+            email=email,
+            is_active=is_active,
+            roles=tuple(row[5] for row in rows if row[5] is not None),
+        )
+        principal_cache.put(principal)
+        return principal
+    
+    @staticmethod
+    def get_active_status(db: Session, uuid: str) -> Optional[bool]:
+        """Ottiene solo il flag is_active dell'utente (None se non esiste)."""
+        return db.query(User.is_active).filter(User.uuid == uuid).scalar()
+    
     @staticmethod
     def get_all(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
         """Ottiene tutti gli utenti dal database."""
         return db.query(User).offset(skip).limit(limit).all()
     
     @staticmethod
-    def create(db: Session, user_create: UserCreate, roles: List[Role] = None) -> User:
-        """Crea un nuovo utente nel database."""
-        # Hash della password
-        hashed_password = get_password_hash(user_create.password)
-        
+    def create(
+        db: Session,
+        user_create: UserCreate,
+        roles: List[Role] = None,
+        *,
+        hashed_password: str,
+    ) -> User:
+        """
+        Crea un nuovo utente nel database con l'hash della password già
+        calcolato fuori dall'event loop (vedi app.core.hashing).
+        """
         # Creazione dell'utente con dati validati da Pydantic
         db_user = User(
             email=user_create.email,
@@ -62,15 +177,24 @@ class UserRepository:
         return db_user
     
     @staticmethod
-    def update(db: Session, user: User, user_update: UserUpdate) -> User:
-        """Aggiorna un utente esistente nel database."""
+    def update(
+        db: Session,
+        user: User,
+        user_update: UserUpdate,
+        hashed_password: Optional[str] = None,
+    ) -> User:
+        """
+        Aggiorna un utente esistente nel database. Se `user_update` contiene
+        una nuova password va passato anche il suo hash, calcolato fuori
+        dall'event loop (vedi app.core.hashing).
+        """
         # Aggiorna solo i campi forniti
         update_data = user_update.dict(exclude_unset=True)
         
-        # Se viene fornita una nuova password, applica l'hashing
-        if "password" in update_data:
-            hashed_password = get_password_hash(update_data["password"])
-            del update_data["password"]
+        # La password in chiaro non viene mai salvata: si usa l'hash fornito
+        if update_data.pop("password", None) is not None:
+            if hashed_password is None:
+                raise ValueError("Nuova password senza hash: calcolarlo con password_hasher")
             update_data["hashed_password"] = hashed_password
         
         # Applica tutti gli aggiornamenti all'utente
@@ -81,38 +205,47 @@ class UserRepository:
         db.add(user)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user.uuid)
         
         return user
     
+    @staticmethod
+    def deactivate(db: Session, user: User) -> User:
+        """Disattiva un utente."""
+        user.is_active = False
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        principal_cache.invalidate(user.uuid)
+        return user
+    
     @staticmethod
     def delete(db: Session, user_id: int) -> bool:
         """Elimina un utente dal database."""
         user = db.query(User).filter(User.id == user_id).first()
         if user:
+            uuid = user.uuid
             db.delete(user)
             db.commit()
+            principal_cache.invalidate(uuid)
             return True
         return False
     
     @staticmethod
     def get_user_statistics(db: Session) -> Dict[str, int]:
-        """Ottiene statistiche sugli utenti nel sistema."""
-        from app.db.models.user import User, Role
-        
-        # Contiamo il totale degli utenti
-        total_users = db.query(User).count()
-        
-        # Contiamo gli utenti attivi con ruolo studente
-        active_students = db.query(User).join(User.roles).filter(
-            Role.name == "student",
-            User.is_active == True
-        ).count()
+        """
+        Ottiene statistiche sugli utenti nel sistema con un'unica query:
+        utenti totali e utenti attivi con ruolo studente o genitore.
+        """
+        def active_with_role(name: str):
+            return func.count(func.distinct(case((and_(Role.name == name, User.is_active == True), User.id))))
         
-        # Contiamo gli utenti attivi con ruolo genitore
-        active_parents = db.query(User).join(User.roles).filter(
-            Role.name == "parent",
-            User.is_active == True
-        ).count()
+        total_users, active_students, active_parents = (
+            db.query(func.count(func.distinct(User.id)), active_with_role("student"), active_with_role("parent"))
+            .outerjoin(user_role, user_role.c.user_id == User.id)
+            .outerjoin(Role, Role.id == user_role.c.role_id)
+            .one()
+        )
         
         return {
             "total_users": total_users,
@@ -120,15 +253,28 @@ class UserRepository:
             "active_parents": active_parents
         }
     
+    @staticmethod
+    def get_by_username_or_email(db: Session, username_or_email: str) -> Optional[User]:
+        """Ottiene un utente per username o email (la credenziale del login)."""
+        return db.query(User).filter(
+            or_(User.username == username_or_email, User.email == username_or_email)
+        ).first()
+    
+    @staticmethod
+    def update_password_hash(db: Session, user: User, hashed_password: str) -> User:
+        """Sostituisce l'hash della password (es. dopo un cambio del costo bcrypt)."""
+        user.hashed_password = hashed_password
+        db.add(user)
+        db.commit()
+        return user
+    
     @staticmethod
     def authenticate(db: Session, username_or_email: str, password: str) -> Optional[User]:
         """Autentica un utente controllando username/email e password."""
         from app.core.security import verify_password
         
         # Cerca l'utente per username o email
-        user = db.query(User).filter(
-            or_(User.username == username_or_email, User.email == username_or_email)
-        ).first()
+        user = UserRepository.get_by_username_or_email(db, username_or_email)
         
         # Verifica se l'utente esiste e la password è corretta
         if not user or not verify_password(password, user.hashed_password):
@@ -143,6 +289,7 @@ class UserRepository:
         db.add(user)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user.uuid)
         return user
     
     @staticmethod
@@ -155,6 +302,7 @@ class UserRepository:
         db.add(user)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user.uuid)
         return user
     
     @staticmethod
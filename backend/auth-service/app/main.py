@@ -5,6 +5,13 @@ import uvicorn
 import os
 import socket
 
+from fastapi.responses import JSONResponse
+
+from app.core.hashing import PasswordHashingBusy, password_hasher
+from app.core.keys import key_ring
+from app.core.metrics import setup_metrics
+from app.core.tracing import setup_tracing
+
 # Import API routers
 from app.api.endpoints import auth, users, roles, debug, parent
 
@@ -49,6 +56,26 @@ app.include_router(roles.router, prefix="/api/roles", tags=["Roles"])
 app.include_router(debug.router, prefix="/api/debug", tags=["Debug"])
 app.include_router(parent.router, prefix="/api/auth/parent", tags=["Parent"])
 
+# Metriche Prometheus (/metrics): latenza per rotta e status, richieste in corso
+setup_metrics(app)
+
+# Tracing distribuito: span per richiesta e propagazione di traceparent
+setup_tracing(app, "auth-service")
+
+# Coda bcrypt piena: meglio un 503 immediato che un login che scade
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servizio di autenticazione sovraccarico, riprovare"},
+        headers={"Retry-After": "1"},
+    )
+
+# Chiavi di firma caricate all'avvio: senza chiave il servizio non parte,
+# invece di generarne una per processo alla prima richiesta
+app.add_event_handler("startup", key_ring.load)
+app.add_event_handler("shutdown", password_hasher.shutdown)
+
 @app.get("/")
 async def health_check():
     return {"status": "ok", "service": "auth-service"}
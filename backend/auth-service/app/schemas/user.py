@@ -142,6 +142,29 @@ class TokenPayload(BaseModel):
     exp: Union[int, float]  # Accetta sia int che float per il timestamp di scadenza
     roles: List[str]
 
+# Stato dell'utente per il controllo online dei servizi che verificano i token localmente
+class UserStatus(BaseModel):
+    user_id: str
+    is_active: bool
+
+# Verifica di più token in una sola richiesta (/api/debug/verify-tokens)
+class BulkTokenVerificationRequest(BaseModel):
+    tokens: List[str]
+
+class TokenVerificationResult(BaseModel):
+    valid: bool
+    detail: Optional[str] = None
+    user_id: Optional[str] = None
+    email: Optional[str] = None
+    username: Optional[str] = None
+    is_active: Optional[bool] = None
+    role: Optional[str] = None
+    roles: List[str] = []
+    exp: Optional[Union[int, float]] = None
+
+class BulkTokenVerificationResponse(BaseModel):
+    results: List[TokenVerificationResult]
+
 # Schema per restituire gli utenti in lista
 class UserInList(BaseModel):
     id: str
@@ -158,6 +181,28 @@ class UserInList(BaseModel):
     class Config:
         from_attributes = True
 
+# Ricerca di più utenti in una sola richiesta tra servizi (/api/users/batch)
+class UserBatchRequest(BaseModel):
+    uuids: List[str] = []
+    ids: List[int] = []
+
+class UserCard(BaseModel):
+    id: int
+    uuid: str
+    username: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    is_active: bool = True
+    role: str = "student"
+    roles: List[str] = []
+    # UUID del genitore collegato (solo per gli studenti)
+    parent_id: Optional[str] = None
+
+class UserBatchResponse(BaseModel):
+    users: List[UserCard]
+    # UUID e ID richiesti ma inesistenti
+    missing: List[str] = []
+
 class RefreshToken(BaseModel):
     refresh_token: str
 
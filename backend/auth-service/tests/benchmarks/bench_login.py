@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark del login sotto concorrenza.
+
+Crea un database SQLite temporaneo con alcuni utenti, poi invia login
+concorrenti al vero `app.main:app` (in-process, con httpx e il trasporto
+ASGI) mentre un secondo gruppo di client interroga /api/auth/jwks, un
+endpoint leggero che rappresenta le richieste che non devono restare in coda
+dietro bcrypt. Per ogni modalità riporta throughput e latenza p50/p95/p99 dei
+login e delle richieste leggere:
+
+- "inline": hashing nel chiamante (PASSWORD_HASH_WORKERS=0), cioè bcrypt
+  blocca l'event loop come prima dell'introduzione del pool;
+- "pool": hashing nel pool dedicato con --workers thread.
+
+Uso (dalla cartella auth-service):
+    python tests/benchmarks/bench_login.py [--concurrency 20] [--duration 10]
+        [--workers 4] [--rounds 12] [--users 20] [--mode inline --mode pool]
+        [--output bench-login.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, SERVICE_DIR)
+
+MODES = ["inline", "pool"]
+PASSWORD = "benchpassword"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentile con interpolazione lineare su valori già ordinati."""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summary(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def setup_database(users: int) -> None:
+    """Database SQLite con `users` studenti, collegato all'app al posto di PostgreSQL."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.security import get_password_hash
+    from app.db.base import Base, get_db
+    from app.db.models.user import Role, User
+    from app.main import app
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-login-"), "auth.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with session_factory() as db:
+        role = Role(name="student", description="Studente")
+        hashed_password = get_password_hash(PASSWORD)
+        for index in range(users):
+            user = User(
+                email=f"bench{index}@example.com",
+                username=f"bench{index}",
+                hashed_password=hashed_password,
+                first_name="Bench",
+                last_name=str(index),
+                is_active=True,
+            )
+            user.roles.append(role)
+            db.add(user)
+        db.commit()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+
+async def run_mode(args: argparse.Namespace) -> Dict[str, Any]:
+    """Login e richieste leggere concorrenti per `args.duration` secondi."""
+    from app.main import app
+
+    login_latencies: List[float] = []
+    probe_latencies: List[float] = []
+    errors = {"login": 0, "probe": 0}
+
+    async with httpx.AsyncClient(app=app, base_url="http://auth-service", timeout=60) as client:
+        async def login_worker(index: int, stop_at: float) -> None:
+            data = {"username": f"bench{index % args.users}", "password": PASSWORD}
+            while time.perf_counter() < stop_at:
+                start_time = time.perf_counter()
+                response = await client.post("/api/auth/login", data=data)
+                if response.status_code != 200:
+                    errors["login"] += 1
+                    continue
+                login_latencies.append(time.perf_counter() - start_time)
+
+        async def probe_worker(stop_at: float) -> None:
+            while time.perf_counter() < stop_at:
+                start_time = time.perf_counter()
+                response = await client.get("/api/auth/jwks")
+                if response.status_code != 200:
+                    errors["probe"] += 1
+                else:
+                    probe_latencies.append(time.perf_counter() - start_time)
+                await asyncio.sleep(args.probe_interval)
+
+        started = time.perf_counter()
+        stop_at = started + args.duration
+        await asyncio.gather(
+            *(login_worker(index, stop_at) for index in range(args.concurrency)),
+            *(probe_worker(stop_at) for _ in range(args.probes)),
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "login": summary(login_latencies, errors["login"], elapsed),
+        "probe": summary(probe_latencies, errors["probe"], elapsed),
+    }
+
+
+def print_row(mode: str, target: str, result: Dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    print(
+        f"{mode:<8} {target:<6} {result['throughput_rps']:>8.1f} "
+        f"{latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f} {result['errors']:>7}"
+    )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20, help="client che eseguono login in sequenza")
+    parser.add_argument("--probes", type=int, default=4, help="client che interrogano /api/auth/jwks")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="pausa tra due richieste leggere")
+    parser.add_argument("--duration", type=float, default=10.0, help="secondi di misura per modalità")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="thread del pool bcrypt")
+    parser.add_argument("--max-queue", type=int, default=256, help="operazioni bcrypt in attesa")
+    parser.add_argument("--rounds", type=int, default=12, help="costo bcrypt (BCRYPT_ROUNDS)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--mode", action="append", choices=MODES)
+    parser.add_argument("--output", default="bench-login.json")
+    args = parser.parse_args()
+
+    # Il costo bcrypt viene letto all'import di app.core.security
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    setup_database(args.users)
+    from app.core.hashing import password_hasher
+    from app.core.keys import key_ring
+
+    # Caricamento (o generazione) della chiave di firma fuori dalla misura
+    key_ring.active
+
+    results: Dict[str, Any] = {}
+    print(f"{'modo':<8} {'target':<6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errori':>7}")
+    for mode in args.mode or MODES:
+        password_hasher.shutdown()
+        password_hasher.workers = 0 if mode == "inline" else args.workers
+        password_hasher.max_queue = args.max_queue
+        results[mode] = asyncio.run(run_mode(args))
+        print_row(mode, "login", results[mode]["login"])
+        print_row(mode, "jwks", results[mode]["probe"])
+    password_hasher.shutdown()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "concurrency": args.concurrency,
+            "probes": args.probes,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "max_queue": args.max_queue,
+            "bcrypt_rounds": args.rounds,
+        },
+        "modes": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Risultati salvati in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
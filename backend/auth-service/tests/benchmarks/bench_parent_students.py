@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark dell'elenco studenti di genitori e admin (/api/auth/parent/students).
+
+Crea un database SQLite temporaneo con un admin e alcuni genitori, misura
+l'elenco con pochi studenti, porta gli studenti a --students (10.000 di
+default) e ripete la misura. Per ogni scenario riporta latenza e numero di
+query SQL eseguite dalla richiesta; il numero di query deve restare lo stesso
+al crescere degli studenti, altrimenti lo script termina con errore.
+
+Uso (dalla cartella auth-service):
+    python tests/benchmarks/bench_parent_students.py [--students 10000]
+        [--parents 100] [--repeat 5] [--output bench-parent-students.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, SERVICE_DIR)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.principal_cache import principal_cache  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.base import Base, get_db  # noqa: E402
+from app.db.models.user import ParentProfile, Role, StudentProfile, User, user_role  # noqa: E402
+from app.main import app  # noqa: E402
+
+INITIAL_STUDENTS = 100
+
+# Scenari: utente che chiede l'elenco e parametri della richiesta
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "admin-all": {"user": "admin", "params": {}},
+    "admin-page": {"user": "admin", "params": {"limit": 100}},
+    "admin-top-points": {"user": "admin", "params": {"sort": "-points", "limit": 50}},
+    "admin-by-name": {"user": "admin", "params": {"sort": "name", "limit": 100}},
+    "parent-all": {"user": "parent", "params": {}},
+}
+
+
+def insert_students(engine, roles: Dict[str, int], parent_profile_ids: List[int], start: int, count: int) -> None:
+    """Inserisce `count` studenti (utente, ruolo e profilo) con insert multipli."""
+    users, links, profiles = [], [], []
+    for index in range(start, start + count):
+        user_id = 1_000_000 + index
+        users.append({
+            "id": user_id,
+            "uuid": str(uuid.uuid4()),
+            "email": f"student{index}@example.com",
+            "username": f"student{index}",
+            "hashed_password": "x",
+            "first_name": f"Studente {index}",
+            "last_name": "",
+            "is_active": True,
+        })
+        links.append({"user_id": user_id, "role_id": roles["student"]})
+        profiles.append({
+            "user_id": user_id,
+            "points": (index * 37) % 1000,
+            "school_grade": str(index % 5 + 1),
+            "parent_id": parent_profile_ids[index % len(parent_profile_ids)],
+        })
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), users)
+        connection.execute(user_role.insert(), links)
+        connection.execute(StudentProfile.__table__.insert(), profiles)
+
+
+def setup_database(parents: int):
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-students-"), "auth.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with session_factory() as db:
+        roles = {name: Role(name=name, description=name) for name in ("admin", "parent", "student")}
+        db.add_all(roles.values())
+        admin = User(email="admin@example.com", username="admin", hashed_password="x", is_active=True)
+        admin.roles.append(roles["admin"])
+        db.add(admin)
+        parent_users = []
+        for index in range(parents):
+            parent = User(
+                email=f"parent{index}@example.com", username=f"parent{index}", hashed_password="x", is_active=True
+            )
+            parent.roles.append(roles["parent"])
+            parent.parent_profile = ParentProfile(phone_number="", address="")
+            parent_users.append(parent)
+            db.add(parent)
+        db.commit()
+        tokens = {
+            "admin": create_access_token(admin.uuid, ["admin"]),
+            "parent": create_access_token(parent_users[0].uuid, ["parent"]),
+        }
+        role_ids = {name: role.id for name, role in roles.items()}
+        parent_profile_ids = [parent.parent_profile.id for parent in parent_users]
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return engine, role_ids, parent_profile_ids, tokens
+
+
+def measure(client: TestClient, engine, token: str, params: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """Latenza media e query SQL per richiesta (con la cache dei principal vuota)."""
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    latencies, queries, rows = [], [], 0
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        for _ in range(repeat):
+            principal_cache.clear()
+            statements.clear()
+            start_time = time.perf_counter()
+            response = client.get(
+                "/api/auth/parent/students", params=params, headers={"Authorization": f"Bearer {token}"}
+            )
+            latencies.append(time.perf_counter() - start_time)
+            response.raise_for_status()
+            queries.append(len(statements))
+            rows = len(response.json())
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return {
+        "rows": rows,
+        "queries": max(queries),
+        "latency_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--parents", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5, help="richieste misurate per scenario")
+    parser.add_argument("--output", default="bench-parent-students.json")
+    args = parser.parse_args()
+
+    engine, role_ids, parent_profile_ids, tokens = setup_database(args.parents)
+    results: Dict[str, Dict[str, Any]] = {name: {} for name in SCENARIOS}
+    print(f"{'scenario':<18} {'studenti':>9} {'righe':>7} {'query':>6} {'ms':>9}")
+
+    with TestClient(app) as client:
+        seeded = 0
+        for total in (INITIAL_STUDENTS, max(args.students, INITIAL_STUDENTS)):
+            insert_students(engine, role_ids, parent_profile_ids, seeded, total - seeded)
+            seeded = total
+            for name, scenario in SCENARIOS.items():
+                result = measure(client, engine, tokens[scenario["user"]], scenario["params"], args.repeat)
+                results[name][str(total)] = result
+                print(f"{name:<18} {total:>9} {result['rows']:>7} {result['queries']:>6} {result['latency_ms']:>9.2f}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"students": args.students, "parents": args.parents, "repeat": args.repeat},
+        "scenarios": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Risultati salvati in {args.output}")
+
+    # Il numero di query non deve dipendere dal numero di studenti
+    growing = [
+        name for name, by_size in results.items()
+        if len({result["queries"] for result in by_size.values()}) > 1
+    ]
+    if growing:
+        sys.exit(f"Numero di query non costante negli scenari: {', '.join(growing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+import os
+
+# I test firmano con la chiave di sviluppo generata in JWT_DEV_KEY_FILE
+os.environ.setdefault("ENVIRONMENT", "development")
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
@@ -6,6 +11,7 @@ from datetime import datetime, timedelta
 
 from app.db.base import Base, get_db
 from app.main import app
+from app.core.principal_cache import principal_cache
 from app.core.security import get_password_hash
 from app.db.models.user import User, Role, ParentProfile, StudentProfile
 
@@ -14,6 +20,12 @@ SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@pytest.fixture(autouse=True)
+def empty_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
 @pytest.fixture(scope="function")
 def db():
     # Create test database tables
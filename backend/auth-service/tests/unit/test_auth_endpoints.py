@@ -1,11 +1,18 @@
+import os
 import pytest
+from unittest.mock import patch
 from datetime import datetime, timedelta, timezone
-import jwt
 from fastapi import status
+from jose import jwt
+from passlib.context import CryptContext
 
 from app.core.config import settings
-from app.core.security import create_refresh_token, get_password_hash
+from app.core.events import token_hash
+from app.core.keys import KeyRing, key_ring
+from app.core.hashing import password_hasher
+from app.core.security import create_refresh_token, get_password_hash, verify_password
 from app.db.models.user import RefreshToken
+from tests.unit.test_parent_students import bearer
 
 
 def test_login_endpoint_success(client, test_users):
@@ -28,9 +35,9 @@ def test_login_endpoint_success(client, test_users):
     
     # Verify token contents without expiration check
     payload = jwt.decode(
-        data["access_token"], 
-        settings.SECRET_KEY, 
-        algorithms=[settings.ALGORITHM],
+        data["access_token"],
+        key_ring.jwks(),
+        algorithms=[settings.JWT_SIGNING_ALGORITHM],
         options={"verify_exp": False}  # Skip expiration verification
     )
     assert payload["sub"] == test_users["admin"].uuid
@@ -84,6 +91,48 @@ def test_login_endpoint_inactive_user(client):
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+def test_login_rehashes_password_with_a_different_cost(client, db, test_users):
+    """A hash computed with an older bcrypt cost is replaced on the next login."""
+    student = test_users["student"]
+    student.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("studentpassword")
+    db.commit()
+
+    response = client.post("/api/auth/login", data={"username": "student", "password": "studentpassword"})
+
+    assert response.status_code == status.HTTP_200_OK
+    db.refresh(student)
+    assert student.hashed_password.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert verify_password("studentpassword", student.hashed_password)
+
+
+def test_login_rejected_when_hashing_queue_is_full(client, test_users, monkeypatch):
+    """Logins beyond the worker pool and queue limits get a 503 with Retry-After."""
+    monkeypatch.setattr(password_hasher, "pending", password_hasher.workers + password_hasher.max_queue)
+
+    response = client.post("/api/auth/login", data={"username": "admin", "password": "adminpassword"})
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_password_changes_are_hashed_in_the_pool(client, db, test_users, monkeypatch):
+    """Password resets go through the bcrypt pool and its queue limit."""
+    student = test_users["student"]
+    url = f"/api/users/{student.id}/reset-password"
+    headers = bearer(test_users["admin"])
+
+    response = client.put(url, json={"password": "newpassword"}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    db.refresh(student)
+    assert verify_password("newpassword", student.hashed_password)
+
+    monkeypatch.setattr(password_hasher, "pending", password_hasher.workers + password_hasher.max_queue)
+    response = client.put(url, json={"password": "otherpassword"}, headers=headers)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    db.refresh(student)
+    assert verify_password("newpassword", student.hashed_password)
+
+
 @pytest.mark.skip(reason="Token authentication needs additional configuration, tested manually")
 def test_refresh_token_endpoint(client, db, test_users):
     """Test refresh token endpoint."""
@@ -122,8 +171,8 @@ def test_refresh_token_endpoint(client, db, test_users):
     # Verify new access token without checking expiration
     payload = jwt.decode(
         data["access_token"],
-        settings.SECRET_KEY,
-        algorithms=[settings.ALGORITHM],
+        key_ring.jwks(),
+        algorithms=[settings.JWT_SIGNING_ALGORITHM],
         options={"verify_exp": False}  # Skip expiration verification
     )
     assert payload["sub"] == admin_user.uuid
@@ -175,6 +224,27 @@ def test_logout_endpoint(client, db, test_users):
             assert token.revoked is True
 
 
+def test_logout_revokes_access_token_in_services(client, test_users):
+    """Logout with the access token pushes a token_revoked event to the services."""
+    response = client.post(
+        "/api/auth/login",
+        data={"username": "student", "password": "studentpassword"},
+    )
+    tokens = response.json()
+
+    with patch("app.api.endpoints.auth.publish_auth_event") as publish:
+        response = client.post(
+            "/api/auth/logout",
+            json={"refresh_token": tokens["refresh_token"]},
+            headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    event, = publish.call_args.args
+    assert event == "token_revoked"
+    assert publish.call_args.kwargs["token_hash"] == token_hash(tokens["access_token"])
+
+
 def test_register_endpoint(client):
     """Test user registration endpoint."""
     new_user = {
@@ -266,3 +336,60 @@ def test_register_endpoint_invalid_data(client):
         json=invalid_user
     )
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_access_token_is_verifiable_with_jwks(client, test_users):
+    """The access token carries the kid of a key published on /api/auth/jwks."""
+    response = client.post(
+        "/api/auth/login",
+        data={"username": "student", "password": "studentpassword"},
+    )
+    access_token = response.json()["access_token"]
+
+    jwks = client.get("/api/auth/jwks").json()
+    assert "max-age" in client.get("/api/auth/jwks").headers["cache-control"]
+    assert all("d" not in key for key in jwks["keys"])  # public keys only
+    assert jwt.get_unverified_header(access_token)["kid"] in {key["kid"] for key in jwks["keys"]}
+
+    payload = jwt.decode(access_token, jwks, algorithms=[settings.JWT_SIGNING_ALGORITHM])
+    assert payload["sub"] == test_users["student"].uuid
+
+
+def test_dev_signing_key_is_shared_between_processes(tmp_path):
+    """Without key files, every worker signs with the same generated dev key."""
+    path = str(tmp_path / "dev-key.pem")
+    first = KeyRing([], settings.JWT_SIGNING_ALGORITHM, dev_key_file=path)
+    second = KeyRing([], settings.JWT_SIGNING_ALGORITHM, dev_key_file=path)
+
+    first.load()
+    second.load()
+
+    assert first.active.kid == second.active.kid
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_missing_signing_key_fails_outside_development():
+    with pytest.raises(RuntimeError):
+        KeyRing([], settings.JWT_SIGNING_ALGORITHM).load()
+
+
+def test_user_status_endpoint(client, test_users):
+    """Lightweight online check used by services that verify tokens locally."""
+    headers = {"X-Service-Token": settings.SERVICE_TOKEN}
+    response = client.get(f"/api/auth/status/{test_users['student'].uuid}", headers=headers)
+    assert response.json() == {"user_id": test_users["student"].uuid, "is_active": True}
+
+    response = client.get(f"/api/auth/status/{test_users['inactive'].uuid}", headers=headers)
+    assert response.json()["is_active"] is False
+
+    assert client.get("/api/auth/status/unknown", headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_user_status_requires_the_service_token(client, test_users):
+    """Only services may ask whether a user exists and is active."""
+    url = f"/api/auth/status/{test_users['student'].uuid}"
+
+    assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.get(url, headers={"X-Service-Token": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.get(url, headers=bearer(test_users["admin"])).status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,90 @@
+from sqlalchemy import event
+from fastapi import status
+
+from app.core.config import settings
+from app.core.security import create_access_token
+
+SERVICE_HEADERS = {"X-Service-Token": settings.SERVICE_TOKEN}
+
+
+def count_queries(db):
+    """Collect the SELECT statements executed on the test database."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(db.get_bind(), "before_cursor_execute", before_cursor_execute)
+
+
+def test_verify_tokens_returns_results_in_order(client, test_users):
+    """Each token gets its own result, in request order."""
+    tokens = [
+        create_access_token(test_users["admin"].uuid, ["admin"]),
+        "not-a-token",
+        create_access_token(test_users["inactive"].uuid, ["student"]),
+        create_access_token("missing-uuid", ["student"]),
+        create_access_token(test_users["parent"].uuid, ["parent"]),
+    ]
+
+    response = client.post("/api/debug/verify-tokens", json={"tokens": tokens}, headers=SERVICE_HEADERS)
+
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert [result["valid"] for result in results] == [True, False, False, False, True]
+    assert results[0]["user_id"] == test_users["admin"].uuid
+    assert results[0]["roles"] == ["admin"]
+    assert results[2]["detail"] == "Utente disattivato"
+    assert results[4]["role"] == "parent"
+
+
+def test_verify_tokens_requires_the_service_token(client, test_users):
+    token = create_access_token(test_users["admin"].uuid, ["admin"])
+
+    response = client.post("/api/debug/verify-tokens", json={"tokens": [token]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = client.post("/api/debug/verify-tokens", json={"tokens": [token]}, headers={"X-Service-Token": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_verify_tokens_does_not_print_tokens(client, test_users, capsys):
+    """Bulk verification does not write token payloads or errors to stdout."""
+    tokens = [create_access_token(test_users["admin"].uuid, ["admin"]), "not-a-token"]
+
+    response = client.post("/api/debug/verify-tokens", json={"tokens": tokens}, headers=SERVICE_HEADERS)
+
+    assert response.status_code == status.HTTP_200_OK
+    output = capsys.readouterr().out
+    assert test_users["admin"].uuid not in output
+    assert "DEBUG" not in output
+
+
+def test_verify_tokens_uses_a_single_query(client, db, test_users):
+    """Users and roles are loaded with one IN query, whatever the number of tokens."""
+    tokens = [
+        create_access_token(user.uuid, [role.name for role in user.roles])
+        for user in test_users.values()
+    ] * 5
+    db.expire_all()
+
+    statements, stop = count_queries(db)
+    try:
+        response = client.post("/api/debug/verify-tokens", json={"tokens": tokens}, headers=SERVICE_HEADERS)
+    finally:
+        stop()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["results"]) == len(tokens)
+    assert len(statements) == 1
+
+
+def test_verify_tokens_limit(client, monkeypatch):
+    """Requests above BULK_VERIFY_MAX_TOKENS are rejected."""
+    monkeypatch.setattr("app.core.config.settings.BULK_VERIFY_MAX_TOKENS", 2)
+
+    response = client.post("/api/debug/verify-tokens", json={"tokens": ["a", "b", "c"]}, headers=SERVICE_HEADERS)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,129 @@
+import base64
+import json
+
+from fastapi import status
+
+from app.core.principal_cache import principal_cache
+from app.core.security import create_access_token
+from app.db.models.user import StudentProfile, User
+from tests.unit.test_debug_endpoints import count_queries
+
+
+def bearer(user):
+    token = create_access_token(user.uuid, [role.name for role in user.roles])
+    return {"Authorization": f"Bearer {token}"}
+
+
+def add_students(db, test_roles, parent_profile, count, start=0):
+    for index in range(start, start + count):
+        user = User(
+            email=f"kid{index}@example.com",
+            username=f"kid{index}",
+            hashed_password="x",
+            first_name=f"Kid {index:03d}",
+            is_active=True,
+        )
+        user.roles.append(test_roles["student"])
+        user.student_profile = StudentProfile(points=(index * 7) % 5, parent_id=parent_profile.id)
+        db.add(user)
+    db.commit()
+
+
+def list_students(client, user, **params):
+    return client.get("/api/auth/parent/students", params=params, headers=bearer(user))
+
+
+def test_parent_sees_only_their_students(client, test_users, test_profiles):
+    """Parents get their children, admins get every student."""
+    response = list_students(client, test_users["parent"])
+
+    assert response.status_code == status.HTTP_200_OK
+    students = response.json()
+    assert [student["username"] for student in students] == ["student"]
+    assert students[0]["name"] == "Student User"
+    assert students[0]["points"] == 100
+    assert students[0]["parentId"] == str(test_profiles["parent"].id)
+    assert "X-Next-Cursor" not in response.headers
+
+    assert len(list_students(client, test_users["admin"]).json()) == 1
+
+
+def test_keyset_pagination_by_points(client, db, test_users, test_roles, test_profiles):
+    """Pages follow the requested order without gaps or duplicates."""
+    add_students(db, test_roles, test_profiles["parent"], 11)
+    expected = list_students(client, test_users["admin"], sort="-points").json()
+    points = [student["points"] for student in expected]
+    assert points == sorted(points, reverse=True)
+
+    pages, cursor = [], None
+    while True:
+        params = {"sort": "-points", "limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = list_students(client, test_users["admin"], **params)
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert [len(page) for page in pages] == [4, 4, 4]
+    assert [student["id"] for page in pages for student in page] == [student["id"] for student in expected]
+
+
+def test_sort_by_name_and_invalid_parameters(client, db, test_users, test_roles, test_profiles):
+    add_students(db, test_roles, test_profiles["parent"], 3)
+
+    names = [student["name"] for student in list_students(client, test_users["parent"], sort="name").json()]
+    assert names == sorted(names)
+
+    assert list_students(client, test_users["admin"], sort="email").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert list_students(client, test_users["admin"], cursor="not-a-cursor").status_code == status.HTTP_400_BAD_REQUEST
+
+
+def encode_cursor(*parts):
+    return base64.urlsafe_b64encode(json.dumps(list(parts)).encode("utf-8")).decode("ascii")
+
+
+def test_cursor_must_match_the_sort(client, db, test_users, test_roles, test_profiles):
+    """Cursors from another sort or with a tampered value get a 400, not a 500."""
+    add_students(db, test_roles, test_profiles["parent"], 5)
+    response = list_students(client, test_users["admin"], sort="name", limit=2)
+    cursor = response.headers["X-Next-Cursor"]
+
+    assert list_students(client, test_users["admin"], sort="name", limit=2, cursor=cursor).status_code == status.HTTP_200_OK
+    assert list_students(client, test_users["admin"], sort="-points", cursor=cursor).status_code == status.HTTP_400_BAD_REQUEST
+
+    for tampered in (
+        encode_cursor("-points", "Kid 001", 3),
+        encode_cursor("-points", True, 3),
+        encode_cursor("-points", 2, "3"),
+        encode_cursor("-points", {"a": 1}, 3),
+        encode_cursor("-points", 2),
+        encode_cursor(2, 3),
+    ):
+        response = list_students(client, test_users["admin"], sort="-points", cursor=tampered)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    assert list_students(client, test_users["admin"], sort="-points", cursor=encode_cursor("-points", 2, 3)).status_code == status.HTTP_200_OK
+
+
+def test_query_count_does_not_grow_with_students(client, db, test_users, test_roles, test_profiles):
+    """The listing costs the same number of queries for 1 or 41 students."""
+    headers = [bearer(test_users["admin"]), bearer(test_users["parent"])]
+
+    def queries_for_listing():
+        counts = []
+        for user_headers in headers:
+            principal_cache.clear()
+            db.expire_all()
+            statements, stop = count_queries(db)
+            try:
+                response = client.get("/api/auth/parent/students", headers=user_headers)
+            finally:
+                stop()
+            assert response.status_code == status.HTTP_200_OK
+            counts.append(len(statements))
+        return counts
+
+    before = queries_for_listing()
+    add_students(db, test_roles, test_profiles["parent"], 40)
+
+    assert queries_for_listing() == before
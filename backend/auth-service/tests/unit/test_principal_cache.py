@@ -0,0 +1,79 @@
+from fastapi import status
+
+from app.core.principal_cache import PRINCIPAL_CACHE_REQUESTS, principal_cache
+from app.core.security import create_access_token
+from tests.unit.test_debug_endpoints import count_queries
+
+
+def token_for(user):
+    return create_access_token(user.uuid, [role.name for role in user.roles])
+
+
+def bearer(user):
+    return {"Authorization": f"Bearer {token_for(user)}"}
+
+
+def verify(client, token):
+    return client.post("/api/debug/verify-token", json={"token": token})
+
+
+def test_principal_is_loaded_once_and_then_cached(client, db, test_users):
+    """The first verification loads user and roles in one query, the next ones hit the cache."""
+    misses_before = PRINCIPAL_CACHE_REQUESTS.value("miss")
+    hits_before = PRINCIPAL_CACHE_REQUESTS.value("hit")
+    stats_before = principal_cache.stats()
+    token = token_for(test_users["parent"])
+    db.expire_all()
+
+    statements, stop = count_queries(db)
+    try:
+        first = verify(client, token)
+        loaded = len(statements)
+        second = verify(client, token)
+    finally:
+        stop()
+
+    assert first.json()["roles"] == ["parent"]
+    assert second.json() == first.json()
+    assert loaded == 1
+    assert len(statements) == 1
+    assert PRINCIPAL_CACHE_REQUESTS.value("miss") == misses_before + 1
+    assert PRINCIPAL_CACHE_REQUESTS.value("hit") == hits_before + 1
+    assert principal_cache.stats()["hits"] == stats_before["hits"] + 1
+
+
+def test_role_changes_invalidate_the_principal(client, test_users, test_roles):
+    """Adding or removing a role is visible on the next request."""
+    student = test_users["student"]
+    admin_headers = bearer(test_users["admin"])
+    assert verify(client, token_for(student)).json()["roles"] == ["student"]
+
+    response = client.post(
+        f"/api/users/{student.id}/roles", json={"role_id": test_roles["parent"].id}, headers=admin_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(verify(client, token_for(student)).json()["roles"]) == ["parent", "student"]
+
+    response = client.delete(f"/api/users/{student.id}/roles/{test_roles['student'].id}", headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert verify(client, token_for(student)).json()["roles"] == ["parent"]
+
+
+def test_deactivation_invalidates_the_principal(client, test_users):
+    """A deactivated user is rejected right away, not when the cache entry expires."""
+    student = test_users["student"]
+    assert verify(client, token_for(student)).status_code == status.HTTP_200_OK
+
+    response = client.put(f"/api/users/{student.id}/deactivate", headers=bearer(test_users["admin"]))
+    assert response.status_code == status.HTTP_200_OK
+
+    response = verify(client, token_for(student))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json()["detail"] == "Utente disattivato"
+
+
+def test_role_checks_use_the_cached_principal(client, test_users):
+    """Admin-only endpoints authorize from the principal's role names."""
+    assert client.get("/api/users/", headers=bearer(test_users["admin"])).status_code == status.HTTP_200_OK
+    assert client.get("/api/users/", headers=bearer(test_users["student"])).status_code == status.HTTP_403_FORBIDDEN
+    assert client.get("/api/users/", headers=bearer(test_users["inactive"])).status_code == status.HTTP_403_FORBIDDEN
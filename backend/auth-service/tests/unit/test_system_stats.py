@@ -0,0 +1,201 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from app.core.system_stats import SystemStatsAggregator, system_stats
+from tests.conftest import TestingSessionLocal
+from tests.unit.test_debug_endpoints import count_queries
+from tests.unit.test_parent_students import bearer
+
+SERVICE_STATS = {
+    "quiz-service": {"total_quizzes": 10, "completed_quizzes": 4, "average_score": 72.5},
+    "path-service": {"total_paths": 6, "completed_paths": 2, "by_status": {"completed": 2, "in_progress": 4}},
+    "reward-service": {"total_rewards": 8, "active_rewards": 7, "redeemed_rewards": 3},
+}
+
+
+class FakeServices:
+    """Stands in for the HTTP calls to /api/internal/stats."""
+
+    def __init__(self):
+        self.stats = {name: dict(values) for name, values in SERVICE_STATS.items()}
+        self.calls = []
+        self.down = set()
+        self.delay = 0.0
+
+    async def __call__(self, client, name, url):
+        self.calls.append(name)
+        await asyncio.sleep(self.delay)
+        if name in self.down:
+            return None
+        return dict(self.stats[name])
+
+
+def make_aggregator(services, ttl=30, stale_ttl=300):
+    aggregator = SystemStatsAggregator(
+        services={name: f"http://{name}" for name in SERVICE_STATS},
+        ttl=ttl,
+        stale_ttl=stale_ttl,
+        timeout=1,
+        session_factory=TestingSessionLocal,
+    )
+    aggregator.fetch_service = services
+    return aggregator
+
+
+def age(aggregator, seconds):
+    aggregator._updated_at -= seconds
+
+
+@pytest.fixture
+def services():
+    return FakeServices()
+
+
+def test_user_statistics_single_query(db, test_users):
+    """Totals and active students/parents come from one query."""
+    from app.db.repositories.user_repository import UserRepository
+
+    test_users["parent"].is_active = False
+    db.commit()
+
+    statements, stop = count_queries(db)
+    try:
+        stats = UserRepository.get_user_statistics(db)
+    finally:
+        stop()
+
+    assert stats == {"total_users": 4, "active_students": 1, "active_parents": 0}
+    assert len([statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]) == 1
+
+
+def test_combines_users_and_services(test_users, services):
+    """The first request fetches every service concurrently and merges the results."""
+    services.delay = 0.2
+    aggregator = make_aggregator(services)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        stats = await aggregator.get()
+        return stats, loop.time() - started
+
+    stats, elapsed = asyncio.run(run())
+
+    assert stats["total_users"] == 4
+    assert stats["active_students"] == 1
+    assert stats["total_quizzes"] == 10
+    assert stats["completed_paths"] == 2
+    assert stats["redeemed_rewards"] == 3
+    assert sorted(services.calls) == sorted(SERVICE_STATS)
+    # Le tre chiamate sono in parallelo, non in sequenza
+    assert elapsed < 0.5
+
+
+def test_fresh_results_come_from_cache(test_users, services):
+    aggregator = make_aggregator(services)
+
+    async def run():
+        first = await aggregator.get()
+        services.stats["quiz-service"]["total_quizzes"] = 99
+        second = await aggregator.get()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert second == first
+    assert len(services.calls) == 3
+
+
+def test_stale_results_are_returned_and_refreshed_in_background(test_users, services):
+    aggregator = make_aggregator(services)
+
+    async def run():
+        await aggregator.get()
+        services.stats["quiz-service"]["total_quizzes"] = 99
+        age(aggregator, 60)
+        stale = await aggregator.get()
+        await aggregator._refresh
+        refreshed = await aggregator.get()
+        return stale, refreshed
+
+    stale, refreshed = asyncio.run(run())
+
+    assert stale["total_quizzes"] == 10
+    assert refreshed["total_quizzes"] == 99
+    assert len(services.calls) == 6
+
+
+def test_expired_results_wait_for_a_single_refresh(test_users, services):
+    """Concurrent requests without a usable result share one refresh."""
+    services.delay = 0.05
+    aggregator = make_aggregator(services)
+
+    async def run():
+        return await asyncio.gather(*(aggregator.get() for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert all(result == results[0] for result in results)
+    assert len(services.calls) == 3
+
+    services.stats["path-service"]["total_paths"] = 42
+    age(aggregator, 600)
+    assert asyncio.run(aggregator.get())["total_paths"] == 42
+
+
+def test_failed_service_keeps_last_known_values(test_users, services):
+    aggregator = make_aggregator(services)
+
+    async def run():
+        await aggregator.get()
+        services.down.add("reward-service")
+        services.stats["quiz-service"]["completed_quizzes"] = 5
+        age(aggregator, 600)
+        return await aggregator.get()
+
+    stats = asyncio.run(run())
+
+    assert stats["completed_quizzes"] == 5
+    assert stats["total_rewards"] == 8
+    assert stats["redeemed_rewards"] == 3
+
+
+def test_never_reached_service_counts_as_zero(test_users, services):
+    services.down.add("path-service")
+    stats = asyncio.run(make_aggregator(services).get())
+
+    assert stats["total_quizzes"] == 10
+    assert "total_paths" not in stats
+
+
+def test_stats_endpoint(client, test_users, services, monkeypatch):
+    """The admin endpoint maps the aggregated values onto SystemStats."""
+    monkeypatch.setattr(system_stats, "fetch_service", services)
+    monkeypatch.setattr(system_stats, "session_factory", TestingSessionLocal)
+    system_stats.clear()
+    services.down.add("path-service")
+    try:
+        response = client.get("/api/auth/stats", headers=bearer(test_users["admin"]))
+    finally:
+        system_stats.clear()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "totalUsers": 4,
+        "activeStudents": 1,
+        "activeParents": 1,
+        "totalPaths": 0,
+        "completedPaths": 0,
+        "totalQuizzes": 10,
+        "completedQuizzes": 4,
+        "averageScore": 72.5,
+        "totalRewards": 8,
+        "redeemedRewards": 3,
+    }
+
+
+def test_stats_endpoint_requires_admin(client, test_users):
+    response = client.get("/api/auth/stats", headers=bearer(test_users["student"]))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
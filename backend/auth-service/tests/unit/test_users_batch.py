@@ -0,0 +1,60 @@
+from fastapi import status
+
+from app.core.config import settings
+from tests.unit.test_debug_endpoints import count_queries
+
+SERVICE_HEADERS = {"X-Service-Token": settings.SERVICE_TOKEN}
+
+
+def test_batch_returns_cards_with_roles_and_parent(client, test_users, test_profiles):
+    """Users are returned in request order, with roles and the linked parent."""
+    student, parent, admin = test_users["student"], test_users["parent"], test_users["admin"]
+
+    response = client.post(
+        "/api/users/batch",
+        json={"uuids": [student.uuid, "missing-uuid", parent.uuid], "ids": [admin.id, student.id, 9999]},
+        headers=SERVICE_HEADERS,
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [card["uuid"] for card in data["users"]] == [student.uuid, parent.uuid, admin.uuid]
+    assert data["missing"] == ["missing-uuid", "9999"]
+
+    student_card, parent_card, admin_card = data["users"]
+    assert student_card["role"] == "student"
+    assert student_card["parent_id"] == parent.uuid
+    assert parent_card["roles"] == ["parent"]
+    assert parent_card["parent_id"] is None
+    assert admin_card["id"] == admin.id
+
+
+def test_batch_uses_a_single_query(client, db, test_users, test_profiles):
+    """Roles and parent linkage come from one joined query."""
+    uuids = [user.uuid for user in test_users.values()]
+    db.expire_all()
+
+    statements, stop = count_queries(db)
+    try:
+        response = client.post("/api/users/batch", json={"uuids": uuids}, headers=SERVICE_HEADERS)
+    finally:
+        stop()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["users"]) == len(uuids)
+    assert len(statements) == 1
+
+
+def test_batch_requires_service_token(client, test_users):
+    """Only other services can call the batch lookup."""
+    response = client.post("/api/users/batch", json={"uuids": [test_users["student"].uuid]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_batch_limit(client, monkeypatch):
+    """Requests above USER_BATCH_MAX_SIZE are rejected."""
+    monkeypatch.setattr("app.core.config.settings.USER_BATCH_MAX_SIZE", 2)
+
+    response = client.post("/api/users/batch", json={"uuids": ["a", "b"], "ids": [1]}, headers=SERVICE_HEADERS)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
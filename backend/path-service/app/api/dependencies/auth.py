@@ -3,25 +3,61 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import requests
 from typing import Dict, Optional
-import jwt
 from pydantic import BaseModel
 
 from app.core.config import settings
+from app.core import http_client
+from app.core.identity import get_gateway_identity
+from app.core.jwt_verifier import TokenVerificationError, jwt_verifier
+from app.core.token_cache import token_cache
 from app.db.base import get_db
 
 # Modello per i dati dell'utente estratti dal token
 class TokenData(BaseModel):
     user_id: str
-    email: str
+    email: Optional[str] = None
     role: str
     exp: int
 
 # Security scheme per JWT
 security = HTTPBearer()
 
+def check_user_status(user_id: str) -> Optional[bool]:
+    """
+    Controllo online leggero dopo la verifica locale del token: chiede
+    al servizio di autenticazione solo se l'utente è ancora attivo.
+    
+    Args:
+        user_id: UUID dell'utente
+        
+    Returns:
+        Optional[bool]: False se l'utente è disattivato o non esiste più,
+        None se il servizio di autenticazione non risponde
+    """
+    try:
+        response = http_client.get(
+            "auth-service",
+            f"{settings.AUTH_SERVICE_URL}/api/auth/status/{user_id}",
+            headers={"X-Service-Token": settings.SERVICE_TOKEN},
+            timeout=settings.JWKS_FETCH_TIMEOUT,
+        )
+    except requests.RequestException:
+        # In caso di errore di comunicazione con il servizio di autenticazione
+        # ci si affida alla sola verifica locale del token
+        return None
+    
+    if response.status_code == status.HTTP_404_NOT_FOUND:
+        return False
+    if response.status_code != 200:
+        return None
+    return bool(response.json().get("is_active"))
+
 def verify_token(token: str) -> Dict:
     """
-    Verifica il token JWT chiamando il servizio di autenticazione.
+    Verifica il token JWT localmente con le chiavi pubbliche del servizio
+    di autenticazione; resta online solo il controllo dell'utente
+    disattivato (JWT_STATUS_CHECK). L'esito viene conservato in cache
+    fino alla scadenza del token.
     
     Args:
         token: Il token JWT da verificare
@@ -32,50 +68,38 @@ def verify_token(token: str) -> Dict:
     Raises:
         HTTPException: Se il token è invalido o scaduto
     """
-    try:
-        # Verifica il token con il servizio di autenticazione
-        auth_service_url = f"{settings.AUTH_SERVICE_URL}/api/debug/verify-token"
-        response = requests.post(
-            auth_service_url,
-            json={"token": token}
+    if token_cache.is_revoked(token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revocato",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-        
-        if response.status_code != 200:
-            # Riporta dettagli più specifici sull'errore
-            error_detail = "Token non valido o scaduto"
-            try:
-                error_data = response.json()
-                if "detail" in error_data:
-                    error_detail = error_data["detail"]
-            except:
-                pass
-                
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=error_detail,
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Estrai i dati del token dalla risposta
-        token_data = response.json()
-        return token_data
     
-    except requests.RequestException:
-        # In caso di errore di comunicazione con il servizio di autenticazione,
-        # prova a verificare il token localmente
+    # Esito già in cache: nessuna verifica e nessuna chiamata al servizio di autenticazione
+    token_data = token_cache.get(token)
+    if token_data is None:
         try:
-            payload = jwt.decode(
-                token,
-                settings.SECRET_KEY,
-                algorithms=[settings.ALGORITHM],
-            )
-            return payload
-        except jwt.PyJWTError:
+            token_data = jwt_verifier.verify(token)
+        except TokenVerificationError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token non valido o scaduto",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        is_active = check_user_status(token_data["user_id"]) if settings.JWT_STATUS_CHECK else True
+        token_data["is_active"] = is_active is not False
+        # Un esito non confermato dal servizio di autenticazione non va in cache
+        if is_active is not None:
+            token_cache.put(token, token_data)
+    
+    if not token_data["is_active"]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Utente disattivato",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return token_data
 
 def get_current_user(
     request: Request,
@@ -114,6 +138,16 @@ def get_current_user(
             "exp": 0  # I servizi non hanno scadenza
         }
     
+    # Identità già verificata dall'API Gateway, che rifiuta anche i token
+    # revocati e gli utenti disattivati: nessuna chiamata all'auth service
+    identity = get_gateway_identity(request.headers)
+    if identity:
+        return TokenData(
+            user_id=identity["user_id"],
+            role=identity["role"],
+            exp=identity["exp"]
+        ).model_dump()
+    
     # Se non è una richiesta da un servizio, verifica il token JWT
     if not credentials:
         raise HTTPException(
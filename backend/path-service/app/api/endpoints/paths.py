@@ -20,6 +20,7 @@ from app.db.repositories.path_template_repository import PathTemplateRepository
 from app.db.models.path import PathNodeType, CompletionStatus
 from app.api.dependencies.auth import get_current_user, get_admin_user, get_parent_user, get_student_user, get_admin_or_parent_user
 from app.core.config import settings
+from app.core.user_directory import UserDirectory, get_user_directory
 
 router = APIRouter()
 
@@ -174,7 +175,8 @@ async def get_paths(
 async def create_path(
     path: PathCreate,
     db: Session = Depends(get_db),
-    current_user: Dict = Depends(get_admin_or_parent_user)
+    current_user: Dict = Depends(get_admin_or_parent_user),
+    users: UserDirectory = Depends(get_user_directory)
 ):
     """Crea un nuovo percorso per uno studente (admin o genitori)."""
     # Verifica che il template esista
@@ -185,55 +187,38 @@ async def create_path(
             detail=f"Template di percorso con ID {path.template_id} non trovato"
         )
     
-    # Verifica che lo studente esista (chiama il servizio di autenticazione)
+    user_role = current_user.get("role")
+    user_id = current_user.get("user_id")
+    
+    # Verifica che lo studente esista e, se l'utente è un genitore, che sia
+    # suo figlio: una sola chiamata al servizio di autenticazione. Se la
+    # verifica non è possibile il percorso non viene creato
     try:
-        auth_service_url = f"{settings.AUTH_SERVICE_URL}/api/users/{path.student_id}"
-        response = requests.get(auth_service_url)
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Studente con ID {path.student_id} non trovato"
-            )
-        
-        # Verifica che l'utente sia effettivamente uno studente
-        user_data = response.json()
-        if user_data.get("role") != "student":
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"L'utente con ID {path.student_id} non è uno studente"
-            )
+        student = users.get(path.student_id)
     except requests.RequestException:
-        # In caso di errore di comunicazione, assumiamo che lo studente esista
-        # Questo è un approccio semplificato; in produzione sarebbe meglio gestire l'errore in modo diverso
-        pass
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Impossibile verificare lo studente con il servizio di autenticazione"
+        )
     
-    # Se l'utente è un genitore, verifica che lo studente sia suo figlio
-    user_role = current_user.get("role")
-    user_id = current_user.get("user_id")
+    if student is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Studente con ID {path.student_id} non trovato"
+        )
     
-    if user_role == "parent":
-        try:
-            # Verifica che lo studente sia figlio del genitore
-            auth_service_url = f"{settings.AUTH_SERVICE_URL}/api/users/{user_id}/children"
-            response = requests.get(auth_service_url)
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Errore durante la verifica della relazione genitore-figlio"
-                )
-            
-            children = response.json()
-            if path.student_id not in [child.get("id") for child in children]:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Lo studente con ID {path.student_id} non è un figlio dell'utente corrente"
-                )
-        except requests.RequestException:
-            # In caso di errore di comunicazione, assumiamo che la relazione sia valida
-            # Questo è un approccio semplificato; in produzione sarebbe meglio gestire l'errore in modo diverso
-            pass
+    # Verifica che l'utente sia effettivamente uno studente
+    if "student" not in student.get("roles", []):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"L'utente con ID {path.student_id} non è uno studente"
+        )
+    
+    if user_role == "parent" and student.get("parent_id") != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Lo studente con ID {path.student_id} non è un figlio dell'utente corrente"
+        )
     
     # Imposta l'utente corrente come assegnatore
     if path.assigned_by is None:
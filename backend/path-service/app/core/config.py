@@ -17,6 +17,7 @@ class Settings(BaseSettings):
     # JWT settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "questa_chiave_deve_essere_cambiata_in_produzione")
     ALGORITHM: str = "HS256"
+    JWT_LEEWAY_SECONDS: int = int(os.getenv("JWT_LEEWAY_SECONDS", "10"))
     
     # Database settings
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
@@ -49,6 +50,8 @@ class Settings(BaseSettings):
     
     # Service URLs
     AUTH_SERVICE_URL: str = os.getenv("AUTH_SERVICE_URL", "http://localhost:8001")
+    # Timeout delle letture di utenti con /api/users/batch dell'auth-service
+    USER_BATCH_TIMEOUT: float = float(os.getenv("USER_BATCH_TIMEOUT", "5"))
     QUIZ_SERVICE_URL: str = os.getenv("QUIZ_SERVICE_URL", "http://localhost:8002")
     REWARD_SERVICE_URL: str = os.getenv("REWARD_SERVICE_URL", "http://localhost:8004")
     
@@ -62,6 +65,43 @@ class Settings(BaseSettings):
     # Service authentication
     SERVICE_TOKEN: str = os.getenv("SERVICE_TOKEN", "shared_service_token_for_microservices")
     
+    # Identity headers signed by the API Gateway (X-User-*)
+    IDENTITY_HEADER_SECRET: str = os.getenv("IDENTITY_HEADER_SECRET", "shared_identity_secret_for_microservices")
+    IDENTITY_HEADER_MAX_AGE: int = int(os.getenv("IDENTITY_HEADER_MAX_AGE", "60"))
+    
+    # Verifica locale dei token di accesso firmati dall'auth-service (RS256):
+    # le chiavi pubbliche (JWKS, di default AUTH_SERVICE_URL/api/auth/jwks)
+    # vengono aggiornate in background ogni JWKS_REFRESH_INTERVAL secondi e
+    # un kid sconosciuto forza un aggiornamento, al più uno ogni
+    # JWKS_MIN_REFRESH_INTERVAL secondi. JWT_ACCEPT_HS256 accetta anche i
+    # token firmati con SECRET_KEY: è disattivato di default e va attivato
+    # esplicitamente solo durante la migrazione, per il tempo di vita dei
+    # token HS256 già emessi (ACCESS_TOKEN_EXPIRE_MINUTES)
+    JWKS_URL: str = os.getenv("JWKS_URL", "")
+    JWKS_REFRESH_INTERVAL: float = float(os.getenv("JWKS_REFRESH_INTERVAL", "300"))
+    JWKS_MIN_REFRESH_INTERVAL: float = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+    JWKS_FETCH_TIMEOUT: float = float(os.getenv("JWKS_FETCH_TIMEOUT", "2"))
+    JWT_ACCEPT_HS256: bool = os.getenv("JWT_ACCEPT_HS256", "False").lower() == "true"
+    # Controllo online leggero (solo utente disattivato) dopo la verifica locale
+    JWT_STATUS_CHECK: bool = os.getenv("JWT_STATUS_CHECK", "True").lower() == "true"
+    
+    # Cache dei token verificati: al più TOKEN_CACHE_SIZE voci, ciascuna per
+    # TOKEN_CACHE_TTL secondi e mai oltre la scadenza del token. L'auth-service
+    # la invalida con gli eventi inviati a /api/internal/auth-events; un token
+    # revocato di cui non si conosce la scadenza resta rifiutato per
+    # TOKEN_CACHE_REVOKED_TTL secondi (durata di un token di accesso)
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_TTL: float = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+    TOKEN_CACHE_REVOKED_TTL: float = float(os.getenv("TOKEN_CACHE_REVOKED_TTL", "1800"))
+    
+    # Tracing distribuito: il contesto W3C traceparent viene sempre propagato;
+    # gli span sono esportati in formato OTLP/JSON su file ("file") o verso un
+    # collector OTLP/HTTP ("otlp"), oppure non esportati ("none")
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+    
     model_config = {
         "case_sensitive": True,
         "env_file": ".env",
@@ -0,0 +1,35 @@
+import time
+
+import requests
+
+from app.core.metrics import observe_upstream
+from app.core.tracing import SPAN_KIND_CLIENT, inject, start_span
+
+
+def request(service: str, method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Chiamata HTTP verso un altro servizio con `requests`, registrando la
+    latenza nella metrica upstream_request_duration_seconds e uno span
+    client il cui `traceparent` viene inoltrato al servizio chiamato.
+    Le eccezioni di `requests` vengono propagate al chiamante.
+    """
+    start_time = time.perf_counter()
+    status = "error"
+    attributes = {"http.method": method, "http.url": url, "peer.service": service}
+    with start_span(f"{method} {service}", SPAN_KIND_CLIENT, attributes) as span:
+        kwargs["headers"] = inject(kwargs.get("headers"))
+        try:
+            response = requests.request(method, url, **kwargs)
+            status = str(response.status_code)
+            span.set_attribute("http.status_code", response.status_code)
+            return response
+        finally:
+            observe_upstream(service, method, status, time.perf_counter() - start_time)
+
+
+def get(service: str, url: str, **kwargs) -> requests.Response:
+    return request(service, "GET", url, **kwargs)
+
+
+def post(service: str, url: str, **kwargs) -> requests.Response:
+    return request(service, "POST", url, **kwargs)
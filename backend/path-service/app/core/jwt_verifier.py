@@ -0,0 +1,181 @@
+import json
+import logging
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI
+from jose import jwt
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Algoritmi asimmetrici verificabili con le chiavi pubbliche del JWKS
+ASYMMETRIC_ALGORITHMS = frozenset({"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"})
+
+
+class TokenVerificationError(Exception):
+    """Token malformato, scaduto o firmato con una chiave sconosciuta."""
+
+
+class JWKSVerifier:
+    """
+    Verifica locale dei token di accesso emessi dall'auth-service.
+
+    Le chiavi pubbliche (JWKS) vengono scaricate da /api/auth/jwks all'avvio
+    e aggiornate da un thread in background ogni `refresh_interval` secondi;
+    un token con un kid sconosciuto (chiave appena ruotata) avvia un
+    aggiornamento in un altro thread, al più uno ogni `min_refresh_interval`
+    secondi, e viene rifiutato senza attenderlo: la verifica gira sull'event
+    loop e non fa mai chiamate di rete. Se l'auth-service non risponde si
+    continuano a usare le ultime chiavi note.
+    """
+
+    def __init__(self, jwks_url: str, refresh_interval: float, min_refresh_interval: float, timeout: float) -> None:
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._last_attempt = float("-inf")
+        self._stop = threading.Event()
+        self._first_attempt = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Aggiornamento avviato da un kid sconosciuto
+        self._pending: Optional[threading.Thread] = None
+        self._pending_lock = threading.Lock()
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def refresh(self) -> bool:
+        """Scarica il JWKS; in caso di errore mantiene le chiavi precedenti."""
+        with self._lock:
+            self._last_attempt = time.monotonic()
+            try:
+                with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as response:
+                    document = json.load(response)
+                keys = {key["kid"]: key for key in document["keys"] if key.get("kid")}
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                self.refresh_failures += 1
+                logger.warning("Aggiornamento del JWKS da %s non riuscito: %s", self.jwks_url, exc)
+                return False
+            # Le chiavi ritirate dall'auth-service smettono di essere accettate
+            self._keys = keys
+            self.refreshes += 1
+            return True
+
+    def _request_refresh(self) -> None:
+        """Avvia un aggiornamento in un thread separato, se non ce n'è già uno."""
+        with self._pending_lock:
+            if self._pending is not None and self._pending.is_alive():
+                return
+            if time.monotonic() - self._last_attempt < self.min_refresh_interval:
+                return
+            # Riserva l'intervallo subito, prima che il thread lo aggiorni
+            self._last_attempt = time.monotonic()
+            self._pending = threading.Thread(target=self.refresh, name="jwks-refresh-kid", daemon=True)
+            self._pending.start()
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> None:
+        """Attende l'aggiornamento avviato da un kid sconosciuto (usato nei test)."""
+        pending = self._pending
+        if pending is not None:
+            pending.join(timeout)
+
+    def _key_for(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        key = self._keys.get(kid) if kid else None
+        if key is None and kid:
+            # Il token viene rifiutato ora; se la chiave è nuova sarà
+            # accettato appena l'aggiornamento è concluso
+            self._request_refresh()
+        return key
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verifica firma e scadenza del token di accesso e restituisce
+        l'identità nello stesso formato di get_gateway_identity.
+        Solleva TokenVerificationError se il token non è valido.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.JWTError as exc:
+            raise TokenVerificationError("Token malformato") from exc
+
+        algorithm = header.get("alg")
+        if algorithm == settings.ALGORITHM and settings.JWT_ACCEPT_HS256:
+            # Token firmati con SECRET_KEY prima della migrazione alle chiavi asimmetriche
+            key: Any = settings.SECRET_KEY
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = self._key_for(header.get("kid"))
+            if key is None or key.get("alg", algorithm) != algorithm:
+                raise TokenVerificationError("Chiave di firma sconosciuta")
+        else:
+            raise TokenVerificationError("Algoritmo di firma non ammesso")
+
+        try:
+            claims = jwt.decode(token, key, algorithms=[algorithm], options={"leeway": settings.JWT_LEEWAY_SECONDS})
+        except jwt.JWTError as exc:
+            raise TokenVerificationError("Token non valido o scaduto") from exc
+
+        if not claims.get("sub") or "exp" not in claims or claims.get("type") == "refresh":
+            raise TokenVerificationError("Token non valido")
+
+        roles = [str(role) for role in claims.get("roles") or []]
+        return {
+            "user_id": str(claims["sub"]),
+            # Stesso criterio di /api/debug/verify-token dell'auth-service
+            "role": roles[0] if roles else "student",
+            "roles": roles,
+            "exp": int(claims["exp"]),
+            # Assente nei token emessi prima dell'introduzione del claim
+            "iat": int(claims["iat"]) if isinstance(claims.get("iat"), (int, float)) else None,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            interval = self.refresh_interval if self.refresh() else self.min_refresh_interval
+            self._first_attempt.set()
+            self._stop.wait(interval)
+
+    def start(self) -> None:
+        """
+        Avvia l'aggiornamento periodico del JWKS in background e attende il
+        primo download (al più `timeout` secondi), così le prime richieste
+        trovano già le chiavi.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._first_attempt.clear()
+        self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+        self._thread.start()
+        self._first_attempt.wait(self.timeout)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jwks_url": self.jwks_url,
+            "kids": sorted(self._keys),
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+jwt_verifier = JWKSVerifier(
+    settings.JWKS_URL or f"{settings.AUTH_SERVICE_URL}/api/auth/jwks",
+    refresh_interval=settings.JWKS_REFRESH_INTERVAL,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL,
+    timeout=settings.JWKS_FETCH_TIMEOUT,
+)
+
+
+def setup_jwt_verifier(app: FastAPI) -> None:
+    """Aggiorna il JWKS in background per tutta la vita dell'applicazione."""
+    app.add_event_handler("startup", jwt_verifier.start)
+    app.add_event_handler("shutdown", jwt_verifier.stop)
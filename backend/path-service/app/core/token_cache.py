@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+TOKEN_CACHE_REQUESTS = registry.counter(
+    "token_cache_requests_total",
+    "Consultazioni della cache dei token verificati per esito (hit, miss, revoked)",
+    ("result",),
+)
+TOKEN_CACHE_INVALIDATIONS = registry.counter(
+    "token_cache_invalidations_total",
+    "Voci rimosse dalla cache dei token per evento dell'auth-service",
+    ("event",),
+)
+TOKEN_CACHE_ENTRIES = registry.gauge(
+    "token_cache_entries",
+    "Token verificati presenti in cache",
+)
+
+
+def token_hash(token: str) -> str:
+    """Chiave della cache: il token in chiaro non viene conservato."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """
+    Cache LRU limitata dell'esito della verifica dei token (identità e
+    controllo online dello stato dell'utente), indicizzata con l'hash del
+    token. Ogni voce vive al più `ttl` secondi e mai oltre la scadenza del
+    token, così le richieste di uno stesso utente in sequenza (es. le
+    risposte di un quiz) fanno un solo giro verso l'auth-service.
+
+    L'auth-service invalida le voci con gli eventi "user_deactivated" e
+    "token_revoked"; i token revocati restano rifiutati fino alla scadenza.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remove(self, key: str) -> None:
+        identity, _ = self._entries.pop(key)
+        keys = self._by_user.get(identity["user_id"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[identity["user_id"]]
+
+    def is_revoked(self, token: str) -> bool:
+        key = token_hash(token)
+        with self._lock:
+            expires_at = self._revoked.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.time():
+                del self._revoked[key]
+                return False
+        TOKEN_CACHE_REQUESTS.inc("revoked")
+        return True
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Identità già verificata per il token, oppure None."""
+        key = token_hash(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] >= time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                TOKEN_CACHE_REQUESTS.inc("hit")
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+        TOKEN_CACHE_REQUESTS.inc("miss")
+        return None
+
+    def put(self, token: str, identity: Dict[str, Any]) -> None:
+        expires_at = min(time.time() + self.ttl, identity["exp"])
+        if self.max_entries <= 0 or expires_at <= time.time():
+            return
+        key = token_hash(token)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (identity, expires_at)
+            self._by_user.setdefault(identity["user_id"], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            TOKEN_CACHE_ENTRIES.set(len(self._entries))
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Rimuove tutte le voci dell'utente (es. appena disattivato)."""
+        with self._lock:
+            keys = list(self._by_user.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            TOKEN_CACHE_ENTRIES.set(len(self._entries))
+        TOKEN_CACHE_INVALIDATIONS.inc("user_deactivated", amount=len(keys))
+        return len(keys)
+
+    def revoke(self, key: str, exp: Optional[int] = None) -> None:
+        """
+        Rifiuta il token con hash `key` fino alla sua scadenza (se non nota,
+        fino alla durata massima di un token di accesso).
+        """
+        expires_at = exp or time.time() + settings.TOKEN_CACHE_REVOKED_TTL
+        with self._lock:
+            removed = key in self._entries
+            if removed:
+                self._remove(key)
+            self._revoked[key] = expires_at
+            # Le revoche scadute vengono eliminate qui, senza un thread dedicato
+            now = time.time()
+            for revoked_key in [name for name, until in self._revoked.items() if until < now]:
+                del self._revoked[revoked_key]
+            TOKEN_CACHE_ENTRIES.set(len(self._entries))
+        TOKEN_CACHE_INVALIDATIONS.inc("token_revoked", amount=int(removed))
+
+    def clear(self) -> None:
+        """Svuota la cache e azzera i contatori."""
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._revoked.clear()
+            self.hits = 0
+            self.misses = 0
+            TOKEN_CACHE_ENTRIES.set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "revoked": len(self._revoked),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+token_cache = TokenCache(max_entries=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
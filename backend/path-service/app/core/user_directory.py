@@ -0,0 +1,74 @@
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core import http_client
+from app.core.config import settings
+from app.core.metrics import registry
+
+USER_LOOKUPS = registry.counter(
+    "user_directory_lookups_total",
+    "Utenti richiesti all'auth-service per esito (cached, fetched, missing)",
+    ("result",),
+)
+USER_BATCH_REQUESTS = registry.counter(
+    "user_directory_batch_requests_total",
+    "Chiamate a /api/users/batch dell'auth-service",
+)
+
+
+class UserDirectory:
+    """
+    Dati essenziali degli utenti (ruoli, genitore collegato) letti
+    dall'auth-service con /api/users/batch, validi per una sola richiesta.
+
+    Gli UUID registrati con `prefetch` vengono risolti insieme alla prima
+    lettura, con un'unica chiamata; gli utenti già letti (anche quelli
+    inesistenti) non vengono più richiesti. Gli errori di comunicazione
+    (`requests.RequestException`) vengono propagati al chiamante.
+    """
+
+    def __init__(self) -> None:
+        self._cards: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pending: Set[str] = set()
+
+    def prefetch(self, uuids: Iterable[str]) -> None:
+        """Registra gli UUID da leggere alla prossima chiamata, senza chiamare subito."""
+        self._pending.update(uuid for uuid in uuids if uuid not in self._cards)
+
+    def get_many(self, uuids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Utenti per UUID; None per quelli che non esistono."""
+        uuids = list(uuids)
+        cached = sum(1 for uuid in uuids if uuid in self._cards)
+        self.prefetch(uuids)
+        if self._pending:
+            self._fetch(sorted(self._pending))
+        USER_LOOKUPS.inc("cached", amount=cached)
+        return {uuid: self._cards.get(uuid) for uuid in uuids}
+
+    def get(self, uuid: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([uuid])[uuid]
+
+    def _fetch(self, uuids: List[str]) -> None:
+        response = http_client.post(
+            "auth-service",
+            f"{settings.AUTH_SERVICE_URL}/api/users/batch",
+            json={"uuids": uuids},
+            headers={"X-Service-Token": settings.SERVICE_TOKEN},
+            timeout=settings.USER_BATCH_TIMEOUT,
+        )
+        USER_BATCH_REQUESTS.inc()
+        response.raise_for_status()
+
+        cards = {card["uuid"]: card for card in response.json().get("users", [])}
+        for uuid in uuids:
+            self._cards[uuid] = cards.get(uuid)
+        self._pending.difference_update(uuids)
+        USER_LOOKUPS.inc("fetched", amount=len(cards))
+        USER_LOOKUPS.inc("missing", amount=len(uuids) - len(cards))
+
+
+def get_user_directory() -> UserDirectory:
+    """
+    Dipendenza FastAPI: una UserDirectory per richiesta, condivisa da tutte
+    le dipendenze e dall'endpoint che la richiedono.
+    """
+    return UserDirectory()
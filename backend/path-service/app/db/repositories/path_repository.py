@@ -2,7 +2,6 @@ from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime
-import requests
 import os
 
 from app.db.models.path import (
@@ -14,6 +13,7 @@ from app.schemas.path import (
     PathNodeCreate, PathNodeUpdate, UpdateNodeStatus
 )
 from app.core.config import settings
+from app.core import http_client
 
 class PathRepository:
     """Repository per la gestione dei percorsi educativi."""
@@ -23,6 +23,17 @@ class PathRepository:
         """Ottiene un percorso dal database per ID."""
         return db.query(Path).filter(Path.id == path_id).first()
     
+    @staticmethod
+    def get_statistics(db: Session) -> Dict[str, Any]:
+        """Conteggio dei percorsi per stato, con un'unica query GROUP BY."""
+        rows = db.query(Path.status, func.count(Path.id)).group_by(Path.status).all()
+        by_status = {getattr(path_status, "value", path_status): count for path_status, count in rows}
+        return {
+            "total_paths": sum(by_status.values()),
+            "completed_paths": by_status.get(CompletionStatus.COMPLETED.value, 0),
+            "by_status": by_status,
+        }
+    
     @staticmethod
     def get_by_uuid(db: Session, uuid: str) -> Optional[Path]:
         """Ottiene un percorso dal database per UUID."""
@@ -463,7 +474,7 @@ class PathRepository:
                 logger.info(f"Invio notifica al reward service: URL={url}, payload={payload}")
                 
                 # Invia la richiesta al reward service
-                response = requests.post(url, json=payload, headers=headers, timeout=5)
+                response = http_client.post("reward-service", url, json=payload, headers=headers, timeout=5)
                 
                 # Log della risposta
                 if response.status_code == 200:
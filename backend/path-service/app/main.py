@@ -3,8 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from typing import List
 import uvicorn
 
+from app.core.jwt_verifier import setup_jwt_verifier
+from app.core.metrics import setup_metrics
+from app.core.tracing import setup_tracing
+
 # Import API routers
-from app.api.endpoints import path_templates, paths
+from app.api.endpoints import path_templates, paths, internal
 
 # Create FastAPI app
 app = FastAPI(
@@ -30,6 +34,18 @@ app.add_middleware(
 # Include API routers
 app.include_router(path_templates.router, prefix="/api/path-templates", tags=["Path Templates"])
 app.include_router(paths.router, prefix="/api/paths", tags=["Paths"])
+# Endpoint tra servizi: eventi dell'auth-service che invalidano la cache dei
+# token e statistiche aggregate per la dashboard
+app.include_router(internal.router, prefix="/api/internal", tags=["Internal"])
+
+# Metriche Prometheus (/metrics): latenza per rotta e status, richieste in corso
+setup_metrics(app)
+
+# Tracing distribuito: span per richiesta e propagazione di traceparent
+setup_tracing(app, "path-service")
+
+# Verifica locale dei token: chiavi pubbliche dell'auth-service aggiornate in background
+setup_jwt_verifier(app)
 
 @app.get("/")
 async def health_check():
@@ -0,0 +1,12 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class AuthEvent(BaseModel):
+    """Evento inviato dall'auth-service per invalidare la cache dei token."""
+
+    event: Literal["user_deactivated", "token_revoked"]
+    user_id: Optional[str] = None
+    token_hash: Optional[str] = None
+    exp: Optional[int] = None
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from app.core.config import settings
+from app.core.user_directory import UserDirectory
+
+
+def batch_response(*uuids, status_code=200):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = {
+        "users": [{"uuid": uuid, "roles": ["student"], "parent_id": "parent-uuid"} for uuid in uuids],
+        "missing": [],
+    }
+    if status_code != 200:
+        response.raise_for_status.side_effect = requests.HTTPError()
+    return response
+
+
+def test_prefetched_users_are_resolved_in_one_call():
+    directory = UserDirectory()
+    directory.prefetch(["s-1", "s-2", "s-3"])
+
+    with patch("app.core.http_client.post", return_value=batch_response("s-1", "s-2")) as post:
+        assert directory.get("s-1")["parent_id"] == "parent-uuid"
+        # Già letti nella stessa richiesta, anche l'utente inesistente
+        assert directory.get_many(["s-2", "s-3"]) == {"s-2": directory.get("s-2"), "s-3": None}
+
+    post.assert_called_once()
+    assert post.call_args.args[1] == f"{settings.AUTH_SERVICE_URL}/api/users/batch"
+    assert post.call_args.kwargs["json"] == {"uuids": ["s-1", "s-2", "s-3"]}
+    assert post.call_args.kwargs["headers"] == {"X-Service-Token": settings.SERVICE_TOKEN}
+
+
+def test_new_users_trigger_a_new_call():
+    directory = UserDirectory()
+
+    with patch("app.core.http_client.post", side_effect=[batch_response("s-1"), batch_response("s-2")]) as post:
+        directory.get("s-1")
+        directory.get_many(["s-1", "s-2"])
+
+    assert post.call_count == 2
+    assert post.call_args.kwargs["json"] == {"uuids": ["s-2"]}
+
+
+def test_auth_service_errors_are_propagated():
+    directory = UserDirectory()
+
+    with patch("app.core.http_client.post", return_value=batch_response(status_code=500)):
+        with pytest.raises(requests.RequestException):
+            directory.get("s-1")
+
+    # Nessun esito in cache: la lettura successiva riprova
+    with patch("app.core.http_client.post", return_value=batch_response("s-1")) as post:
+        assert directory.get("s-1") is not None
+    post.assert_called_once()
+
+
+def create_path(client, template):
+    return client.post("/api/paths", json={
+        "template_id": template.id,
+        "student_id": "s-1",
+        "assigned_by": "test-user-123",
+        "status": "not_started",
+    })
+
+
+def test_create_path_fails_closed_when_auth_service_errors(client, db, test_path_templates):
+    """An auth-service error must not skip the student checks."""
+    from app.db.models.path import Path
+
+    with patch("app.core.http_client.post", return_value=batch_response(status_code=500)):
+        response = create_path(client, test_path_templates["math"])
+
+    assert response.status_code == 503
+    assert db.query(Path).filter(Path.student_id == "s-1").count() == 0
+
+
+def test_create_path_checks_the_student(client, db, test_path_templates):
+    with patch("app.core.http_client.post", return_value=batch_response()):
+        assert create_path(client, test_path_templates["math"]).status_code == 404
+
+    with patch("app.core.http_client.post", return_value=batch_response("s-1")):
+        assert create_path(client, test_path_templates["math"]).status_code == 201
@@ -1,11 +1,15 @@
 from typing import Optional, List
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, status, Header, Request
 from fastapi.security import OAuth2PasswordBearer
 import requests
 import json
 from pydantic import BaseModel
 
 from app.core.config import settings
+from app.core import http_client
+from app.core.identity import get_gateway_identity
+from app.core.jwt_verifier import TokenVerificationError, jwt_verifier
+from app.core.token_cache import token_cache
 
 # Modello per le risposte dell'auth service
 class TokenData(BaseModel):
@@ -17,12 +21,48 @@ class TokenData(BaseModel):
 # Definizione del sistema di autenticazione OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.AUTH_SERVICE_URL}/api/auth/login")
 
-# Funzione per verificare il token JWT tramite l'auth service
-async def get_current_user(authorization: str = Header(None)) -> TokenData:
+def check_user_status(user_id: str) -> bool:
     """
-    Verifica il token JWT con l'auth service e restituisce i dati dell'utente.
+    Controllo online leggero dopo la verifica locale del token: chiede
+    all'auth service solo se l'utente esiste ed è ancora attivo.
+    """
+    try:
+        response = http_client.get(
+            "auth-service",
+            f"{settings.AUTH_SERVICE_URL}/api/auth/status/{user_id}",
+            headers={"X-Service-Token": settings.SERVICE_TOKEN},
+            timeout=settings.JWKS_FETCH_TIMEOUT,
+        )
+    except requests.RequestException:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Impossibile connettersi al servizio di autenticazione",
+        )
+    if response.status_code == status.HTTP_404_NOT_FOUND:
+        return False
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Impossibile connettersi al servizio di autenticazione",
+        )
+    return bool(response.json().get("is_active"))
+
+# Funzione per verificare il token JWT
+async def get_current_user(request: Request, authorization: str = Header(None)) -> TokenData:
+    """
+    Verifica il token JWT e restituisce i dati dell'utente.
+    Se la richiesta arriva dall'API Gateway con l'identità già verificata
+    (header X-User-* firmati) la verifica viene evitata; altrimenti il token
+    è verificato localmente con le chiavi pubbliche dell'auth service e resta
+    solo il controllo online dell'utente disattivato (JWT_STATUS_CHECK).
+    L'esito viene conservato in cache fino alla scadenza del token.
     Solleva un'eccezione se il token non è valido.
     """
+    # Il gateway rifiuta già i token revocati e quelli degli utenti disattivati
+    identity = get_gateway_identity(request.headers)
+    if identity:
+        return TokenData(user_id=identity["user_id"], role=identity["role"], is_active=True)
+    
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -33,29 +73,28 @@ async def get_current_user(authorization: str = Header(None)) -> TokenData:
     # Ottieni il token dal header Authorization
     token = authorization.replace("Bearer ", "") if authorization.startswith("Bearer ") else authorization
     
-    try:
-        # Verifica il token con l'auth service utilizzando il nuovo endpoint di debug
-        response = requests.post(
-            f"{settings.AUTH_SERVICE_URL}/api/debug/verify-token",
-            json={"token": token}
+    if token_cache.is_revoked(token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revocato",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-        
-        if response.status_code != 200:
+    
+    # Esito già in cache: nessuna verifica e nessuna chiamata all'auth service
+    identity = token_cache.get(token)
+    if identity is None:
+        try:
+            identity = jwt_verifier.verify(token)
+        except TokenVerificationError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token non valido o scaduto",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        
-        # Estrai i dati dell'utente dalla risposta
-        user_data = response.json()
-        return TokenData(**user_data)
+        identity["is_active"] = check_user_status(identity["user_id"]) if settings.JWT_STATUS_CHECK else True
+        token_cache.put(token, identity)
     
-    except requests.RequestException:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Impossibile connettersi al servizio di autenticazione",
-        )
+    return TokenData(user_id=identity["user_id"], role=identity["role"], is_active=identity["is_active"])
 
 # Funzione per verificare che l'utente sia attivo
 async def get_current_active_user(
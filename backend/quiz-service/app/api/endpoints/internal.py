@@ -0,0 +1,63 @@
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import get_db
+from app.db.repositories.quiz_repository import QuizRepository
+from app.core.token_cache import token_cache
+from app.schemas.auth_event import AuthEvent
+
+router = APIRouter()
+
+
+def _require_service_token(x_service_token: Optional[str]) -> None:
+    if x_service_token != settings.SERVICE_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token del servizio non valido",
+        )
+
+
+@router.post("/auth-events")
+async def receive_auth_event(
+    event: AuthEvent,
+    x_service_token: Optional[str] = Header(None),
+) -> Dict[str, Any]:
+    """
+    Riceve dall'auth-service gli eventi che invalidano la cache dei token:
+    utente disattivato (tutte le sue voci) o token revocato (rifiutato fino
+    alla scadenza). Accessibile solo con il token di servizio.
+    """
+    _require_service_token(x_service_token)
+
+    if event.event == "user_deactivated":
+        if not event.user_id:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="user_id mancante",
+            )
+        return {"event": event.event, "invalidated": token_cache.invalidate_user(event.user_id)}
+
+    if not event.token_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="token_hash mancante",
+        )
+    token_cache.revoke(event.token_hash, event.exp)
+    return {"event": event.event, "invalidated": 1}
+
+
+@router.get("/stats")
+async def get_stats(
+    x_service_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    Quiz totali, quiz completati e punteggio medio dei tentativi, con
+    un'unica query GROUP BY. Riservato agli altri servizi: l'auth-service li
+    combina nelle statistiche della dashboard dell'admin.
+    """
+    _require_service_token(x_service_token)
+    return QuizRepository.get_statistics(db)
@@ -3,7 +3,6 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 import logging
 import sqlalchemy.exc
-import requests
 import os
 
 from app.db.base import get_db
@@ -18,6 +17,7 @@ from app.schemas.quiz import (
 from app.db.repositories.quiz_repository import QuizRepository, QuizAttemptRepository
 from app.api.dependencies.auth import get_current_admin, get_current_active_user, get_current_parent, get_current_student, TokenData
 from app.core.config import settings
+from app.core import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -212,7 +212,7 @@ async def submit_quiz_answers(
             }
             
             logger.info(f"Invio notifica al path-service: URL={url}, payload={payload}")
-            response = requests.post(url, json=payload, headers=headers, timeout=5)
+            response = http_client.post("path-service", url, json=payload, headers=headers, timeout=5)
             
             if response.status_code == 200:
                 path_response = response.json()
@@ -224,7 +224,7 @@ async def submit_quiz_answers(
                 
                 # Log della percentuale di completamento
                 path_url = f"{path_service_url}/api/paths/{db_quiz.path_id}"
-                path_response = requests.get(path_url, headers=headers)
+                path_response = http_client.get("path-service", path_url, headers=headers)
                 
                 if path_response.status_code == 200:
                     path_data = path_response.json()
@@ -505,7 +505,7 @@ async def submit_quiz_answers_by_uuid(
                     }
                     
                     logger.info(f"Invio notifica al path-service: URL={url}, payload={payload}")
-                    response = requests.post(url, json=payload, headers=headers, timeout=5)
+                    response = http_client.post("path-service", url, json=payload, headers=headers, timeout=5)
                     
                     if response.status_code == 200:
                         path_response = response.json()
@@ -517,7 +517,7 @@ async def submit_quiz_answers_by_uuid(
                         
                         # Log della percentuale di completamento
                         path_url = f"{path_service_url}/api/paths/{db_quiz.path_id}"
-                        path_response = requests.get(path_url, headers=headers)
+                        path_response = http_client.get("path-service", path_url, headers=headers)
                         
                         if path_response.status_code == 200:
                             path_data = path_response.json()
@@ -0,0 +1,49 @@
+import hashlib
+import hmac
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from app.core.config import settings
+
+
+def _sign(user_id: str, role: str, roles: str, exp: str, issued_at: str) -> str:
+    message = "\n".join([user_id, role, roles, exp, issued_at]).encode("utf-8")
+    return hmac.new(settings.IDENTITY_HEADER_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def get_gateway_identity(headers: Mapping[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    Restituisce l'identità verificata dall'API Gateway (header X-User-*),
+    oppure None se gli header mancano, la firma non è valida o sono scaduti.
+    In quel caso il chiamante deve verificare il token in modo tradizionale.
+    """
+    user_id = headers.get("x-user-id")
+    signature = headers.get("x-identity-signature")
+    if not user_id or not signature:
+        return None
+
+    role = headers.get("x-user-role", "")
+    roles = headers.get("x-user-roles", "")
+    exp = headers.get("x-user-exp", "")
+    issued_at = headers.get("x-identity-issued-at", "")
+
+    expected = _sign(user_id, role, roles, exp, issued_at)
+    if not hmac.compare_digest(expected, signature):
+        return None
+
+    try:
+        exp_value = int(exp)
+        issued_at_value = int(issued_at)
+    except ValueError:
+        return None
+
+    now = time.time()
+    if now - issued_at_value > settings.IDENTITY_HEADER_MAX_AGE or exp_value < now:
+        return None
+
+    return {
+        "user_id": user_id,
+        "role": role,
+        "roles": [name for name in roles.split(",") if name],
+        "exp": exp_value,
+    }
@@ -1,6 +1,6 @@
 from typing import List, Optional, Dict, Any, Tuple, Union
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy import case, func
 from datetime import datetime
 
 from app.db.models.quiz import (
@@ -44,6 +44,33 @@ class QuizRepository:
             
         return None
     
+    @staticmethod
+    def get_statistics(db: Session) -> Dict[str, Any]:
+        """
+        Quiz totali, completati e punteggio medio (in percentuale) dei
+        tentativi completati, con un'unica query GROUP BY sui quiz.
+        """
+        percentage = case(
+            (QuizAttempt.max_score > 0, QuizAttempt.score * 100.0 / QuizAttempt.max_score),
+        )
+        rows = (
+            db.query(Quiz.is_completed, func.count(func.distinct(Quiz.id)), func.avg(percentage))
+            .outerjoin(QuizAttempt, QuizAttempt.quiz_id == Quiz.id)
+            .group_by(Quiz.is_completed)
+            .all()
+        )
+        total_quizzes, completed_quizzes, average_score = 0, 0, 0.0
+        for is_completed, count, average in rows:
+            total_quizzes += count
+            if is_completed:
+                completed_quizzes += count
+                average_score = round(float(average or 0.0), 2)
+        return {
+            "total_quizzes": total_quizzes,
+            "completed_quizzes": completed_quizzes,
+            "average_score": average_score,
+        }
+    
     @staticmethod
     def get_by_id_or_uuid(db: Session, identifier: Union[int, str]) -> Optional[Quiz]:
         """
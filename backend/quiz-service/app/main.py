@@ -3,8 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from typing import List
 import uvicorn
 
+from app.core.jwt_verifier import setup_jwt_verifier
+from app.core.metrics import setup_metrics
+from app.core.tracing import setup_tracing
+
 # Import API routers
-from app.api.endpoints import quiz_templates, quizzes, question_templates, quiz_attempts
+from app.api.endpoints import quiz_templates, quizzes, question_templates, quiz_attempts, internal
 
 # Create FastAPI app
 app = FastAPI(
@@ -33,6 +37,9 @@ app.include_router(quiz_templates.router, prefix="/api/quiz-templates", tags=["Q
 app.include_router(quizzes.router, prefix="/api/quizzes", tags=["Quizzes"])
 app.include_router(question_templates.router, prefix="/api/question-templates", tags=["Question Templates"])
 app.include_router(quiz_attempts.router, prefix="/api/quiz-attempts", tags=["Quiz Attempts"])
+# Endpoint tra servizi: eventi dell'auth-service che invalidano la cache dei
+# token e statistiche aggregate per la dashboard
+app.include_router(internal.router, prefix="/api/internal", tags=["Internal"])
 
 # Per compatibilità con il frontend
 # Utilizziamo generate_unique_id_function per evitare i warnings di duplicate operation ID
@@ -172,6 +179,15 @@ async def delete_category(category_id: int, db: Session = Depends(get_db), curre
 
 app.include_router(quiz_categories_router, prefix="/quiz-categories", tags=["Quiz Categories"])
 
+# Metriche Prometheus (/metrics): latenza per rotta e status, richieste in corso
+setup_metrics(app)
+
+# Tracing distribuito: span per richiesta e propagazione di traceparent
+setup_tracing(app, "quiz-service")
+
+# Verifica locale dei token: chiavi pubbliche dell'auth-service aggiornate in background
+setup_jwt_verifier(app)
+
 @app.get("/")
 async def health_check():
     return {"status": "ok", "service": "quiz-service"}
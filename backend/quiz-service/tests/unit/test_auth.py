@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+from starlette.requests import Request
+
+from app.api.dependencies.auth import get_current_user
+from app.core.config import settings
+from app.core.jwt_verifier import jwt_verifier
+from app.core.token_cache import TOKEN_CACHE_REQUESTS, TokenCache, token_cache, token_hash
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    _, private_key = rsa.newkeys(1024)
+    private_pem = private_key.save_pkcs1().decode("ascii")
+    public_jwk = {**jwk.construct(private_pem, "RS256").public_key().to_dict(), "kid": "key-1"}
+    return private_pem, public_jwk
+
+
+@pytest.fixture
+def local_jwks(tmp_path, signing_key, monkeypatch):
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [signing_key[1]]}))
+    monkeypatch.setattr(jwt_verifier, "jwks_url", path.as_uri())
+    monkeypatch.setattr(jwt_verifier, "_keys", {})
+    monkeypatch.setattr(jwt_verifier, "_last_attempt", float("-inf"))
+    monkeypatch.setattr(jwt_verifier, "_pending", None)
+    jwt_verifier.refresh()
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+def status_response(is_active=True):
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"user_id": "student-uuid", "is_active": is_active}
+    return response
+
+
+def authenticate(token):
+    request = Request({"type": "http", "headers": []})
+    return asyncio.run(get_current_user(request, authorization=f"Bearer {token}"))
+
+
+def make_token(signing_key, sub="student-uuid", roles=("student",), expires_in=300):
+    payload = {"sub": sub, "roles": list(roles), "exp": int(time.time()) + expires_in}
+    return jwt.encode(payload, signing_key[0], algorithm="RS256", headers={"kid": "key-1"})
+
+
+def test_token_is_verified_locally(local_jwks, signing_key):
+    with patch("app.core.http_client.get", return_value=status_response()) as status_check:
+        user = authenticate(make_token(signing_key, roles=["parent"]))
+
+    assert user.user_id == "student-uuid"
+    assert user.role == "parent"
+    assert user.is_active
+    # Unica chiamata all'auth-service: il controllo dello stato, non la verifica del token
+    assert status_check.call_args.args[1].endswith("/api/auth/status/student-uuid")
+    assert status_check.call_args.kwargs["headers"] == {"X-Service-Token": settings.SERVICE_TOKEN}
+
+
+def test_deactivated_user_is_reported(local_jwks, signing_key):
+    with patch("app.core.http_client.get", return_value=status_response(is_active=False)):
+        assert authenticate(make_token(signing_key)).is_active is False
+
+
+def test_invalid_token_is_rejected_without_network(local_jwks, signing_key):
+    with patch("app.core.http_client.get") as status_check:
+        with pytest.raises(HTTPException) as exc_info:
+            authenticate(make_token(signing_key)[:-4] + "abcd")
+
+    assert exc_info.value.status_code == 401
+    status_check.assert_not_called()
+
+
+def test_auth_service_unreachable(local_jwks, signing_key, monkeypatch):
+    with patch("app.core.http_client.get", side_effect=requests.ConnectionError()):
+        with pytest.raises(HTTPException) as exc_info:
+            authenticate(make_token(signing_key))
+    assert exc_info.value.status_code == 503
+
+    monkeypatch.setattr("app.core.config.settings.JWT_STATUS_CHECK", False)
+    with patch("app.core.http_client.get") as status_check:
+        assert authenticate(make_token(signing_key)).user_id == "student-uuid"
+    status_check.assert_not_called()
+
+
+def test_repeated_requests_hit_the_cache(local_jwks, signing_key):
+    token = make_token(signing_key)
+    hits_before = TOKEN_CACHE_REQUESTS.value("hit")
+
+    with patch("app.core.http_client.get", return_value=status_response()) as status_check:
+        for _ in range(20):
+            assert authenticate(token).user_id == "student-uuid"
+
+    # Le 20 risposte di un quiz: un solo giro verso l'auth-service
+    assert status_check.call_count == 1
+    assert token_cache.stats()["hits"] == 19
+    assert TOKEN_CACHE_REQUESTS.value("hit") == hits_before + 19
+
+
+def test_cache_entries_never_outlive_the_token():
+    cache = TokenCache(max_entries=2, ttl=300)
+    cache.put("expired", {"user_id": "u-1", "exp": int(time.time()) - 1})
+    assert cache.get("expired") is None
+
+    cache.put("soon", {"user_id": "u-1", "exp": int(time.time()) + 1})
+    cache.put("later", {"user_id": "u-2", "exp": int(time.time()) + 600})
+    cache.put("latest", {"user_id": "u-3", "exp": int(time.time()) + 600})
+    # Limite di 2 voci: la meno recente viene scartata
+    assert cache.get("soon") is None
+    assert cache.get("later")["user_id"] == "u-2"
+
+
+def test_deactivation_event_invalidates_user(client, local_jwks, signing_key):
+    token = make_token(signing_key)
+    with patch("app.core.http_client.get", return_value=status_response()):
+        authenticate(token)
+
+    response = client.post(
+        "/api/internal/auth-events",
+        json={"event": "user_deactivated", "user_id": "student-uuid"},
+        headers={"X-Service-Token": settings.SERVICE_TOKEN},
+    )
+    assert response.json() == {"event": "user_deactivated", "invalidated": 1}
+
+    with patch("app.core.http_client.get", return_value=status_response(is_active=False)) as status_check:
+        assert authenticate(token).is_active is False
+    status_check.assert_called_once()
+
+
+def test_revoked_token_is_rejected(client, local_jwks, signing_key):
+    token = make_token(signing_key)
+    event = {"event": "token_revoked", "token_hash": token_hash(token)}
+
+    assert client.post("/api/internal/auth-events", json=event).status_code == 401
+
+    response = client.post("/api/internal/auth-events", json=event, headers={"X-Service-Token": settings.SERVICE_TOKEN})
+    assert response.status_code == 200
+
+    with patch("app.core.http_client.get", return_value=status_response()):
+        with pytest.raises(HTTPException) as exc_info:
+            authenticate(token)
+    assert exc_info.value.detail == "Token revocato"
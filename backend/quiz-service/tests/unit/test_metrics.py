@@ -0,0 +1,34 @@
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+
+from app.core import http_client
+from app.core.metrics import HTTP_REQUEST_DURATION, UPSTREAM_REQUEST_DURATION
+
+
+def test_metrics_endpoint_uses_route_templates(client, test_quiz_templates):
+    template_id = test_quiz_templates["math"].id
+    before = HTTP_REQUEST_DURATION.count("GET", "/api/quiz-templates/{template_id}", "200")
+
+    client.get(f"/api/quiz-templates/{template_id}")
+
+    assert HTTP_REQUEST_DURATION.count("GET", "/api/quiz-templates/{template_id}", "200") == before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'route="/api/quiz-templates/{template_id}"' in response.text
+    assert f'route="/api/quiz-templates/{template_id}"' not in response.text
+
+
+def test_http_client_records_upstream_latency():
+    before_ok = UPSTREAM_REQUEST_DURATION.count("path-service", "POST", "200")
+    before_error = UPSTREAM_REQUEST_DURATION.count("path-service", "POST", "error")
+
+    with patch("app.core.http_client.requests.request", return_value=MagicMock(status_code=200)):
+        http_client.post("path-service", "http://path-service/api/paths/complete", json={})
+    with patch("app.core.http_client.requests.request", side_effect=requests.ConnectionError()):
+        with pytest.raises(requests.RequestException):
+            http_client.post("path-service", "http://path-service/api/paths/complete", json={})
+
+    assert UPSTREAM_REQUEST_DURATION.count("path-service", "POST", "200") == before_ok + 1
+    assert UPSTREAM_REQUEST_DURATION.count("path-service", "POST", "error") == before_error + 1
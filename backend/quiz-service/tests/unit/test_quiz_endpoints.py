@@ -470,3 +470,16 @@ def test_get_quiz_results(client, test_quiz_attempts):
     assert data["passed"] is True
     assert "started_at" in data
     assert "completed_at" in data
+
+
+def test_internal_stats(client, test_quiz_attempts):
+    """Test the aggregated statistics served to the auth-service."""
+    from app.core.config import settings
+
+    response = client.get("/api/internal/stats")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = client.get("/api/internal/stats", headers={"X-Service-Token": settings.SERVICE_TOKEN})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"total_quizzes": 2, "completed_quizzes": 1, "average_score": 80.0}
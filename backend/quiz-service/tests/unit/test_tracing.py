@@ -0,0 +1,67 @@
+import json
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from app.core import http_client
+from app.core.config import settings
+from app.core.tracing import instrument_engine, parse_traceparent, start_span, tracer
+
+CLIENT_TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACING_EXPORTER", "file")
+    monkeypatch.setattr(settings, "TRACING_FILE", str(path))
+    yield path
+    tracer.shutdown()
+
+
+@pytest.fixture
+def traced_db(db):
+    # Le query del database di test diventano span figli della richiesta
+    engine = db.get_bind()
+    if not getattr(engine, "_traced", False):
+        instrument_engine(engine)
+        engine._traced = True
+    return db
+
+
+def exported_spans(path):
+    tracer.shutdown()
+    spans = []
+    for line in path.read_text().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                spans.extend(scope["spans"])
+    return spans
+
+
+def test_http_client_propagates_traceparent():
+    parent = parse_traceparent(CLIENT_TRACEPARENT)
+
+    with patch("app.core.http_client.requests.request", return_value=MagicMock(status_code=200)) as mocked:
+        with start_span("submit", parent=parent):
+            http_client.post("path-service", "http://path-service/api/paths/complete", headers={"traceparent": "stale"})
+
+    forwarded = parse_traceparent(mocked.call_args.kwargs["headers"]["traceparent"])
+    assert forwarded.trace_id == parent.trace_id
+    assert forwarded.span_id != parent.span_id
+
+
+def test_request_exports_server_and_db_spans(traced_db, client, test_quiz_templates, trace_file):
+    template_id = test_quiz_templates["math"].id
+
+    client.get(f"/api/quiz-templates/{template_id}", headers={"traceparent": CLIENT_TRACEPARENT})
+
+    spans = exported_spans(trace_file)
+    server = next(span for span in spans if span["kind"] == 2)
+    queries = [span for span in spans if span["name"] == "db.query"]
+
+    assert server["name"] == "GET /api/quiz-templates/{template_id}"
+    assert server["parentSpanId"] == "00f067aa0ba902b7"
+    assert queries
+    assert all(span["traceId"] == server["traceId"] for span in queries)
+    assert all(span["parentSpanId"] == server["spanId"] for span in queries)
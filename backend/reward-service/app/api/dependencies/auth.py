@@ -1,8 +1,10 @@
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, status, Header, Request
 from fastapi.security import OAuth2PasswordBearer
 from typing import List, Optional, Any, Dict
 
 from app.core.config import settings
+from app.core.identity import get_gateway_identity
+from app.core.jwt_verifier import TokenVerificationError, jwt_verifier
 
 # OAuth2 scheme per la gestione del token
 oauth2_scheme = OAuth2PasswordBearer(
@@ -11,79 +13,126 @@ oauth2_scheme = OAuth2PasswordBearer(
 )
 
 # Funzioni di autenticazione proxy che delegano al servizio di autenticazione
-# Queste sono placeholder - il controllo reale avviene nell'API Gateway
+# Il token viene verificato dall'API Gateway, che inoltra l'identità reale
+# con header X-User-* firmati; senza questi header il token viene verificato
+# localmente con le chiavi pubbliche dell'auth-service
 
-async def get_current_active_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+def _user_from_identity(identity: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Utente nel formato usato dagli endpoint (id, role e lista di ruoli
+    come dizionari).
+    """
+    return {
+        "id": identity["user_id"],
+        "user_id": identity["user_id"],
+        "is_active": True,
+        "role": identity["role"],
+        "roles": [{"name": role} for role in identity["roles"]],
+    }
+
+def _gateway_user(request: Request) -> Optional[Dict[str, Any]]:
+    """
+    Utente verificato dall'API Gateway (che rifiuta già i token revocati e
+    gli utenti disattivati), oppure None.
+    """
+    identity = get_gateway_identity(request.headers)
+    if not identity:
+        return None
+    return _user_from_identity(identity)
+
+def _token_user(token: str) -> Dict[str, Any]:
+    """Utente del token verificato localmente (firma e scadenza)."""
+    try:
+        return _user_from_identity(jwt_verifier.verify(token))
+    except TokenVerificationError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token non valido o scaduto",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+async def get_current_active_user(request: Request, token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     """
     Restituisce l'utente corrente.
-    Questa è una versione mock che simula un utente autenticato.
-    La verifica reale è fatta dall'API gateway.
+    L'identità arriva dall'API gateway o dal token verificato localmente.
     """
+    gateway_user = _gateway_user(request)
+    if gateway_user:
+        return gateway_user
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Non autenticato",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {"id": "mock-user-id", "is_active": True, "roles": []}
+    return _token_user(token)
 
-async def get_current_admin_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+async def get_current_admin_user(request: Request, token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     """
     Restituisce l'utente amministratore corrente.
-    Questa è una versione mock che simula un utente con ruolo admin.
-    La verifica reale è fatta dall'API gateway.
+    L'identità arriva dall'API gateway o dal token verificato localmente.
     """
+    gateway_user = _gateway_user(request)
+    if gateway_user:
+        return gateway_user
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Non autenticato",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {"id": "mock-admin-id", "is_active": True, "roles": [{"name": "admin"}]}
+    return _token_user(token)
 
-async def get_current_parent_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+async def get_current_parent_user(request: Request, token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     """
     Restituisce l'utente genitore corrente.
-    Questa è una versione mock che simula un utente con ruolo parent.
-    La verifica reale è fatta dall'API gateway.
+    L'identità arriva dall'API gateway o dal token verificato localmente.
     """
+    gateway_user = _gateway_user(request)
+    if gateway_user:
+        return gateway_user
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Non autenticato",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {"id": "mock-parent-id", "is_active": True, "roles": [{"name": "parent"}]}
+    return _token_user(token)
 
-async def get_current_student_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+async def get_current_student_user(request: Request, token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     """
     Restituisce l'utente studente corrente.
-    Questa è una versione mock che simula un utente con ruolo student.
-    La verifica reale è fatta dall'API gateway.
+    L'identità arriva dall'API gateway o dal token verificato localmente.
     """
+    gateway_user = _gateway_user(request)
+    if gateway_user:
+        return gateway_user
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Non autenticato",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {"id": "mock-student-id", "is_active": True, "roles": [{"name": "student"}]}
+    return _token_user(token)
 
-async def get_current_parent_or_admin_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+async def get_current_parent_or_admin_user(request: Request, token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     """
     Restituisce l'utente genitore o amministratore corrente.
-    Questa è una versione mock che simula un utente con ruolo parent o admin.
-    La verifica reale è fatta dall'API gateway.
+    L'identità arriva dall'API gateway o dal token verificato localmente.
     """
+    gateway_user = _gateway_user(request)
+    if gateway_user:
+        return gateway_user
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Non autenticato",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {"id": "mock-parent-admin-id", "is_active": True, "roles": [{"name": "parent"}, {"name": "admin"}]}
+    return _token_user(token)
 
 async def get_current_service_or_admin_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     x_service_role: Optional[str] = Header(None),
     x_service_token: Optional[str] = Header(None)
@@ -112,7 +161,12 @@ async def get_current_service_or_admin_user(
                 "is_service": True
             }
     
-    # Se non c'è autenticazione di servizio valida, verifica il token JWT da admin
+    # Se non c'è autenticazione di servizio valida, usa l'identità verificata dal gateway
+    gateway_user = _gateway_user(request)
+    if gateway_user:
+        return gateway_user
+    
+    # In alternativa verifica il token JWT da admin
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -120,27 +174,24 @@ async def get_current_service_or_admin_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Mock di un admin (la verifica reale è fatta dall'API gateway)
-    return {"id": "mock-admin-id", "is_active": True, "roles": [{"name": "admin"}]}
+    # In alternativa il token viene verificato localmente
+    return _token_user(token)
 
 def get_current_user_with_role(allowed_roles: list[str]):
     """
     Factory function che restituisce una dipendenza per verificare che l'utente abbia uno dei ruoli specificati.
-    Questa funzione è un placeholder - la verifica reale è gestita dall'API gateway.
+    Il controllo dei ruoli non è ancora applicato: restituisce l'utente autenticato.
     """
-    async def _get_user_with_role(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    async def _get_user_with_role(request: Request, token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+        gateway_user = _gateway_user(request)
+        if gateway_user:
+            return gateway_user
         if not token:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Non autenticato",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        # Restituiamo un utente fittizio con i ruoli richiesti
-        # La verifica reale è gestita dall'API gateway
-        return {
-            "id": f"mock-{'-'.join(allowed_roles)}-id",
-            "is_active": True,
-            "roles": [{"name": role} for role in allowed_roles]
-        }
+        return _token_user(token)
     
     return _get_user_with_role
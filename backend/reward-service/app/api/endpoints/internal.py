@@ -0,0 +1,28 @@
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import get_db
+from app.db.repositories.reward_repository import RewardRepository
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_stats(
+    x_service_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    Conteggi di premi (totali e attivi) e di premi riscattati dagli utenti,
+    con un'unica query. Riservato agli altri servizi: l'auth-service li usa
+    per le statistiche della dashboard dell'admin.
+    """
+    if x_service_token != settings.SERVICE_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token del servizio non valido",
+        )
+    return RewardRepository.get_statistics(db)
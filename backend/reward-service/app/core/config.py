@@ -22,6 +22,7 @@ class Settings(BaseSettings):
     # Configurazione sicurezza
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
+    JWT_LEEWAY_SECONDS: int = int(os.getenv("JWT_LEEWAY_SECONDS", "10"))
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
     # URL dei servizi
@@ -30,6 +31,32 @@ class Settings(BaseSettings):
     # Token di autenticazione tra servizi
     SERVICE_TOKEN: str = os.getenv("SERVICE_TOKEN", "shared_service_token_for_microservices")
     
+    # Identità verificata dall'API Gateway (header X-User-* firmati)
+    IDENTITY_HEADER_SECRET: str = os.getenv("IDENTITY_HEADER_SECRET", "shared_identity_secret_for_microservices")
+    IDENTITY_HEADER_MAX_AGE: int = int(os.getenv("IDENTITY_HEADER_MAX_AGE", "60"))
+    
+    # Verifica locale dei token di accesso firmati dall'auth-service (RS256):
+    # le chiavi pubbliche (JWKS, di default AUTH_SERVICE_URL/api/auth/jwks)
+    # vengono aggiornate in background ogni JWKS_REFRESH_INTERVAL secondi e
+    # un kid sconosciuto forza un aggiornamento, al più uno ogni
+    # JWKS_MIN_REFRESH_INTERVAL secondi. JWT_ACCEPT_HS256 accetta anche i
+    # token firmati con SECRET_KEY: è disattivato di default e va attivato
+    # esplicitamente solo durante la migrazione, per il tempo di vita dei
+    # token HS256 già emessi (ACCESS_TOKEN_EXPIRE_MINUTES)
+    JWKS_URL: str = os.getenv("JWKS_URL", "")
+    JWKS_REFRESH_INTERVAL: float = float(os.getenv("JWKS_REFRESH_INTERVAL", "300"))
+    JWKS_MIN_REFRESH_INTERVAL: float = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+    JWKS_FETCH_TIMEOUT: float = float(os.getenv("JWKS_FETCH_TIMEOUT", "2"))
+    JWT_ACCEPT_HS256: bool = os.getenv("JWT_ACCEPT_HS256", "False").lower() == "true"
+    
+    # Tracing distribuito: il contesto W3C traceparent viene sempre propagato;
+    # gli span sono esportati in formato OTLP/JSON su file ("file") o verso un
+    # collector OTLP/HTTP ("otlp"), oppure non esportati ("none")
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+    
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         """
@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, Request
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# Tipi di span (valori OTLP)
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_STATUS_ERROR = 2
+_MAX_STATEMENT_LENGTH = 500
+_BATCH_SIZE = 512
+_FLUSH_INTERVAL = 2.0
+# Segnale di chiusura per il thread di esportazione
+_STOP = object()
+
+
+class SpanContext:
+    """Identificativi propagati con l'header W3C `traceparent`."""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool) -> None:
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+
+# Span corrente della richiesta (o del task) in esecuzione
+_current_context: ContextVar[Optional[SpanContext]] = ContextVar("trace_context", default=None)
+
+
+def current_context() -> Optional[SpanContext]:
+    return _current_context.get()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """Legge un header `traceparent` (versione 00); None se assente o non valido."""
+    if not value:
+        return None
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    _, trace_id, span_id, flags = parts[:4]
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, sampled)
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+def inject(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Copia di `headers` con il `traceparent` dello span corrente."""
+    headers = dict(headers or {})
+    context = current_context()
+    if context is not None:
+        headers = {key: value for key, value in headers.items() if key.lower() not in ("traceparent", "tracestate")}
+        headers["traceparent"] = format_traceparent(context)
+    return headers
+
+
+class Span:
+    __slots__ = ("name", "kind", "context", "parent_id", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(
+        self,
+        name: str,
+        kind: int,
+        parent: Optional[SpanContext],
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        if parent is not None:
+            trace_id, sampled = parent.trace_id, parent.sampled
+        else:
+            trace_id, sampled = os.urandom(16).hex(), random.random() < settings.TRACING_SAMPLE_RATE
+        self.context = SpanContext(trace_id, os.urandom(8).hex(), sampled)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.error = message
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.context.sampled:
+                tracer.export(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            span["status"] = {"code": _STATUS_ERROR, "message": self.error}
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: int = SPAN_KIND_INTERNAL,
+    attributes: Optional[Dict[str, Any]] = None,
+    parent: Optional[SpanContext] = None,
+) -> Iterator[Span]:
+    """Apre uno span figlio dello span corrente (o di `parent`) e lo rende corrente."""
+    span = Span(name, kind, parent if parent is not None else current_context(), attributes)
+    token = _current_context.set(span.context)
+    try:
+        yield span
+    except BaseException as exc:
+        span.set_error(f"{type(exc).__name__}: {exc}")
+        raise
+    finally:
+        _current_context.reset(token)
+        span.end()
+
+
+class Tracer:
+    """
+    Raccoglie gli span terminati e li esporta in formato OTLP/JSON da un
+    thread in background: su file (una richiesta di export per riga) oppure
+    via HTTP verso un collector OTLP (es. http://localhost:4318/v1/traces).
+    Con TRACING_EXPORTER="none" il contesto viene comunque propagato.
+    """
+
+    def __init__(self) -> None:
+        self.service_name = "unknown"
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=10000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, span: Span) -> None:
+        if settings.TRACING_EXPORTER == "none":
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + _FLUSH_INTERVAL
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._write(batch)
+                return
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= _BATCH_SIZE or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + _FLUSH_INTERVAL
+
+    def _payload(self, spans: List[Span]) -> bytes:
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        }
+        return json.dumps(request, separators=(",", ":")).encode("utf-8")
+
+    def _write(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        try:
+            payload = self._payload(spans)
+            if settings.TRACING_EXPORTER == "otlp":
+                request = urllib.request.Request(
+                    settings.TRACING_OTLP_ENDPOINT,
+                    data=payload,
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+            else:
+                with open(settings.TRACING_FILE, "ab") as trace_file:
+                    trace_file.write(payload + b"\n")
+            self.exported += len(spans)
+        except Exception as exc:
+            self.dropped += len(spans)
+            logger.warning("Esportazione di %d span non riuscita: %s", len(spans), exc)
+
+    def shutdown(self) -> None:
+        """Esporta gli span ancora in coda e ferma il thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(5)
+
+
+tracer = Tracer()
+
+
+async def tracing_middleware(request: Request, call_next):
+    parent = parse_traceparent(request.headers.get("traceparent"))
+    attributes = {"http.method": request.method, "http.target": request.url.path}
+    with start_span(request.method, SPAN_KIND_SERVER, attributes, parent=parent) as span:
+        response = await call_next(request)
+        route = route_template(request)
+        span.name = f"{request.method} {route}"
+        span.set_attribute("http.route", route)
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_error(f"HTTP {response.status_code}")
+        return response
+
+
+def instrument_engine(engine) -> None:
+    """Span per ogni query SQL eseguita all'interno di una richiesta tracciata."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = current_context()
+        if parent is None or not parent.sampled:
+            return
+        context._trace_span = Span("db.query", SPAN_KIND_CLIENT, parent, {
+            "db.system": engine.dialect.name,
+            "db.statement": statement[:_MAX_STATEMENT_LENGTH],
+        })
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        span = getattr(exception_context.execution_context, "_trace_span", None)
+        if span is not None:
+            span.set_error(str(exception_context.original_exception))
+            span.end()
+
+
+def setup_tracing(app: FastAPI, service_name: str) -> None:
+    """Registra il middleware che apre lo span di ogni richiesta e propaga `traceparent`."""
+    tracer.service_name = service_name
+    app.middleware("http")(tracing_middleware)
+    app.add_event_handler("shutdown", tracer.shutdown)
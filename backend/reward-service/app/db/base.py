@@ -1,11 +1,44 @@
+import time
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from app.core.config import settings
+from app.core.metrics import registry
+from app.core.tracing import instrument_engine
+
+# Metriche del pool di connessioni: tempo di attesa per ottenere una
+# connessione (checkout) e connessioni in uso
+DB_POOL_CHECKOUT_DURATION = registry.histogram(
+    "db_pool_checkout_duration_seconds",
+    "Attesa per ottenere una connessione dal pool del database",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKED_OUT = registry.gauge(
+    "db_pool_connections_checked_out",
+    "Connessioni del pool del database attualmente in uso",
+)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool che registra il tempo di checkout delle connessioni."""
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.perf_counter() - start_time)
+            DB_POOL_CHECKED_OUT.set(self.checkedout())
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
 
 # Crea l'engine di connessione a PostgreSQL
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI)
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, poolclass=InstrumentedQueuePool)
+instrument_engine(engine)
 
 # Crea una sessione factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,3 +1,4 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from fastapi import HTTPException, status
@@ -79,6 +80,24 @@ class RewardRepository:
         """Ottiene una ricompensa per ID"""
         return db.query(Reward).filter(Reward.id == reward_id).first()
 
+    @staticmethod
+    def get_statistics(db: Session) -> Dict[str, int]:
+        """
+        Ricompense del catalogo (totali e attive) e ricompense assegnate agli
+        studenti, con un'unica query GROUP BY sullo stato della ricompensa.
+        """
+        rows = (
+            db.query(Reward.is_active, func.count(func.distinct(Reward.id)), func.count(UserReward.id))
+            .outerjoin(UserReward, UserReward.reward_id == Reward.id)
+            .group_by(Reward.is_active)
+            .all()
+        )
+        return {
+            "total_rewards": sum(rewards for _, rewards, _ in rows),
+            "active_rewards": sum(rewards for is_active, rewards, _ in rows if is_active),
+            "redeemed_rewards": sum(assigned for _, _, assigned in rows),
+        }
+
     @staticmethod
     def get_all(db: Session, skip: int = 0, limit: int = 100, 
                 is_active: Optional[bool] = None, category_id: Optional[str] = None) -> List[Reward]:
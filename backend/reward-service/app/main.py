@@ -3,8 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from typing import List
 import uvicorn
 
+from app.core.jwt_verifier import setup_jwt_verifier
+from app.core.metrics import setup_metrics
+from app.core.tracing import setup_tracing
+
 # Import API routers
-from app.api.endpoints import rewards, user_rewards, parent, templates
+from app.api.endpoints import rewards, user_rewards, parent, templates, internal
 
 # Create FastAPI app
 app = FastAPI(
@@ -32,6 +36,17 @@ app.include_router(rewards.router, prefix="/api/rewards", tags=["Rewards"])
 app.include_router(user_rewards.router, prefix="/api/user-rewards", tags=["User Rewards"])
 app.include_router(parent.router, prefix="/api/rewards/parent", tags=["Parent Rewards"])
 app.include_router(templates.router, prefix="/api/templates", tags=["Templates"])
+# Endpoint riservati agli altri servizi (X-Service-Token)
+app.include_router(internal.router, prefix="/api/internal", tags=["Internal"])
+
+# Metriche Prometheus (/metrics): latenza per rotta e status, richieste in corso
+setup_metrics(app)
+
+# Tracing distribuito: span per richiesta e propagazione di traceparent
+setup_tracing(app, "reward-service")
+
+# Verifica locale dei token: chiavi pubbliche dell'auth-service aggiornate in background
+setup_jwt_verifier(app)
 
 @app.get("/")
 async def health_check():
@@ -127,7 +127,7 @@ start_backend() {
     # Per ora avviamo i servizi in terminali separati
     echo "Avvio auth-service..." | tee -a "$LOG_FILE"
     if [ -f "$BACKEND_DIR/auth-service/app/main.py" ]; then
-        (cd "$BACKEND_DIR/auth-service" && source "$VENV_DIR/bin/activate" && POSTGRES_SERVER=$PG_HOST POSTGRES_PORT=$PG_PORT python3 -m uvicorn app.main:app --host 0.0.0.0 --port 8001 2>&1 | tee -a "$LOG_FILE") &
+        (cd "$BACKEND_DIR/auth-service" && source "$VENV_DIR/bin/activate" && ENVIRONMENT=development POSTGRES_SERVER=$PG_HOST POSTGRES_PORT=$PG_PORT python3 -m uvicorn app.main:app --host 0.0.0.0 --port 8001 2>&1 | tee -a "$LOG_FILE") &
     else
         echo "auth-service non disponibile." | tee -a "$LOG_FILE"
     fi
@@ -350,7 +350,7 @@ start_service() {
 
     echo "Avvio $service_name..." | tee -a "$LOG_FILE"
     if [ -f "$BACKEND_DIR/$service_name/app/main.py" ]; then
-        (cd "$BACKEND_DIR/$service_name" && source "$VENV_DIR/bin/activate" && python3 -m uvicorn app.main:app --host 0.0.0.0 --port $service_port 2>&1 | tee -a "$LOG_FILE") &
+        (cd "$BACKEND_DIR/$service_name" && source "$VENV_DIR/bin/activate" && ENVIRONMENT=development python3 -m uvicorn app.main:app --host 0.0.0.0 --port $service_port 2>&1 | tee -a "$LOG_FILE") &
         echo "$service_name avviato sulla porta $service_port" | tee -a "$LOG_FILE"
         return 0
     else